@@ -0,0 +1,53 @@
+"""
+Shared helpers for the test scripts: a local aiohttp stub server and CONFIG isolation.
+
+Test scripts import these directly so they still run as plain scripts; under
+pytest the autouse fixture below also restores CONFIG after every test.
+"""
+import contextlib
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from aiohttp import web
+from src.config_loader import CONFIG
+
+
+async def start_stub(handler, path="/chat/completions", method="POST"):
+    """Serve ``handler`` on a free local port; returns ``(runner, base_url)``."""
+    app = web.Application()
+    app.router.add_route(method, path, handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def _restore(snapshot):
+    CONFIG.clear()
+    CONFIG.update(snapshot)
+
+
+@contextlib.contextmanager
+def isolated_config(**overrides):
+    """Run in a fresh temp directory with ``overrides`` applied; CONFIG and cwd are restored on exit."""
+    snapshot = dict(CONFIG)
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())
+    try:
+        CONFIG.update(overrides)
+        yield CONFIG
+    finally:
+        os.chdir(cwd)
+        _restore(snapshot)
+
+
+@pytest.fixture(autouse=True)
+def _config_snapshot():
+    snapshot = dict(CONFIG)
+    yield
+    _restore(snapshot)
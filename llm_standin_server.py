@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stand-in for OpenRouter/DeepSeek (load and failure testing)
+
+Serves POST .../chat/completions (plain JSON and SSE streaming, tool calls,
+response_format) with rule-based or scripted trade decisions, configurable
+latency and injected failures. Rule-based decisions read the market data from
+either the prose prompt or the compact tables (LLM_PROMPT_COMPACT). Point the
+agent at it with e.g.
+
+    python llm_standin_server.py --port 8099 --latency lognormal:-1.5,0.5 --error-rate 0.05
+    OPENROUTER_BASE_URL=http://127.0.0.1:8099/api/v1 DEEPSEEK_BASE_URL=http://127.0.0.1:8099 python src/main.py ...
+
+For load tests also set TRADING_PLATFORM=simulated (no exchange or TAAPI reads),
+CYCLE_ALIGN=false and a seconds interval such as ``--interval 0s``.
+
+GET /stats returns request and injection counters.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+import uuid
+
+from aiohttp import web
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from src.agent.json_repair import extract_balanced, lenient_loads, unwrap_decisions
+from src.agent.prompt_encoder import COLUMNS
+
+_ASSETS_RE = re.compile(r"## Assets\n(\[.*?\])\n")
+_MARKET_RE = re.compile(
+    r"ALL (\w+) DATA\ncurrent_price = ([\d.eE+-]+), current_ema20 = ([\w.+-]+), current_macd = ([\w.+-]+), "
+    r"current_rsi \(7 period\) = ([\w.+-]+)"
+)
+
+
+def parse_latency(spec):
+    """Sampler for "fixed:S", "uniform:A,B", "normal:MU,SD" or "lognormal:MU,SIGMA" (seconds)."""
+    kind, _, args = (spec or "fixed:0").partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()] or [0.0]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_markets(text):
+    """Per-asset price, EMA20 and RSI(7) from the prose prompt or the compact tables (LLM_PROMPT_COMPACT)."""
+    markets = {}
+    for m in _MARKET_RE.finditer(text):
+        markets[m.group(1).upper()] = {"price": _number(m.group(2)), "ema20": _number(m.group(3)),
+                                       "rsi7": _number(m.group(5))}
+    keys = {header: key for key, header, _ in COLUMNS}
+    header = None
+    for line in text.splitlines():
+        cells = [c.strip() for c in line.split("|")]
+        if cells[0] == "asset" and len(cells) > 1:
+            header = [keys.get(c, c) for c in cells]
+        elif header and len(cells) == len(header):
+            row = dict(zip(header[1:], cells[1:]))
+            markets[cells[0].upper()] = {k: _number(row.get(k)) for k in ("price", "ema20", "rsi7")}
+        else:
+            header = None
+    return markets
+
+
+class StandinLLM:
+    """Decision policy, latency and failure injection behind the stand-in endpoint."""
+
+    def __init__(self, latency="fixed:0", chunk_delay=0.0, error_rate=0.0, timeout_rate=0.0, malformed_rate=0.0,
+                 tool_call_rate=0.0, hang_seconds=120.0, allocation=100.0, script=None, seed=None):
+        self.latency = parse_latency(latency)
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.malformed_rate = malformed_rate
+        self.tool_call_rate = tool_call_rate
+        self.hang_seconds = hang_seconds
+        self.allocation = allocation
+        # Scripted replies: a list of decision arrays served in order (cycling)
+        self.script = script
+        self.rng = random.Random(seed)
+        self.stats = {"requests": 0, "streamed": 0, "tool_calls": 0, "errors_injected": 0,
+                      "timeouts_injected": 0, "malformed_injected": 0, "decisions": 0}
+
+    def rule_decision(self, asset, market):
+        """RSI(7) extremes against the intraday EMA20 trend; hold otherwise."""
+        price, ema, rsi = market.get("price"), market.get("ema20"), market.get("rsi7")
+        decision = {"asset": asset, "action": "hold", "allocation_usd": 0, "tp_price": None, "sl_price": None,
+                    "exit_plan": "", "rationale": "stand-in: no signal"}
+        if price is None or rsi is None:
+            return decision
+        if rsi < 30 and (ema is None or price >= ema):
+            decision.update(action="buy", allocation_usd=self.allocation, tp_price=round(price * 1.02, 2),
+                            sl_price=round(price * 0.99, 2), exit_plan="close after 4 hours",
+                            rationale=f"stand-in: RSI7 {rsi:.1f} oversold in uptrend")
+        elif rsi > 70 and (ema is None or price <= ema):
+            decision.update(action="sell", allocation_usd=self.allocation, tp_price=round(price * 0.98, 2),
+                            sl_price=round(price * 1.01, 2), exit_plan="close after 4 hours",
+                            rationale=f"stand-in: RSI7 {rsi:.1f} overbought in downtrend")
+        return decision
+
+    def decide(self, body):
+        """Decisions for a request: scripted, normalised sanitizer input, or rule-based."""
+        messages = body.get("messages") or []
+        user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        match = _ASSETS_RE.search(user)
+        if match:
+            assets = json.loads(match.group(1))
+        else:
+            # Sanitizer request: the assets come from the schema enum, the decisions from the raw text
+            schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("schema") or {}
+            items = (schema.get("properties", {}).get("trade_decisions") or {}).get("items", {})
+            assets = items.get("properties", {}).get("asset", {}).get("enum") or []
+            for block in extract_balanced(user):
+                try:
+                    found = unwrap_decisions(lenient_loads(block))
+                except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+                    continue
+                if found:
+                    return [self._fill(d) for d in found if isinstance(d, dict)]
+        if self.script:
+            decisions = self.script[self.stats["decisions"] % len(self.script)]
+            self.stats["decisions"] += 1
+            return decisions
+        markets = parse_markets(user)
+        self.stats["decisions"] += 1
+        return [self.rule_decision(a, markets.get(a.upper(), {})) for a in assets]
+
+    @staticmethod
+    def _fill(decision):
+        return {"asset": decision.get("asset"), "action": decision.get("action", "hold"),
+                "allocation_usd": decision.get("allocation_usd", 0), "tp_price": decision.get("tp_price"),
+                "sl_price": decision.get("sl_price"), "exit_plan": decision.get("exit_plan", ""),
+                "rationale": decision.get("rationale", "")}
+
+    def tool_call(self, body):
+        """A fetch_taapi_indicator call when tools are offered and none has been answered yet."""
+        if not body.get("tools") or any(m.get("role") == "tool" for m in body.get("messages") or []):
+            return None
+        if self.rng.random() >= self.tool_call_rate:
+            return None
+        user = next((m.get("content") or "" for m in reversed(body["messages"]) if m.get("role") == "user"), "")
+        match = _ASSETS_RE.search(user)
+        asset = json.loads(match.group(1))[0] if match else "BTC"
+        self.stats["tool_calls"] += 1
+        return {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function", "function": {
+            "name": "fetch_taapi_indicator",
+            "arguments": json.dumps({"indicator": "rsi", "symbol": f"{asset}/USDT", "interval": "4h"})}}
+
+    def content(self, body, decisions):
+        if self.rng.random() < self.malformed_rate:
+            self.stats["malformed_injected"] += 1
+            return "Here is my analysis: [{\"asset\": " + json.dumps(decisions[0]["asset"] if decisions else "BTC") + ", \"action\":"
+        if (body.get("response_format") or {}).get("type") == "json_schema":
+            return json.dumps({"trade_decisions": decisions})
+        return json.dumps(decisions)
+
+    @staticmethod
+    def usage(body, text):
+        prompt = sum(len(str(m.get("content") or "")) for m in body.get("messages") or []) // 4
+        return {"prompt_tokens": prompt, "completion_tokens": max(1, len(text) // 4),
+                "total_tokens": prompt + max(1, len(text) // 4)}
+
+    async def handle(self, request):
+        body = await request.json()
+        self.stats["requests"] += 1
+        await asyncio.sleep(self.latency(self.rng))
+        roll = self.rng.random()
+        if roll < self.timeout_rate:
+            self.stats["timeouts_injected"] += 1
+            await asyncio.sleep(self.hang_seconds)
+        elif roll < self.timeout_rate + self.error_rate:
+            self.stats["errors_injected"] += 1
+            return web.json_response({"error": {"message": "stand-in injected error: invalid request", "code": 422,
+                                                "metadata": {"raw": "", "provider_name": "standin"}}}, status=422)
+        tool_call = self.tool_call(body)
+        message = {"role": "assistant", "content": ""}
+        if tool_call:
+            message["tool_calls"] = [tool_call]
+            finish = "tool_calls"
+        else:
+            message["content"] = self.content(body, self.decide(body))
+            finish = "stop"
+        usage = self.usage(body, message["content"] + json.dumps(message.get("tool_calls", "")))
+        reply = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion", "created": int(time.time()),
+                 "model": body.get("model")}
+        if not body.get("stream"):
+            return web.json_response({**reply, "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+                                      "usage": usage})
+        self.stats["streamed"] += 1
+        return await self._stream(request, body, reply, message, finish, usage)
+
+    async def _stream(self, request, body, reply, message, finish, usage):
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await resp.prepare(request)
+
+        async def send(delta, finish_reason=None, **extra):
+            chunk = {**reply, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+            await resp.write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        await send({"role": "assistant", "content": ""})
+        for tc in message.get("tool_calls") or []:
+            args = tc["function"]["arguments"]
+            await send({"tool_calls": [{"index": 0, "id": tc["id"], "type": "function",
+                                        "function": {"name": tc["function"]["name"], "arguments": ""}}]})
+            for i in range(0, len(args), 16):
+                await send({"tool_calls": [{"index": 0, "function": {"arguments": args[i:i + 16]}}]})
+        text = message["content"]
+        step = max(1, math.ceil(len(text) / 20))
+        for i in range(0, len(text), step):
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            await send({"content": text[i:i + step]})
+        await send({}, finish)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk = {**reply, "object": "chat.completion.chunk", "choices": [], "usage": usage}
+            await resp.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
+
+    async def handle_stats(self, request):
+        return web.json_response(self.stats)
+
+
+def create_app(standin):
+    app = web.Application(client_max_size=32 * 1024 * 1024)
+    # Matches /chat/completions, /v1/chat/completions, /api/v1/chat/completions, ...
+    app.router.add_post("/{prefix:.*}chat/completions", standin.handle)
+    app.router.add_get("/stats", standin.handle_stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stand-in LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:S | uniform:A,B | normal:MU,SD | lognormal:MU,SIGMA")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed content chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with HTTP 422")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="share of requests that hang")
+    parser.add_argument("--hang-seconds", type=float, default=120.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of replies with truncated JSON")
+    parser.add_argument("--tool-call-rate", type=float, default=0.0, help="share of first rounds that call a tool")
+    parser.add_argument("--allocation", type=float, default=100.0, help="allocation_usd of rule-based trades")
+    parser.add_argument("--script", help="JSON file with a list of decision arrays, served in order")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    standin = StandinLLM(latency=args.latency, chunk_delay=args.chunk_delay, error_rate=args.error_rate,
+                         timeout_rate=args.timeout_rate, malformed_rate=args.malformed_rate,
+                         tool_call_rate=args.tool_call_rate, hang_seconds=args.hang_seconds,
+                         allocation=args.allocation, script=script, seed=args.seed)
+    print(f"Stand-in LLM listening on http://{args.host}:{args.port} (latency {args.latency})")
+    web.run_app(create_app(standin), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
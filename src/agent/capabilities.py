@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+FEATURES = ("allow_tools", "allow_structured")
+
+
+class CapabilityCache:
+    """Request features a (provider, model) pair is known to reject, persisted with expiry.
+
+    Only rejections are stored: a feature is dropped from the first request of a
+    decision while its entry is fresh, and tried again once it expires (so a
+    provider that adds support is picked up). An empty ``path`` keeps the cache
+    in memory only.
+    """
+
+    def __init__(self, path: Optional[str] = "llm_capabilities.json", ttl: float = 86400.0):
+        self.path = path or None
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # "provider|model" -> {feature: {"supported": False, "expires": ts, "reason": str}}
+        self._entries: Dict[str, Dict[str, Dict[str, Any]]] = self._load()
+
+    @staticmethod
+    def _key(provider: str, model: str) -> str:
+        return f"{provider}|{model}"
+
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring capability cache {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self._entries, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logging.warning(f"Could not write capability cache {self.path}: {e}")
+
+    def flags(self, provider: str, model: str, now: Optional[float] = None) -> Dict[str, bool]:
+        """Payload flags for the first request: False for features with a fresh rejection."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(self._key(provider, model), {})
+            return {feature: not (feature in entry and entry[feature].get("expires", 0) > now) for feature in FEATURES}
+
+    def mark_unsupported(self, provider: str, model: str, feature: str, reason: str = "", now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.setdefault(self._key(provider, model), {})
+            entry[feature] = {"supported": False, "expires": now + self.ttl, "reason": reason[:200]}
+            # Drop expired entries while we are rewriting the file anyway
+            for key in list(self._entries):
+                self._entries[key] = {f: v for f, v in self._entries[key].items() if v.get("expires", 0) > now}
+                if not self._entries[key]:
+                    del self._entries[key]
+            self._save()
+        logging.info(f"Capability cache: {provider}/{model} does not support {feature} for the next {self.ttl:.0f}s")
+
+    def learn(self, provider: str, model: str, initial: Dict[str, bool], final: Dict[str, bool]):
+        """Persist features that had to be dropped (True initially, False in a request that succeeded)."""
+        for feature in FEATURES:
+            if initial.get(feature) and not final.get(feature):
+                self.mark_unsupported(provider, model, feature, "rejected; request succeeded without it")
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        with self._lock:
+            return json.loads(json.dumps(self._entries))
@@ -1,10 +1,22 @@
-import requests
+import asyncio
 from src.config_loader import CONFIG
 from src.indicators.taapi_client import TAAPIClient
+from src.indicators.taapi_budget import PRIORITY_TOOL
+from src.agent.llm_client import LLMClient, LLMHTTPError, StreamedMessage, usage_tokens
+from src.agent.json_stream import IncrementalDecisionParser
+from src.agent.capabilities import CapabilityCache
+from src.agent.replay import ReplayStore
+from src.agent.json_repair import repair_decisions, validate_decision
+from src.agent.telemetry import LLMTelemetry, percentiles
+from src.agent.prompt_encoder import estimate_tokens
+from src.utils.async_bridge import run_sync
+from src.utils.candle_cache import CandleCache
+from src.utils.log_sink import get_sink
+from src.utils.intervals import interval_seconds
 import json
 import logging
 import time
-from datetime import datetime
+from collections import deque
 
 def _get_valid_model(model: str) -> str:
     """Get a valid LLM model, with fallback for invalid models."""
@@ -44,296 +56,706 @@ def _get_valid_model(model: str) -> str:
     
     return clean_model
 
+def _hold(asset, rationale):
+    return {
+        "asset": asset,
+        "action": "hold",
+        "allocation_usd": 0.0,
+        "tp_price": None,
+        "sl_price": None,
+        "exit_plan": "",
+        "rationale": rationale
+    }
+
+def _valid_decisions(decisions, assets):
+    """True if ``decisions`` covers every asset and each item satisfies the decision schema."""
+    if not isinstance(decisions, list) or not _group_complete(decisions, assets):
+        return False
+    item_schema = build_decision_schema(assets)["properties"]["trade_decisions"]["items"]
+    return all(_valid_decision(d, item_schema) for d in decisions)
+
+def _valid_decision(decision, item_schema):
+    if not isinstance(decision, dict) or "parse error" in str(decision.get("rationale", "")).lower():
+        return False
+    return not validate_decision({k: v for k, v in decision.items() if k in item_schema["properties"]}, item_schema)
+
+def _adopt_trace(trace, other):
+    """Replace ``trace`` in place with the trace of the route whose answer was used."""
+    trace.clear()
+    trace.update(other)
+
+def _is_parse_error(decision):
+    return decision.get("action") == "hold" and "parse error" in str(decision.get("rationale", "")).lower()
+
+def _group_complete(outputs, group):
+    """True if every asset of the group got a decision that is not a parse-error hold."""
+    decided = {d.get("asset") for d in outputs if isinstance(d, dict) and not _is_parse_error(d)}
+    return all(a in decided for a in group)
+
+def _normalize_decision(item):
+    """Fill defaults on a decision object (or convert the positional array form); None if unusable."""
+    if isinstance(item, dict):
+        if not item.get("asset"):
+            return None
+        item.setdefault("allocation_usd", 0.0)
+        item.setdefault("tp_price", None)
+        item.setdefault("sl_price", None)
+        item.setdefault("exit_plan", "")
+        item.setdefault("rationale", "")
+        return item
+    if isinstance(item, list) and len(item) >= 7:
+        # Handle array format: [asset, action, alloc, tp, sl, exit_plan, rationale]
+        return {
+            "asset": item[0],
+            "action": item[1],
+            "allocation_usd": float(item[2]) if item[2] else 0.0,
+            "tp_price": float(item[3]) if item[3] and item[3] != "null" else None,
+            "sl_price": float(item[4]) if item[4] and item[4] != "null" else None,
+            "exit_plan": item[5] if len(item) > 5 else "",
+            "rationale": item[6] if len(item) > 6 else ""
+        }
+    return None
+
+def build_decision_schema(assets):
+    """JSON schema for the decisions reply (response_format and local repair validation)."""
+    base_properties = {
+        "asset": {"type": "string", "enum": assets},
+        "action": {"type": "string", "enum": ["buy", "sell", "hold"]},
+        "allocation_usd": {"type": "number", "minimum": 0},
+        "tp_price": {"type": ["number", "null"]},
+        "sl_price": {"type": ["number", "null"]},
+        "exit_plan": {"type": "string"},
+        "rationale": {"type": "string"},
+    }
+    required_keys = ["asset", "action", "allocation_usd", "tp_price", "sl_price", "exit_plan", "rationale"]
+    return {
+        "type": "object",
+        "properties": {
+            "trade_decisions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": base_properties,
+                    "required": required_keys,
+                    "additionalProperties": False,
+                },
+                "minItems": 1,
+            }
+        },
+        "required": ["trade_decisions"],
+        "additionalProperties": False,
+    }
+
+# TAAPI response fields the model does not need
+_TOOL_PAYLOAD_DROP = {"backtrack", "timestamp", "timestamps", "errors"}
+
+def _normalize_tool_args(args):
+    """Canonical (indicator, symbol, interval, params) for a fetch_taapi_indicator call."""
+    indicator = str(args["indicator"]).strip().lower()
+    symbol = str(args["symbol"]).strip().upper().replace("-", "/").replace("_", "/")
+    if "/" not in symbol and symbol.endswith("USDT") and len(symbol) > 4:
+        symbol = f"{symbol[:-4]}/USDT"
+    interval = str(args["interval"]).strip().strip('"').lower()
+    params = {}
+    if args.get("period") is not None:
+        params["period"] = int(args["period"])
+    if args.get("backtrack"):
+        params["backtrack"] = int(args["backtrack"])
+    if isinstance(args.get("other_params"), dict):
+        params.update({k: v for k, v in args["other_params"].items() if v is not None})
+    return indicator, symbol, interval, params
+
+def _is_cacheable_interval(interval):
+    try:
+        interval_seconds(interval)
+        return True
+    except ValueError:
+        return False
+
+def _trim_tool_payload(value, max_points):
+    """Drop bookkeeping fields, keep the latest ``max_points`` of series, round floats."""
+    if isinstance(value, dict):
+        return {k: _trim_tool_payload(v, max_points) for k, v in value.items() if k not in _TOOL_PAYLOAD_DROP}
+    if isinstance(value, list):
+        return [_trim_tool_payload(v, max_points) for v in value[-max_points:]]
+    if isinstance(value, float):
+        return float(f"{value:.6g}")
+    return value
+
+def _select_fields(content, fields):
+    """Keep only the requested top-level result fields of a tool result (unknown names are ignored)."""
+    try:
+        result = json.loads(content)
+    except ValueError:
+        return content
+    if not isinstance(result, dict):
+        return content
+    selected = {k: v for k, v in result.items() if k in fields}
+    return json.dumps(selected, separators=(",", ":")) if selected else content
+
+def _summarize_tool_content(content):
+    """Latest value of each series only; non-JSON results (errors) are truncated."""
+    try:
+        result = json.loads(content)
+    except ValueError:
+        return content[:200]
+    return json.dumps(_trim_tool_payload(result, 1), separators=(",", ":"))
+
+def _compact_tool_history(messages, max_chars):
+    """Shrink tool results, oldest first, until their total size is within ``max_chars``.
+
+    Results are first reduced to their latest values, then omitted. Messages are
+    replaced rather than edited, since request logs may still reference them.
+    """
+    tool_indexes = [i for i, m in enumerate(messages) if m.get("role") == "tool"]
+    total = sum(len(messages[i].get("content") or "") for i in tool_indexes)
+    for shrink in (_summarize_tool_content, lambda _: "[omitted to bound prompt size]"):
+        for i in tool_indexes:
+            if total <= max_chars:
+                return total
+            content = messages[i].get("content") or ""
+            smaller = shrink(content)
+            if len(smaller) < len(content):
+                messages[i] = {**messages[i], "content": smaller}
+                total -= len(content) - len(smaller)
+    return total
+
+def _prompt_tokens(messages):
+    """Estimated prompt tokens of a message list (contents and tool-call arguments)."""
+    parts = []
+    for m in messages:
+        parts.append(m.get("content") or "")
+        for tc in m.get("tool_calls") or []:
+            parts.append((tc.get("function") or {}).get("arguments") or "")
+    return estimate_tokens("\n".join(parts))
+
+TAAPI_TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": "fetch_taapi_indicator",
+        "description": ("Fetch any TAAPI indicator. Available: ema, sma, rsi, macd, bbands, stochastic, stochrsi, "
+            "adx, atr, cci, dmi, ichimoku, supertrend, vwap, obv, mfi, willr, roc, mom, sar (parabolic), "
+            "fibonacci, pivotpoints, keltner, donchian, awesome, gator, alligator, and 200+ more. "
+            "See https://taapi.io/indicators/ for full list and parameters."),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "indicator": {"type": "string"},
+                "symbol": {"type": "string"},
+                "interval": {"type": "string"},
+                "period": {"type": "integer"},
+                "backtrack": {"type": "integer"},
+                "other_params": {"type": "object", "additionalProperties": {"type": ["string", "number", "boolean"]}},
+                # e.g. ["valueMACD"] for macd; all fields when omitted
+                "fields": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["indicator", "symbol", "interval"],
+            "additionalProperties": False,
+        },
+    },
+}]
+
+
+RETRY_INSTRUCTION = "## Retry Instruction\nReturn ONLY the JSON array per schema with no prose.\n\n"
+
+# Static policy: kept byte-identical across calls so providers can cache the prompt prefix
+SYSTEM_PROMPT = (
+    "You are a rigorous QUANTITATIVE TRADER and interdisciplinary MATHEMATICIAN-ENGINEER optimizing risk-adjusted returns for perpetual futures under real execution, margin, and funding constraints.\n"
+    "You will receive market + account context for SEVERAL assets, including:\n"
+    "- assets = the list in the '## Assets' section of the user message\n"
+    "- per-asset intraday (5m) and higher-timeframe (4h) metrics\n"
+    "- Active Trades with Exit Plans\n"
+    "- Recent Trading History\n\n"
+    "Always use the 'current time' provided in the user message to evaluate any time-based conditions, such as cooldown expirations or timed exit plans.\n\n"
+    "Your goal: make decisive, first-principles decisions per asset that minimize churn while capturing edge.\n\n"
+    "Core policy (low-churn, position-aware)\n"
+    "1) Respect prior plans: If an active trade has an exit_plan with explicit invalidation (e.g., “close if 4h close above EMA50”), DO NOT close or flip early unless that invalidation (or a stronger one) has occurred.\n"
+    "2) Hysteresis: Require stronger evidence to CHANGE a decision than to keep it. Only flip direction if BOTH:\n"
+    "   a) Higher-timeframe structure supports the new direction (e.g., 4h EMA20 vs EMA50 and/or MACD regime), AND\n"
+    "   b) Intraday structure confirms with a decisive break beyond ~0.5×ATR (recent) and momentum alignment (MACD or RSI slope).\n"
+    "   Otherwise, prefer HOLD or adjust TP/SL.\n"
+    "3) Cooldown: After opening, adding, reducing, or flipping, impose a self-cooldown of at least 3 bars of the decision timeframe (e.g., 3×5m = 15m) before another direction change, unless a hard invalidation occurs. Encode this in exit_plan (e.g., “cooldown_bars:3 until 2025-10-19T15:55Z”). You must honor your own cooldowns on future cycles.\n"
+    "4) Funding is a tilt, not a trigger: Do NOT open/close/flip solely due to funding unless expected funding over your intended holding horizon meaningfully exceeds expected edge (e.g., > ~0.25×ATR). Consider that funding accrues discretely and slowly relative to 5m bars.\n"
+    "5) Overbought/oversold ≠ reversal by itself: Treat RSI extremes as risk-of-pullback. You need structure + momentum confirmation to bet against trend. Prefer tightening stops or taking partial profits over instant flips.\n"
+    "6) Prefer adjustments over exits: If the thesis weakens but is not invalidated, first consider: tighten stop (e.g., to a recent swing or ATR multiple), trail TP, or reduce size. Flip only on hard invalidation + fresh confluence.\n\n"
+    "Decision discipline (per asset)\n"
+    "- Choose one: buy / sell / hold.\n"
+    "- You control allocation_usd.\n"
+    "- TP/SL sanity:\n"
+    "  • BUY: tp_price > current_price, sl_price < current_price\n"
+    "  • SELL: tp_price < current_price, sl_price > current_price\n"
+    "  If sensible TP/SL cannot be set, use null and explain the logic.\n"
+    "- exit_plan must include at least ONE explicit invalidation trigger and may include cooldown guidance you will follow later.\n\n"
+    "Leverage policy (perpetual futures)\n"
+    "- YOU CAN USE LEVERAGE, ATLEAST 2X LEVERAGE TO GET BETTER RETURN, KEEP IT WITHIN 5X IN TOTAL\n"
+    "- In high volatility (elevated ATR) or during funding spikes, reduce or avoid leverage.\n"
+    "- Treat allocation_usd as notional exposure; keep it consistent with safe leverage and available margin.\n\n"
+    "Tool usage\n"
+    "- Call fetch_taapi_indicator ONLY if one specific reading would materially change your decision. Keep parameters minimal (indicator, symbol like \"BTC/USDT\", interval \"5m\"/\"4h\", optional period; fields like [\"valueMACD\"] to get only the values you need).\n\n"
+    "- Tool usage is recommended, in case you don't feel confident enough with provided indicators or if you want more information."
+    "Reasoning recipe (first principles)\n"
+    "- Structure (trend, EMAs slope/cross, HH/HL vs LH/LL), Momentum (MACD regime, RSI slope), Liquidity/volatility (ATR, volume), Positioning tilt (funding, OI).\n"
+    "- Favor alignment across 4h and 5m. Counter-trend scalps require stronger intraday confirmation and tighter risk.\n\n"
+    "Output contract\n"
+    "- Output STRICT JSON array (no Markdown, no extra text), one object per asset in the SAME ORDER as the provided assets list.\n"
+    "- Exact keys for each object: {asset, action, allocation_usd, tp_price, sl_price, exit_plan, rationale}\n"
+    "- CRITICAL: Return ONLY valid JSON array, no additional text or formatting.\n"
+)
+
 class TradingAgent:
     def __init__(self):
         self.model = _get_valid_model(CONFIG["llm_model"])
         self.provider = CONFIG["llm_provider"]
         
-        # Configure API based on provider
-        if self.provider == "deepseek":
-            self.api_key = CONFIG["deepseek_api_key"]
-            if not self.api_key:
-                raise RuntimeError("DEEPSEEK_API_KEY is required when LLM_PROVIDER=deepseek")
-            base_url = CONFIG["deepseek_base_url"]
-            self.base_url = f"{base_url}/chat/completions"
-            self.referer = None
-            self.app_title = None
-        else:  # openrouter (default)
-            self.api_key = CONFIG["openrouter_api_key"]
-            if not self.api_key:
-                raise RuntimeError("OPENROUTER_API_KEY is required when LLM_PROVIDER=openrouter")
-            base_url = CONFIG["openrouter_base_url"]
-            self.base_url = f"{base_url}/chat/completions"
-            self.referer = CONFIG.get("openrouter_referer")
-            self.app_title = CONFIG.get("openrouter_app_title")
+        # Pooled async client for the configured provider ("deepseek" or "openrouter")
+        self.client = LLMClient.from_config(self.provider)
+        self.telemetry = LLMTelemetry(int(CONFIG.get("llm_telemetry_window") or 500))
+        self.client.telemetry = self.telemetry
+        # Offline record/replay of LLM exchanges (LLM_REPLAY_MODE)
+        self.replay = ReplayStore.from_config()
+        self.client.replay = self.replay
+        self.decision_timeout = float(CONFIG.get("llm_decision_timeout") or 0) or None
+        # Stream completions and hand out each decision as soon as it is complete
+        self.stream = str(CONFIG.get("llm_stream") or "false").lower() == "true"
+        # How each final reply was turned into decisions
+        self.parse_stats = {"direct": 0, "repaired": 0, "sanitized": 0, "failed": 0}
+        # Provider prompt-cache accounting (tokens served from the cached prefix)
+        self.prompt_cache = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        # Features each (provider, model) rejected before, so cycles don't rediscover them via 400/422s
+        self.capabilities = CapabilityCache(
+            CONFIG.get("llm_capability_cache_path", "llm_capabilities.json"),
+            ttl=float(CONFIG.get("llm_capability_ttl") or 86400),
+        )
         
         self.taapi = TAAPIClient()
+        # Tool calls of one turn run concurrently, each with its own timeout
+        self.tool_concurrency = max(1, int(CONFIG.get("llm_tool_concurrency") or 4))
+        self.tool_timeout = float(CONFIG.get("llm_tool_timeout") or 0) or None
+        # Trimmed tool results, reused across cycles (and retries) until the candle closes
+        tool_cache_enabled = str(CONFIG.get("llm_tool_cache_enabled") or "true").lower() == "true"
+        self.tool_cache = CandleCache() if tool_cache_enabled else None
+        self.tool_max_points = max(1, int(CONFIG.get("llm_tool_max_points") or 10))
+        # Cap on tool output resent each round of the tool loop (0 = unbounded)
+        self.tool_history_chars = int(CONFIG.get("llm_tool_history_chars") or 0)
+        self._init_hedging()
+        # Sharded mode: one concurrent request per asset group (0 = single combined request)
+        self.shard_size = int(CONFIG.get("llm_shard_size") or 0)
+        self.shard_token_budget = int(CONFIG.get("llm_shard_token_budget") or 0)
+        self.shard_concurrency = max(1, int(CONFIG.get("llm_shard_concurrency") or 4))
+        self.shard_stats = {"groups": 0, "failed_groups": 0, "recovered_groups": 0}
+        # The run loop streams one combined request, so hedging and sharding do not apply
+        bypassed = [name for name, on in (("LLM_HEDGE_ENABLED", self.hedge_client is not None),
+                                          ("LLM_SHARD_SIZE/LLM_SHARD_TOKEN_BUDGET", self.sharded)) if on]
+        if self.stream and bypassed:
+            logging.warning(f"LLM_STREAM=true takes precedence; ignoring {' and '.join(bypassed)}")
         # Fast/cheap sanitizer model to normalize outputs on parse failures
         if self.provider == "deepseek":
             self.sanitize_model = CONFIG.get("sanitize_model") or "deepseek-chat"
         else:
             self.sanitize_model = CONFIG.get("sanitize_model") or "openai/gpt-3.5-turbo"
 
-    def decide_trade(self, assets, context):
+    def _init_hedging(self):
+        """Optional backup route (second provider/model) for slow decisions."""
+        self.hedge_client = None
+        self.hedge_model = None
+        self.hedge_delay = float(CONFIG.get("llm_hedge_delay") or 0)
+        self.hedge_min_delay = float(CONFIG.get("llm_hedge_min_delay") or 5)
+        self.hedge_initial_delay = float(CONFIG.get("llm_hedge_initial_delay") or 30)
+        self.hedge_max_rate = float(CONFIG.get("llm_hedge_max_rate") or 0.25)
+        self._hedge_history = deque(maxlen=20)
+        self.hedge_stats = {"decisions": 0, "hedged": 0, "hedge_wins": 0, "primary_wins": 0, "rate_capped": 0}
+        if str(CONFIG.get("llm_hedge_enabled") or "false").lower() != "true":
+            return
+        provider = CONFIG.get("llm_hedge_provider") or ("openrouter" if self.provider == "deepseek" else "deepseek")
+        model = CONFIG.get("llm_hedge_model")
+        if not model:
+            model = self.model if provider == self.provider else ("deepseek-chat" if provider == "deepseek" else None)
+        if not model:
+            logging.warning("LLM hedging disabled: LLM_HEDGE_MODEL is required for an OpenRouter backup")
+            return
+        try:
+            self.hedge_client = LLMClient.from_config(provider)
+        except RuntimeError as e:
+            logging.warning(f"LLM hedging disabled: {e}")
+            return
+        self.hedge_client.telemetry = self.telemetry
+        self.hedge_client.replay = self.replay
+        self.hedge_model = _get_valid_model(model)
+
+    async def decide_trade(self, assets, context):
         """Decide for multiple assets in one call. Returns list of dicts."""
-        return self._decide(context, assets=assets)
-
-    def _decide(self, context, assets):
-        system_prompt = (
-            "You are a rigorous QUANTITATIVE TRADER and interdisciplinary MATHEMATICIAN-ENGINEER optimizing risk-adjusted returns for perpetual futures under real execution, margin, and funding constraints.\n"
-            "You will receive market + account context for SEVERAL assets, including:\n"
-            f"- assets = {json.dumps(assets)}\n"
-            "- per-asset intraday (5m) and higher-timeframe (4h) metrics\n"
-            "- Active Trades with Exit Plans\n"
-            "- Recent Trading History\n\n"
-            "Always use the 'current time' provided in the user message to evaluate any time-based conditions, such as cooldown expirations or timed exit plans.\n\n"
-            "Your goal: make decisive, first-principles decisions per asset that minimize churn while capturing edge.\n\n"
-            "Core policy (low-churn, position-aware)\n"
-            "1) Respect prior plans: If an active trade has an exit_plan with explicit invalidation (e.g., “close if 4h close above EMA50”), DO NOT close or flip early unless that invalidation (or a stronger one) has occurred.\n"
-            "2) Hysteresis: Require stronger evidence to CHANGE a decision than to keep it. Only flip direction if BOTH:\n"
-            "   a) Higher-timeframe structure supports the new direction (e.g., 4h EMA20 vs EMA50 and/or MACD regime), AND\n"
-            "   b) Intraday structure confirms with a decisive break beyond ~0.5×ATR (recent) and momentum alignment (MACD or RSI slope).\n"
-            "   Otherwise, prefer HOLD or adjust TP/SL.\n"
-            "3) Cooldown: After opening, adding, reducing, or flipping, impose a self-cooldown of at least 3 bars of the decision timeframe (e.g., 3×5m = 15m) before another direction change, unless a hard invalidation occurs. Encode this in exit_plan (e.g., “cooldown_bars:3 until 2025-10-19T15:55Z”). You must honor your own cooldowns on future cycles.\n"
-            "4) Funding is a tilt, not a trigger: Do NOT open/close/flip solely due to funding unless expected funding over your intended holding horizon meaningfully exceeds expected edge (e.g., > ~0.25×ATR). Consider that funding accrues discretely and slowly relative to 5m bars.\n"
-            "5) Overbought/oversold ≠ reversal by itself: Treat RSI extremes as risk-of-pullback. You need structure + momentum confirmation to bet against trend. Prefer tightening stops or taking partial profits over instant flips.\n"
-            "6) Prefer adjustments over exits: If the thesis weakens but is not invalidated, first consider: tighten stop (e.g., to a recent swing or ATR multiple), trail TP, or reduce size. Flip only on hard invalidation + fresh confluence.\n\n"
-            "Decision discipline (per asset)\n"
-            "- Choose one: buy / sell / hold.\n"
-            "- You control allocation_usd.\n"
-            "- TP/SL sanity:\n"
-            "  • BUY: tp_price > current_price, sl_price < current_price\n"
-            "  • SELL: tp_price < current_price, sl_price > current_price\n"
-            "  If sensible TP/SL cannot be set, use null and explain the logic.\n"
-            "- exit_plan must include at least ONE explicit invalidation trigger and may include cooldown guidance you will follow later.\n\n"
-            "Leverage policy (perpetual futures)\n"
-            "- YOU CAN USE LEVERAGE, ATLEAST 2X LEVERAGE TO GET BETTER RETURN, KEEP IT WITHIN 5X IN TOTAL\n"
-            "- In high volatility (elevated ATR) or during funding spikes, reduce or avoid leverage.\n"
-            "- Treat allocation_usd as notional exposure; keep it consistent with safe leverage and available margin.\n\n"
-            "Tool usage\n"
-            "- Call fetch_taapi_indicator ONLY if one specific reading would materially change your decision. Keep parameters minimal (indicator, symbol like \"BTC/USDT\", interval \"5m\"/\"4h\", optional period).\n\n"
-            "- Tool usage is recommended, in case you don't feel confident enough with provided indicators or if you want more information."
-            "Reasoning recipe (first principles)\n"
-            "- Structure (trend, EMAs slope/cross, HH/HL vs LH/LL), Momentum (MACD regime, RSI slope), Liquidity/volatility (ATR, volume), Positioning tilt (funding, OI).\n"
-            "- Favor alignment across 4h and 5m. Counter-trend scalps require stronger intraday confirmation and tighter risk.\n\n"
-            "Output contract\n"
-            "- Output STRICT JSON array (no Markdown, no extra text), one object per asset in the SAME ORDER as the provided assets list.\n"
-            "- Exact keys for each object: {asset, action, allocation_usd, tp_price, sl_price, exit_plan, rationale}\n"
-            "- CRITICAL: Return ONLY valid JSON array, no additional text or formatting.\n"
-        )
-        user_prompt = context
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ]
+        return await asyncio.wait_for(self._decide(context, assets=assets), self.decision_timeout)
 
-        tools = [{
-            "type": "function",
-            "function": {
-                "name": "fetch_taapi_indicator",
-                "description": ("Fetch any TAAPI indicator. Available: ema, sma, rsi, macd, bbands, stochastic, stochrsi, "
-                    "adx, atr, cci, dmi, ichimoku, supertrend, vwap, obv, mfi, willr, roc, mom, sar (parabolic), "
-                    "fibonacci, pivotpoints, keltner, donchian, awesome, gator, alligator, and 200+ more. "
-                    "See https://taapi.io/indicators/ for full list and parameters."),
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "indicator": {"type": "string"},
-                        "symbol": {"type": "string"},
-                        "interval": {"type": "string"},
-                        "period": {"type": "integer"},
-                        "backtrack": {"type": "integer"},
-                        "other_params": {"type": "object", "additionalProperties": {"type": ["string", "number", "boolean"]}},
-                    },
-                    "required": ["indicator", "symbol", "interval"],
-                    "additionalProperties": False,
-                },
-            },
-        }]
+    @property
+    def sharded(self):
+        return bool(self.shard_size or self.shard_token_budget)
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        if self.referer:
-            headers["HTTP-Referer"] = self.referer
-        if self.app_title:
-            headers["X-Title"] = self.app_title
-
-        def _post(payload):
-            # Validate and fix model at runtime
-            original_model = payload.get('model')
-            validated_model = _get_valid_model(original_model)
-            if original_model != validated_model:
-                payload['model'] = validated_model
-                logging.warning(f"Model corrected at runtime: '{original_model}' -> '{validated_model}'")
-                # Also log to file for debugging
-                with open("model_corrections.log", "a") as f:
-                    f.write(f"{datetime.now()}: Model corrected '{original_model}' -> '{validated_model}'\n")
-            
-            # Log the full request payload for debugging
-            provider_name = "DeepSeek" if self.provider == "deepseek" else "OpenRouter"
-            logging.info(f"Sending request to {provider_name} (model: {payload.get('model')})")
-            with open("llm_requests.log", "a") as f:
-                f.write(f"\n\n=== {datetime.now()} ===\n")
-                f.write(f"Provider: {provider_name}\n")
-                f.write(f"Model: {payload.get('model')}\n")
-                f.write(f"Headers: {json.dumps({k: v for k, v in headers.items() if k != 'Authorization'})}\n")
-                f.write(f"Payload:\n{json.dumps(payload, indent=2)}\n")
-            # Add timeout and retry logic
-            max_retries = 3
-            for attempt in range(max_retries):
+    def shard_assets(self, assets, sections=None):
+        """Split assets (in order) into groups of at most LLM_SHARD_SIZE assets and/or
+        LLM_SHARD_TOKEN_BUDGET estimated prompt tokens of market data."""
+        groups, current, tokens = [], [], 0
+        for asset in assets:
+            # ~4 characters per token is close enough for budgeting
+            cost = len((sections or {}).get(asset, "")) // 4
+            full = (self.shard_size and len(current) >= self.shard_size) or \
+                (self.shard_token_budget and tokens + cost > self.shard_token_budget)
+            if current and full:
+                groups.append(current)
+                current, tokens = [], 0
+            current.append(asset)
+            tokens += cost
+        if current:
+            groups.append(current)
+        return groups
+
+    async def decide_sharded(self, assets, sections, shared_context):
+        """Decide asset groups concurrently and merge the results in asset order.
+
+        Each group's request carries only its own market data plus the shared
+        account context. Groups that fail (errors, missing assets, parse-error
+        holds) are retried once on their own; assets still undecided get a
+        "Parse error" hold.
+        """
+        groups = self.shard_assets(assets, sections)
+        semaphore = asyncio.Semaphore(self.shard_concurrency)
+
+        async def run(group, retry=False):
+            context = "## Market Data\n" + "".join(sections.get(a, "") for a in group) + "\n" + shared_context
+            if retry:
+                context = RETRY_INSTRUCTION + context
+            async with semaphore:
                 try:
-                    logging.info(f"Making {provider_name} request (attempt {attempt + 1}/{max_retries})")
-                    resp = requests.post(self.base_url, headers=headers, json=payload, timeout=90)
-                    logging.info(f"Received response from {provider_name} (status: {resp.status_code})")
-                    
-                    if resp.status_code != 200:
-                        logging.error(f"{provider_name} error: {resp.status_code} - {resp.text}")
-                        with open("llm_requests.log", "a") as f:
-                            f.write(f"ERROR Response: {resp.status_code} - {resp.text}\n")
-                        if attempt < max_retries - 1:
-                            logging.warning(f"Retrying request in 5 seconds...")
-                            time.sleep(5)
-                            continue
-                    
-                    resp.raise_for_status()
-                    return resp.json()
-                    
-                except requests.exceptions.Timeout:
-                    logging.warning(f"Request timeout on attempt {attempt + 1}/{max_retries}")
-                    if attempt < max_retries - 1:
-                        logging.warning(f"Retrying request in 10 seconds...")
-                        time.sleep(10)
-                        continue
-                    else:
-                        logging.error("All retry attempts failed due to timeout")
-                        raise
-                except requests.exceptions.ConnectionError:
-                    logging.warning(f"Connection error on attempt {attempt + 1}/{max_retries}")
-                    if attempt < max_retries - 1:
-                        logging.warning(f"Retrying request in 5 seconds...")
-                        time.sleep(5)
-                        continue
-                    else:
-                        logging.error("All retry attempts failed due to connection error")
-                        raise
+                    outputs = await self.decide_trade(group, context)
+                    return outputs if isinstance(outputs, list) else []
                 except Exception as e:
-                    logging.error(f"Unexpected error on attempt {attempt + 1}: {e}")
-                    if attempt < max_retries - 1:
-                        logging.warning(f"Retrying request in 5 seconds...")
-                        time.sleep(5)
-                        continue
-                    else:
-                        raise
+                    logging.error(f"Decision group {group} failed: {e}")
+                    return []
 
-        def _sanitize_to_array(raw_content: str, assets_list):
-            """Use a fast model to coerce any content into the exact JSON array schema."""
-            try:
-                schema = {
-                    "type": "object",
-                    "properties": {
-                        "trade_decisions": {
-                            "type": "array",
-                            "items": {
-                                "type": "object",
-                                "properties": {
-                                    "asset": {"type": "string", "enum": assets_list},
-                                    "action": {"type": "string", "enum": ["buy", "sell", "hold"]},
-                                    "allocation_usd": {"type": "number"},
-                                    "tp_price": {"type": ["number", "null"]},
-                                    "sl_price": {"type": ["number", "null"]},
-                                    "exit_plan": {"type": "string"},
-                                    "rationale": {"type": "string"},
-                                },
-                                "required": ["asset", "action", "allocation_usd", "tp_price", "sl_price", "exit_plan", "rationale"],
-                                "additionalProperties": False,
-                            },
-                            "minItems": 1,
-                        }
-                    },
-                    "required": ["trade_decisions"],
-                    "additionalProperties": False,
-                }
-                payload = {
-                    "model": self.sanitize_model,
-                    "messages": [
-                        {"role": "system", "content": (
-                            "You are a strict JSON normalizer. Return ONLY a JSON array matching the provided JSON Schema. "
-                            "If input is wrapped or has prose/markdown, fix it. Do not add fields."
-                        )},
-                        {"role": "user", "content": raw_content},
-                    ],
-                    "temperature": 0,
-                }
-                
-                # Only use structured outputs for providers that support it (OpenRouter)
-                if self.provider == "openrouter":
-                    payload["response_format"] = {
-                        "type": "json_schema",
-                        "json_schema": {
-                            "name": "trade_decisions",
-                            "strict": True,
-                            "schema": schema,
-                        },
-                    }
-                resp = _post(payload)
-                msg = resp.get("choices", [{}])[0].get("message", {})
-                parsed = msg.get("parsed")
-                if isinstance(parsed, list):
-                    return parsed
-                if isinstance(parsed, dict):
-                    arr = parsed.get("trade_decisions")
-                    if not isinstance(arr, list) and len(parsed) == 1:
-                        v = list(parsed.values())[0]
-                        if isinstance(v, list):
-                            arr = v
-                    if isinstance(arr, list):
-                        return arr
-                # fallback: try content
-                content = msg.get("content") or "[]"
+        results = await asyncio.gather(*(run(g) for g in groups))
+        self.shard_stats["groups"] += len(groups)
+        failed = [i for i, (group, outputs) in enumerate(zip(groups, results)) if not _group_complete(outputs, group)]
+        if failed:
+            self.shard_stats["failed_groups"] += len(failed)
+            logging.warning(f"Retrying {len(failed)}/{len(groups)} decision groups: {[groups[i] for i in failed]}")
+            retried = await asyncio.gather(*(run(groups[i], retry=True) for i in failed))
+            for i, outputs in zip(failed, retried):
+                if _group_complete(outputs, groups[i]):
+                    self.shard_stats["recovered_groups"] += 1
+                # Keep usable first-pass decisions for assets the retry still missed
+                results[i] = list(outputs) + list(results[i])
+
+        chosen = {}
+        for outputs in results:
+            for d in outputs:
+                asset = d.get("asset") if isinstance(d, dict) else None
+                if asset not in assets:
+                    continue
+                if asset not in chosen or (_is_parse_error(chosen[asset]) and not _is_parse_error(d)):
+                    chosen[asset] = d
+        return [chosen.get(a) or _hold(a, "Parse error") for a in assets]
+
+    def decide_trade_sync(self, assets, context):
+        """Blocking wrapper for scripts; runs on the shared background loop."""
+        return run_sync(self.decide_trade(assets, context))
+
+    async def stream_decisions(self, assets, context):
+        """Yield per-asset decisions as soon as each one is complete in the streamed reply.
+
+        Only schema-valid objects are yielded, and only from a round that opens
+        with content; a round that opens with tool calls is a tool round and its
+        text is never acted on. Tool calls arriving after a round has yielded
+        decisions are ignored and the round is treated as final. Assets the stream did not produce a valid object
+        for are decided by the buffered parse path (and sanitizer) once the reply
+        ends. Time the caller spends handling a yielded decision does not count
+        against decision_timeout.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.decision_timeout if self.decision_timeout else None
+        messages = self._initial_messages(context, assets)
+        initial = self._capability_flags()
+        flags = dict(initial)
+        item_schema = build_decision_schema(assets)["properties"]["trade_decisions"]["items"]
+        emitted = set()
+        started = loop.time()
+        paused_total = 0.0
+        trace = {"tool_rounds": 0}
+        ok = False
+
+        try:
+            for _ in range(6):
+                self._prepare_round(messages, trace)
+                data = self._build_payload(messages, assets, **flags)
+                self._log_request(data)
+                parser = IncrementalDecisionParser()
+                streamed = StreamedMessage()
+                chunks = self.client.stream(data)
+                content_first = None
+                emitted_before = len(emitted)
                 try:
-                    loaded = json.loads(content)
-                    if isinstance(loaded, dict):
-                        arr = loaded.get("trade_decisions")
-                        if not isinstance(arr, list) and len(loaded) == 1:
-                            v = list(loaded.values())[0]
-                            if isinstance(v, list):
-                                arr = v
-                        if isinstance(arr, list):
-                            return arr
-                    if isinstance(loaded, list):
-                        return loaded
-                except Exception:
-                    pass
-                return []
-            except Exception as se:
-                logging.error(f"Sanitize failed: {se}")
-                return []
-
-        allow_tools = True
-        allow_structured = True
-
-        def _build_schema():
-            base_properties = {
-                "asset": {"type": "string", "enum": assets},
-                "action": {"type": "string", "enum": ["buy", "sell", "hold"]},
-                "allocation_usd": {"type": "number", "minimum": 0},
-                "tp_price": {"type": ["number", "null"]},
-                "sl_price": {"type": ["number", "null"]},
-                "exit_plan": {"type": "string"},
-                "rationale": {"type": "string"},
+                    while True:
+                        timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                        except StopAsyncIteration:
+                            break
+                        text = streamed.add(chunk)
+                        if content_first is None and (text or streamed.tool_calls):
+                            content_first = not streamed.tool_calls
+                        if not text or not content_first or streamed.tool_calls:
+                            continue
+                        for item in parser.feed(text):
+                            decision = _normalize_decision(item)
+                            if decision is None or decision["asset"] not in assets or decision["asset"] in emitted:
+                                continue
+                            if not _valid_decision(decision, item_schema):
+                                continue
+                            emitted.add(decision["asset"])
+                            paused = loop.time()
+                            yield decision
+                            paused = loop.time() - paused
+                            paused_total += paused
+                            if deadline is not None:
+                                deadline += paused
+                except LLMHTTPError as e:
+                    self._log_error(e)
+                    if not emitted and self._relax_request(e, flags):
+                        continue
+                    raise
+                finally:
+                    await chunks.aclose()
+
+                self._record_usage(streamed.usage)
+                self._learn_capabilities(initial, flags)
+                initial = dict(flags)
+                message = streamed.message()
+                messages.append(message)
+                if message.get("tool_calls") and len(emitted) > emitted_before:
+                    # Decisions from this round were already acted on; a tool round now could contradict them
+                    logging.warning("Ignoring tool calls that followed streamed decisions")
+                elif flags["allow_tools"] and message.get("tool_calls"):
+                    trace["tool_rounds"] += 1
+                    messages.extend(await self._run_tool_calls(message["tool_calls"]))
+                    continue
+
+                if len(emitted) < len(assets):
+                    if emitted:
+                        logging.warning(f"Stream produced {len(emitted)}/{len(assets)} decisions; parsing full reply for the rest")
+                    for decision in await self._parse_decisions(message, assets):
+                        asset = decision.get("asset")
+                        if asset in assets and asset not in emitted:
+                            emitted.add(asset)
+                            paused = loop.time()
+                            yield decision
+                            paused_total += loop.time() - paused
+                ok = True
+                return
+
+            ok = True
+            for a in assets:
+                if a not in emitted:
+                    yield _hold(a, "tool loop cap")
+        finally:
+            self.telemetry.record_decision(loop.time() - started - paused_total, trace["tool_rounds"], ok, len(assets),
+                                           trace.get("prompt_tokens"))
+
+    async def close(self):
+        await self.client.close()
+        if self.hedge_client is not None:
+            await self.hedge_client.close()
+        await self.taapi.close()
+
+    def _log_request(self, payload, client=None):
+        # Validate and fix model at runtime
+        original_model = payload.get('model')
+        validated_model = _get_valid_model(original_model)
+        if original_model != validated_model:
+            payload['model'] = validated_model
+            logging.warning(f"Model corrected at runtime: '{original_model}' -> '{validated_model}'")
+            # Also log to file for debugging
+            get_sink("model_corrections.log").write({"event": "model_correction", "from": original_model, "to": validated_model})
+
+        # Log the request payload for debugging (sampled: LLM_LOG_SAMPLE_RATE)
+        client = client or self.client
+        provider_name = client.provider_name
+        logging.info(f"Sending request to {provider_name} (model: {payload.get('model')})")
+        get_sink("llm_requests.log").write({
+            "event": "request",
+            "provider": provider_name,
+            "model": payload.get("model"),
+            "headers": {k: v for k, v in client.headers.items() if k != "Authorization"},
+            # The tool loop keeps appending to messages; log the list as it is now
+            "payload": {**payload, "messages": list(payload.get("messages", []))},
+        }, sampled=True)
+
+    def _log_error(self, e):
+        get_sink("llm_requests.log").write({"event": "error", "status": e.status, "text": e.text})
+
+    async def _post(self, payload, label="decision", client=None):
+        client = client or self.client
+        self._log_request(payload, client)
+        try:
+            resp = await client.post(payload, label=label)
+        except LLMHTTPError as e:
+            self._log_error(e)
+            raise
+        self._record_usage(resp.get("usage"))
+        return resp
+
+    def _record_usage(self, usage):
+        if not usage:
+            return
+        tokens = usage_tokens(usage)
+        self.prompt_cache["requests"] += 1
+        self.prompt_cache["prompt_tokens"] += tokens["prompt_tokens"]
+        self.prompt_cache["cached_tokens"] += tokens["cached_tokens"]
+        logging.info(f"Prompt cache: {tokens['cached_tokens']}/{tokens['prompt_tokens']} prompt tokens cached")
+
+    def prompt_cache_stats(self):
+        """Cumulative prompt-cache hit accounting across all LLM requests."""
+        stats = dict(self.prompt_cache)
+        prompt = stats["prompt_tokens"]
+        stats["hit_rate"] = round(stats["cached_tokens"] / prompt, 4) if prompt else 0.0
+        return stats
+
+    def _initial_messages(self, context, assets):
+        """System policy and a stable asset header first, the per-cycle context last.
+
+        Everything up to the context is byte-identical between cycles (tools and
+        response_format are constant too), so provider prompt caches can reuse it.
+        """
+        stable = (
+            f"## Assets\n{json.dumps(assets)}\n\n"
+            f"## Instructions\nDecide actions for ALL assets: {', '.join(assets)}. Output a STRICT JSON array only.\n\n"
+        )
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": stable + context},
+        ]
+
+    def _build_payload(self, messages, assets, allow_tools=True, allow_structured=True, client=None, model=None):
+        client = client or self.client
+        data = {"model": model or self.model, "messages": messages}
+        # Only use structured outputs for providers that support it (OpenRouter)
+        if allow_structured and client.provider == "openrouter":
+            data["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "trade_decisions",
+                    "strict": True,
+                    "schema": build_decision_schema(assets),
+                },
             }
-            required_keys = ["asset", "action", "allocation_usd", "tp_price", "sl_price", "exit_plan", "rationale"]
-            return {
+        if allow_tools:
+            data["tools"] = TAAPI_TOOLS
+            data["tool_choice"] = "auto"
+        return data
+
+    def _prepare_round(self, messages, trace):
+        """Bound the tool output carried into the next request and record its prompt size."""
+        tool_chars = _compact_tool_history(messages, self.tool_history_chars) if self.tool_history_chars else None
+        tokens = _prompt_tokens(messages)
+        trace.setdefault("prompt_tokens", []).append(tokens)
+        if len(trace["prompt_tokens"]) > 1:
+            logging.info(f"Decision round {len(trace['prompt_tokens'])}: ~{tokens} prompt tokens"
+                         + (f" ({tool_chars} chars of tool output)" if tool_chars is not None else ""))
+
+    def _capability_flags(self, client=None, model=None):
+        """Starting payload flags for this (provider, model), from the capability cache."""
+        return self.capabilities.flags((client or self.client).provider, model or self.model)
+
+    def _learn_capabilities(self, initial, flags, client=None, model=None):
+        """Persist features a successful request had to drop."""
+        if initial != flags:
+            self.capabilities.learn((client or self.client).provider, model or self.model, initial, flags)
+
+    def _relax_request(self, e, flags, client=None):
+        """Drop the request feature a provider rejected; False if nothing is left to drop."""
+        err = e.json()
+        raw = (err.get("error", {}).get("metadata", {}) or {}).get("raw", "")
+        provider = (err.get("error", {}).get("metadata", {}) or {}).get("provider_name", "")
+        # Handle provider-specific errors
+        if e.status == 422 and provider.lower().startswith("xai") and "deserialize" in raw.lower():
+            logging.warning("xAI rejected tool schema; retrying without tools.")
+            if flags["allow_tools"]:
+                flags["allow_tools"] = False
+                return True
+        # Provider may not support structured outputs / response_format
+        err_text = json.dumps(err)
+        if flags["allow_structured"] and ("response_format" in err_text or "structured" in err_text or e.status in (400, 422)):
+            provider_name = (client or self.client).provider_name
+            logging.warning(f"{provider_name} rejected structured outputs; retrying without response_format.")
+            flags["allow_structured"] = False
+            return True
+        return False
+
+    async def _run_tool_calls(self, tool_calls):
+        """Execute a turn's fetch_taapi_indicator calls concurrently.
+
+        At most ``tool_concurrency`` run at once, each bounded by ``tool_timeout``;
+        the returned tool messages keep the order of ``tool_calls``.
+        """
+        semaphore = asyncio.Semaphore(self.tool_concurrency)
+
+        async def run(tc):
+            async with semaphore:
+                return await self._run_tool_call(tc)
+
+        results = await asyncio.gather(*(run(tc) for tc in tool_calls))
+        return [r for r in results if r is not None]
+
+    async def _run_tool_call(self, tc):
+        if not (tc.get("type") == "function" and tc.get("function", {}).get("name") == "fetch_taapi_indicator"):
+            return None
+        try:
+            args = json.loads(tc["function"].get("arguments") or "{}")
+            indicator, symbol, interval, params = _normalize_tool_args(args)
+            fields = [str(f) for f in args.get("fields") or []]
+
+            async def fetch():
+                # Served from the shared candle-aware TAAPI cache when possible
+                ind_resp = await self.taapi.fetch_raw(indicator, symbol, interval, params, priority=PRIORITY_TOOL)
+                return json.dumps(_trim_tool_payload(ind_resp, self.tool_max_points), separators=(",", ":"))
+
+            if self.tool_cache is not None and _is_cacheable_interval(interval):
+                key = json.dumps([indicator, symbol, interval, params], sort_keys=True)
+                pinned = int(params.get("backtrack") or 0) >= 1
+                lookup = self.tool_cache.get_or_fetch(key, interval, fetch, revalidate=not pinned)
+            else:
+                lookup = fetch()
+            content = await asyncio.wait_for(lookup, self.tool_timeout)
+            if fields:
+                content = _select_fields(content, fields)
+        except asyncio.TimeoutError:
+            content = "Error: indicator request timed out"
+        except Exception as ex:
+            content = f"Error: {str(ex)}"
+        return {
+            "role": "tool",
+            "tool_call_id": tc.get("id"),
+            "name": "fetch_taapi_indicator",
+            "content": content,
+        }
+
+    async def _sanitize_to_array(self, raw_content: str, assets_list):
+        """Use a fast model to coerce any content into the exact JSON array schema."""
+        try:
+            schema = {
                 "type": "object",
                 "properties": {
                     "trade_decisions": {
                         "type": "array",
                         "items": {
                             "type": "object",
-                            "properties": base_properties,
-                            "required": required_keys,
+                            "properties": {
+                                "asset": {"type": "string", "enum": assets_list},
+                                "action": {"type": "string", "enum": ["buy", "sell", "hold"]},
+                                "allocation_usd": {"type": "number"},
+                                "tp_price": {"type": ["number", "null"]},
+                                "sl_price": {"type": ["number", "null"]},
+                                "exit_plan": {"type": "string"},
+                                "rationale": {"type": "string"},
+                            },
+                            "required": ["asset", "action", "allocation_usd", "tp_price", "sl_price", "exit_plan", "rationale"],
                             "additionalProperties": False,
                         },
                         "minItems": 1,
@@ -342,149 +764,222 @@ class TradingAgent:
                 "required": ["trade_decisions"],
                 "additionalProperties": False,
             }
-
-        for _ in range(6):
-            data = {"model": self.model, "messages": messages}
+            payload = {
+                "model": self.sanitize_model,
+                "messages": [
+                    {"role": "system", "content": (
+                        "You are a strict JSON normalizer. Return ONLY a JSON array matching the provided JSON Schema. "
+                        "If input is wrapped or has prose/markdown, fix it. Do not add fields."
+                    )},
+                    {"role": "user", "content": raw_content},
+                ],
+                "temperature": 0,
+            }
+            
             # Only use structured outputs for providers that support it (OpenRouter)
-            if allow_structured and self.provider == "openrouter":
-                data["response_format"] = {
+            if self.provider == "openrouter":
+                payload["response_format"] = {
                     "type": "json_schema",
                     "json_schema": {
                         "name": "trade_decisions",
                         "strict": True,
-                        "schema": _build_schema(),
+                        "schema": schema,
                     },
                 }
-            if allow_tools:
-                data["tools"] = tools
-                data["tool_choice"] = "auto"
+            resp = await self._post(payload, label="sanitize")
+            msg = resp.get("choices", [{}])[0].get("message", {})
+            parsed = msg.get("parsed")
+            if isinstance(parsed, list):
+                return parsed
+            if isinstance(parsed, dict):
+                arr = parsed.get("trade_decisions")
+                if not isinstance(arr, list) and len(parsed) == 1:
+                    v = list(parsed.values())[0]
+                    if isinstance(v, list):
+                        arr = v
+                if isinstance(arr, list):
+                    return arr
+            # fallback: try content
+            content = msg.get("content") or "[]"
             try:
-                resp_json = _post(data)
-            except requests.HTTPError as e:
-                try:
-                    err = e.response.json()
-                except Exception:
-                    err = {}
-                raw = (err.get("error", {}).get("metadata", {}) or {}).get("raw", "")
-                provider = (err.get("error", {}).get("metadata", {}) or {}).get("provider_name", "")
-                # Handle provider-specific errors
-                if e.response.status_code == 422 and provider.lower().startswith("xai") and "deserialize" in raw.lower():
-                    logging.warning("xAI rejected tool schema; retrying without tools.")
-                    if allow_tools:
-                        allow_tools = False
-                        continue
-                # Provider may not support structured outputs / response_format
-                err_text = json.dumps(err)
-                if allow_structured and ("response_format" in err_text or "structured" in err_text or e.response.status_code in (400, 422)):
-                    provider_name = "DeepSeek" if self.provider == "deepseek" else "OpenRouter"
-                    logging.warning(f"{provider_name} rejected structured outputs; retrying without response_format.")
-                    allow_structured = False
+                loaded = json.loads(content)
+                if isinstance(loaded, dict):
+                    arr = loaded.get("trade_decisions")
+                    if not isinstance(arr, list) and len(loaded) == 1:
+                        v = list(loaded.values())[0]
+                        if isinstance(v, list):
+                            arr = v
+                    if isinstance(arr, list):
+                        return arr
+                if isinstance(loaded, list):
+                    return loaded
+            except Exception:
+                pass
+            return []
+        except Exception as se:
+            logging.error(f"Sanitize failed: {se}")
+            return []
+
+    async def _parse_decisions(self, message, assets):
+        """Parse a final assistant message into decisions.
+
+        Strict JSON first, then the local repair stage; the sanitizer model is
+        only asked when both fail. ``parse_stats`` counts which path won.
+        """
+        content = message.get("content") or "{}"
+        from_parsed = isinstance(message.get("parsed"), (dict, list))
+        parsed = None
+        parse_failed = False
+        try:
+            # Prefer parsed field from structured outputs if present
+            parsed = message.get("parsed") if from_parsed else json.loads(content)
+        except ValueError as e:
+            parse_failed = True
+            logging.warning(f"JSON parse error: {e}, content: {content[:200]}")
+
+        # Unwrap if provider wrapped the array in a dict (e.g., {"trade_decisions": [...]})
+        if isinstance(parsed, dict):
+            if len(parsed) == 1:
+                key = list(parsed.keys())[0]
+                if isinstance(parsed[key], list):
+                    parsed = parsed[key]
+
+        if isinstance(parsed, list):
+            self.parse_stats["direct"] += 1
+            return [d for d in (_normalize_decision(item) for item in parsed) if d is not None]
+
+        raw = json.dumps(parsed) if from_parsed else content
+        repaired, errors = repair_decisions(raw, build_decision_schema(assets))
+        if repaired:
+            self.parse_stats["repaired"] += 1
+            logging.info(f"Recovered {len(repaired)} decisions locally (parse stats: {self.parse_stats})")
+            return repaired
+
+        logging.error(f"Local repair failed ({'; '.join(errors[:3])}); attempting sanitize")
+        sanitized = await self._sanitize_to_array(raw, assets)
+        if isinstance(sanitized, list) and sanitized:
+            self.parse_stats["sanitized"] += 1
+            logging.info(f"Sanitizer recovered decisions (parse stats: {self.parse_stats})")
+            return sanitized
+        self.parse_stats["failed"] += 1
+        if parse_failed:
+            return [_hold(a, "Parse error") for a in assets]
+        return []
+
+    async def _decide(self, context, assets):
+        started = time.monotonic()
+        trace = {"tool_rounds": 0}
+        ok = False
+        try:
+            if self.hedge_client is not None:
+                decisions = await self._decide_hedged(context, assets, trace)
+            else:
+                decisions = await self._decide_rounds(context, assets, trace)
+            ok = True
+            return decisions
+        finally:
+            self.telemetry.record_decision(time.monotonic() - started, trace["tool_rounds"], ok, len(assets),
+                                           trace.get("prompt_tokens"))
+
+    async def _decide_rounds(self, context, assets, trace, client=None, model=None):
+        messages = self._initial_messages(context, assets)
+        initial = self._capability_flags(client, model)
+        flags = dict(initial)
+
+        for _ in range(6):
+            self._prepare_round(messages, trace)
+            data = self._build_payload(messages, assets, client=client, model=model, **flags)
+            try:
+                resp_json = await self._post(data, client=client)
+            except LLMHTTPError as e:
+                if self._relax_request(e, flags, client):
                     continue
                 raise
+            self._learn_capabilities(initial, flags, client, model)
+            initial = dict(flags)
 
             choice = resp_json["choices"][0]
             message = choice["message"]
             messages.append(message)
 
             tool_calls = message.get("tool_calls") or []
-            if allow_tools and tool_calls:
-                for tc in tool_calls:
-                    if tc.get("type") == "function" and tc.get("function", {}).get("name") == "fetch_taapi_indicator":
-                        args = json.loads(tc["function"].get("arguments") or "{}")
-                        try:
-                            params = {
-                                "secret": self.taapi.api_key,
-                                "exchange": "binance",
-                                "symbol": args["symbol"],
-                                "interval": args["interval"],
-                            }
-                            if args.get("period") is not None:
-                                params["period"] = args["period"]
-                            if args.get("backtrack") is not None:
-                                params["backtrack"] = args["backtrack"]
-                            if isinstance(args.get("other_params"), dict):
-                                params.update(args["other_params"])
-                            ind_resp = requests.get(f"{self.taapi.base_url}{args['indicator']}", params=params).json()
-                            messages.append({
-                                "role": "tool",
-                                "tool_call_id": tc.get("id"),
-                                "name": "fetch_taapi_indicator",
-                                "content": json.dumps(ind_resp),
-                            })
-                        except Exception as ex:
-                            messages.append({
-                                "role": "tool",
-                                "tool_call_id": tc.get("id"),
-                                "name": "fetch_taapi_indicator",
-                                "content": f"Error: {str(ex)}",
-                            })
+            if flags["allow_tools"] and tool_calls:
+                trace["tool_rounds"] += 1
+                messages.extend(await self._run_tool_calls(tool_calls))
                 continue
 
-            try:
-                # Prefer parsed field from structured outputs if present
-                if isinstance(message.get("parsed"), (dict, list)):
-                    parsed = message.get("parsed")
-                else:
-                    content = message.get("content") or "{}"
-                    parsed = json.loads(content)
-                
-                # Unwrap if provider wrapped the array in a dict (e.g., {"trade_decisions": [...]})
-                if isinstance(parsed, dict):
-                    if len(parsed) == 1:
-                        key = list(parsed.keys())[0]
-                        if isinstance(parsed[key], list):
-                            parsed = parsed[key]
-                
-                if isinstance(parsed, list):
-                    result = []
-                    for item in parsed:
-                        if isinstance(item, dict):
-                            item.setdefault("allocation_usd", 0.0)
-                            item.setdefault("tp_price", None)
-                            item.setdefault("sl_price", None)
-                            item.setdefault("exit_plan", "")
-                            item.setdefault("rationale", "")
-                            result.append(item)
-                        elif isinstance(item, list) and len(item) >= 7:
-                            # Handle array format: [asset, action, alloc, tp, sl, exit_plan, rationale]
-                            result.append({
-                                "asset": item[0],
-                                "action": item[1],
-                                "allocation_usd": float(item[2]) if item[2] else 0.0,
-                                "tp_price": float(item[3]) if item[3] and item[3] != "null" else None,
-                                "sl_price": float(item[4]) if item[4] and item[4] != "null" else None,
-                                "exit_plan": item[5] if len(item) > 5 else "",
-                                "rationale": item[6] if len(item) > 6 else ""
-                            })
-                    return result
-                else:
-                    logging.error(f"Expected array, got: {type(parsed)}; attempting sanitize")
-                    sanitized = _sanitize_to_array(content if 'content' in locals() else json.dumps(parsed), assets)
-                    if isinstance(sanitized, list) and sanitized:
-                        return sanitized
-                    return []
-            except Exception as e:
-                logging.error(f"JSON parse error: {e}, content: {content[:200]}")
-                # Try sanitizer as last resort
-                sanitized = _sanitize_to_array(content, assets)
-                if isinstance(sanitized, list) and sanitized:
-                    return sanitized
-                return [{
-                    "asset": a,
-                    "action": "hold",
-                    "allocation_usd": 0.0,
-                    "tp_price": None,
-                    "sl_price": None,
-                    "exit_plan": "",
-                    "rationale": "Parse error"
-                } for a in assets]
-
-        return [{
-            "asset": a,
-            "action": "hold",
-            "allocation_usd": 0.0,
-            "tp_price": None,
-            "sl_price": None,
-            "exit_plan": "",
-            "rationale": "tool loop cap"
-        } for a in assets]
+            return await self._parse_decisions(message, assets)
+
+        return [_hold(a, "tool loop cap") for a in assets]
+
+    def _hedge_delay(self):
+        """Fixed LLM_HEDGE_DELAY, else the p95 of recent decision latencies."""
+        if self.hedge_delay:
+            return self.hedge_delay
+        latencies = self.telemetry.decision_latencies()
+        if len(latencies) < 5:
+            return max(self.hedge_min_delay, self.hedge_initial_delay)
+        return max(self.hedge_min_delay, percentiles(latencies)["p95"])
+
+    def _hedge_allowed(self):
+        budget = max(1, int(self.hedge_max_rate * self._hedge_history.maxlen))
+        return sum(self._hedge_history) < budget
+
+    async def _decide_hedged(self, context, assets, trace):
+        """Race the primary route against a backup fired after the hedge delay.
+
+        The first result that passes schema validation wins and the other request
+        is cancelled. Hedges are capped at ``hedge_max_rate`` of recent decisions.
+        """
+        primary = asyncio.create_task(self._decide_rounds(context, assets, trace))
+        backup = None
+        try:
+            delay = self._hedge_delay()
+            self.hedge_stats["decisions"] += 1
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if primary in done or not self._hedge_allowed():
+                if primary not in done:
+                    self.hedge_stats["rate_capped"] += 1
+                self._hedge_history.append(False)
+                return await primary
+
+            self._hedge_history.append(True)
+            self.hedge_stats["hedged"] += 1
+            logging.info(f"Decision exceeded {delay:.1f}s; hedging with {self.hedge_client.provider_name} ({self.hedge_model})")
+            backup_trace = {"tool_rounds": 0}
+            backup = asyncio.create_task(self._decide_rounds(context, assets, backup_trace, client=self.hedge_client, model=self.hedge_model))
+            pending = {primary, backup}
+            fallback = None
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: t is backup):
+                    if task.exception() is not None:
+                        error = task.exception()
+                        logging.warning(f"{'Hedge' if task is backup else 'Primary'} decision failed: {error}")
+                        continue
+                    decisions = task.result()
+                    if _valid_decisions(decisions, assets):
+                        self.hedge_stats["hedge_wins" if task is backup else "primary_wins"] += 1
+                        if task is backup:
+                            _adopt_trace(trace, backup_trace)
+                        return decisions
+                    if fallback is None:
+                        fallback = decisions
+                        if task is backup:
+                            _adopt_trace(trace, backup_trace)
+            if fallback is not None:
+                return fallback
+            raise error
+        finally:
+            losers = [t for t in (primary, backup) if t is not None and not t.done()]
+            for task in losers:
+                task.cancel()
+            await asyncio.gather(*losers, return_exceptions=True)
+
+    def hedge_summary(self):
+        stats = dict(self.hedge_stats)
+        stats["enabled"] = self.hedge_client is not None
+        stats["win_rate"] = round(stats["hedge_wins"] / stats["hedged"], 4) if stats["hedged"] else 0.0
+        stats["next_delay"] = round(self._hedge_delay(), 3) if self.hedge_client is not None else None
+        return stats
@@ -0,0 +1,248 @@
+import ast
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Common alternative spellings models use for the decision keys
+KEY_ALIASES = {
+    "symbol": "asset",
+    "coin": "asset",
+    "ticker": "asset",
+    "decision": "action",
+    "side": "action",
+    "signal": "action",
+    "allocation": "allocation_usd",
+    "allocation_usdt": "allocation_usd",
+    "size_usd": "allocation_usd",
+    "notional_usd": "allocation_usd",
+    "tp": "tp_price",
+    "take_profit": "tp_price",
+    "take_profit_price": "tp_price",
+    "sl": "sl_price",
+    "stop_loss": "sl_price",
+    "stop_loss_price": "sl_price",
+    "exit": "exit_plan",
+    "exitplan": "exit_plan",
+    "reason": "rationale",
+    "reasoning": "rationale",
+    "explanation": "rationale",
+}
+
+ACTION_ALIASES = {
+    "long": "buy",
+    "open_long": "buy",
+    "short": "sell",
+    "open_short": "sell",
+    "wait": "hold",
+    "none": "hold",
+    "no_action": "hold",
+}
+
+_FENCE_RE = re.compile(r"```[a-zA-Z]*\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",\s*([\]}])")
+
+
+def strip_fences(text: str) -> str:
+    """Return the body of the first markdown code fence, or the text unchanged."""
+    match = _FENCE_RE.search(text)
+    return match.group(1) if match else text
+
+
+def extract_balanced(text: str) -> List[str]:
+    """Every top-level balanced ``[...]``/``{...}`` block in ``text``, arrays first."""
+    blocks = []
+    depth = 0
+    start = None
+    quote = None
+    escape = False
+    for i, ch in enumerate(text):
+        if quote:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'" and depth > 0:
+            quote = ch
+        elif ch in "[{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch in "]}" and depth > 0:
+            depth -= 1
+            if depth == 0:
+                blocks.append(text[start:i + 1])
+    return sorted(blocks, key=lambda b: b[0] != "[")
+
+
+def _pythonize(text: str) -> str:
+    """Map JSON literals to Python ones outside of strings (for ast.literal_eval)."""
+    out = []
+    quote = None
+    escape = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == quote:
+                quote = None
+            i += 1
+            continue
+        if ch in "\"'":
+            quote = ch
+        for word, repl in (("null", "None"), ("true", "True"), ("false", "False")):
+            if text.startswith(word, i) and not (text[i - 1:i].isalnum()) and not text[i + len(word):i + len(word) + 1].isalnum():
+                out.append(repl)
+                i += len(word)
+                break
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def lenient_loads(text: str) -> Any:
+    """json.loads, then without trailing commas, then as a Python literal (single quotes, None)."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return json.loads(_TRAILING_COMMA_RE.sub(r"\1", text))
+    except ValueError:
+        pass
+    return ast.literal_eval(_pythonize(text))
+
+
+def unwrap_decisions(parsed: Any) -> Optional[list]:
+    """The decisions list from a bare array, a wrapper dict, or a single decision object."""
+    if isinstance(parsed, list):
+        return parsed
+    if isinstance(parsed, dict):
+        if isinstance(parsed.get("trade_decisions"), list):
+            return parsed["trade_decisions"]
+        lists = [v for v in parsed.values() if isinstance(v, list)]
+        if len(lists) == 1:
+            return lists[0]
+        if "asset" in {_normalize_key(k) for k in parsed}:
+            return [parsed]
+    return None
+
+
+def _normalize_key(key: Any) -> str:
+    key = str(key).strip().lower().replace("-", "_").replace(" ", "_")
+    return KEY_ALIASES.get(key, key)
+
+
+def _to_number(value: Any) -> Any:
+    if isinstance(value, str):
+        cleaned = value.strip().replace(",", "").replace("$", "")
+        if cleaned.lower() in ("", "null", "none", "n/a"):
+            return None
+        try:
+            return float(cleaned)
+        except ValueError:
+            return value
+    return value
+
+
+def normalize_decision(item: Dict[str, Any], properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Canonical keys and value types for one decision object; unknown keys are dropped."""
+    out: Dict[str, Any] = {}
+    for key, value in item.items():
+        key = _normalize_key(key)
+        if key in properties and key not in out:
+            out[key] = value
+    if isinstance(out.get("asset"), str):
+        out["asset"] = out["asset"].strip().upper().split("/")[0].split("-")[0]
+    if isinstance(out.get("action"), str):
+        action = out["action"].strip().lower().replace(" ", "_")
+        out["action"] = ACTION_ALIASES.get(action, action)
+    for key in ("allocation_usd", "tp_price", "sl_price"):
+        if key in out:
+            out[key] = _to_number(out[key])
+    out.setdefault("allocation_usd", 0.0)
+    if out["allocation_usd"] is None:
+        out["allocation_usd"] = 0.0
+    out.setdefault("tp_price", None)
+    out.setdefault("sl_price", None)
+    out.setdefault("exit_plan", "")
+    out.setdefault("rationale", "")
+    return out
+
+
+_TYPE_CHECKS = {
+    "string": lambda v: isinstance(v, str),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def validate_decision(item: Dict[str, Any], item_schema: Dict[str, Any]) -> List[str]:
+    """Errors for ``item`` against the decision item schema (the subset it uses)."""
+    errors = []
+    properties = item_schema.get("properties", {})
+    for key in item_schema.get("required", []):
+        if key not in item:
+            errors.append(f"missing {key}")
+    for key, value in item.items():
+        spec = properties.get(key)
+        if spec is None:
+            if item_schema.get("additionalProperties") is False:
+                errors.append(f"unexpected {key}")
+            continue
+        types = spec.get("type")
+        types = types if isinstance(types, list) else [types]
+        if not any(_TYPE_CHECKS.get(t, lambda v: True)(value) for t in types):
+            errors.append(f"{key}: expected {'/'.join(types)}, got {value!r}")
+            continue
+        if "enum" in spec and value not in spec["enum"]:
+            errors.append(f"{key}: {value!r} not in {spec['enum']}")
+        if "minimum" in spec and isinstance(value, (int, float)) and value < spec["minimum"]:
+            errors.append(f"{key}: {value} < {spec['minimum']}")
+    return errors
+
+
+def repair_decisions(text: str, schema: Dict[str, Any]) -> Tuple[Optional[List[Dict[str, Any]]], List[str]]:
+    """Deterministically recover decisions from malformed model output.
+
+    Tries the fenced body and every balanced bracket block, parses leniently,
+    normalises keys/values and validates each decision against ``schema``
+    (the ``{"trade_decisions": [...]}`` schema sent as response_format).
+    Returns ``(decisions, [])`` or ``(None, errors)``.
+    """
+    array_schema = schema["properties"]["trade_decisions"]
+    item_schema = array_schema["items"]
+    errors: List[str] = []
+    body = strip_fences(text or "")
+    candidates = [body.strip()] + extract_balanced(body)
+    for candidate in dict.fromkeys(c for c in candidates if c):
+        try:
+            items = unwrap_decisions(lenient_loads(candidate))
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError) as e:
+            errors.append(f"unparseable: {type(e).__name__}")
+            continue
+        if not items or len(items) < array_schema.get("minItems", 0):
+            errors.append("no decisions array")
+            continue
+        decisions = []
+        item_errors = []
+        for item in items:
+            if not isinstance(item, dict):
+                item_errors.append(f"non-object item {item!r:.40}")
+                continue
+            decision = normalize_decision(item, item_schema.get("properties", {}))
+            problems = validate_decision(decision, item_schema)
+            if problems:
+                item_errors.append(f"{decision.get('asset')}: {'; '.join(problems)}")
+            decisions.append(decision)
+        if not item_errors:
+            return decisions, []
+        errors.extend(item_errors)
+    return None, errors
@@ -0,0 +1,72 @@
+import json
+from typing import Any, List, Optional
+
+
+class IncrementalDecisionParser:
+    """Emits each element of a streamed JSON decisions array as soon as it is complete.
+
+    Accepts a bare top-level array or one nested a single level inside a wrapper
+    object (e.g. ``{"trade_decisions": [...]}``). Prose or markdown fences before
+    the JSON are skipped. Elements that fail to parse are counted, not raised; the
+    caller falls back to parsing the full buffered content.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self.done = False
+        self.emitted = 0
+        self.errors = 0
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume the next piece of streamed text; returns newly completed elements."""
+        if self.done or not chunk:
+            return []
+        text = self._text + chunk
+        out: List[Any] = []
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                # Quotes in prose before the JSON starts are not string delimiters
+                self._in_string = self._depth > 0
+            elif ch in "[{":
+                self._depth += 1
+                if self._array_depth is None:
+                    if ch == "[" and self._depth <= 2:
+                        self._array_depth = self._depth
+                elif self._depth == self._array_depth + 1:
+                    self._item_start = i
+            elif ch in "]}":
+                if self._array_depth is not None and self._depth == self._array_depth + 1 and self._item_start is not None:
+                    try:
+                        out.append(json.loads(text[self._item_start:i + 1]))
+                        self.emitted += 1
+                    except ValueError:
+                        self.errors += 1
+                    self._item_start = None
+                elif self._array_depth is not None and self._depth == self._array_depth:
+                    self.done = True
+                    i += 1
+                    break
+                self._depth = max(0, self._depth - 1)
+            i += 1
+        # Only the unfinished element needs to be kept around
+        keep = self._item_start if self._item_start is not None else i
+        self._text = text[keep:]
+        self._pos = i - keep
+        if self._item_start is not None:
+            self._item_start = 0
+        return out
@@ -0,0 +1,351 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+from src.config_loader import CONFIG
+from src.utils.async_bridge import drop_stale
+
+
+class LLMHTTPError(Exception):
+    """Non-200 response from the LLM provider after retries are exhausted."""
+
+    def __init__(self, status: int, text: str, provider_name: str = ""):
+        super().__init__(f"{provider_name} HTTP {status}: {text[:500]}")
+        self.status = status
+        self.text = text
+        self.provider_name = provider_name
+
+    def json(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.text)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+
+def usage_tokens(usage: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """Normalise a provider ``usage`` block into prompt/completion/cached token counts.
+
+    DeepSeek reports prompt-cache hits as ``prompt_cache_hit_tokens``; OpenAI-style
+    providers (OpenRouter) as ``prompt_tokens_details.cached_tokens``.
+    """
+    usage = usage or {}
+    details = usage.get("prompt_tokens_details") or {}
+    cached = usage.get("prompt_cache_hit_tokens")
+    if cached is None:
+        cached = details.get("cached_tokens")
+    return {
+        "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+        "completion_tokens": int(usage.get("completion_tokens") or 0),
+        "cached_tokens": int(cached or 0),
+        "reasoning_tokens": int((usage.get("completion_tokens_details") or {}).get("reasoning_tokens") or 0),
+    }
+
+
+class StreamedMessage:
+    """Reassembles an assistant message from streamed chat-completion chunks."""
+
+    def __init__(self):
+        self.role = "assistant"
+        self.content_parts: List[str] = []
+        self.tool_calls: Dict[int, Dict[str, Any]] = {}
+        self.finish_reason: Optional[str] = None
+        self.usage: Optional[Dict[str, Any]] = None
+
+    def add(self, chunk: Dict[str, Any]) -> str:
+        """Merge one chunk; returns the content text it added (may be empty)."""
+        if chunk.get("usage"):
+            self.usage = chunk["usage"]
+        choices = chunk.get("choices") or []
+        if not choices:
+            return ""
+        choice = choices[0]
+        if choice.get("finish_reason"):
+            self.finish_reason = choice["finish_reason"]
+        # Providers that ignore ``stream`` answer with a complete message
+        delta = choice.get("delta") or choice.get("message") or {}
+        if delta.get("role"):
+            self.role = delta["role"]
+        for tc in delta.get("tool_calls") or []:
+            slot = self.tool_calls.setdefault(tc.get("index", len(self.tool_calls)), {
+                "id": None, "type": "function", "function": {"name": "", "arguments": ""},
+            })
+            if tc.get("id"):
+                slot["id"] = tc["id"]
+            if tc.get("type"):
+                slot["type"] = tc["type"]
+            fn = tc.get("function") or {}
+            if fn.get("name"):
+                slot["function"]["name"] += fn["name"]
+            if fn.get("arguments"):
+                slot["function"]["arguments"] += fn["arguments"]
+        text = delta.get("content") or ""
+        if text:
+            self.content_parts.append(text)
+        return text
+
+    @property
+    def content(self) -> str:
+        return "".join(self.content_parts)
+
+    def message(self) -> Dict[str, Any]:
+        message: Dict[str, Any] = {"role": self.role, "content": self.content}
+        if self.tool_calls:
+            message["tool_calls"] = [self.tool_calls[i] for i in sorted(self.tool_calls)]
+        return message
+
+
+class LLMClient:
+    """Asyncio-native chat-completions client with a pooled keep-alive session.
+
+    Retries use asyncio.sleep, so the event loop (API server, exit checks) keeps
+    running while a request is outstanding; cancelling the awaiting task aborts
+    the in-flight request.
+    """
+
+    def __init__(self, provider: str, api_key: str, base_url: str, referer: Optional[str] = None,
+                 app_title: Optional[str] = None, timeout: float = 90.0, max_retries: int = 3):
+        self.provider = provider
+        self.api_key = api_key
+        self.base_url = base_url
+        self.referer = referer
+        self.app_title = app_title
+        self.timeout = timeout
+        self.max_retries = max_retries
+        # Optional LLMTelemetry; receives one record per request
+        self.telemetry = None
+        # Optional ReplayStore: "record" saves every exchange, "replay" answers from disk
+        self.replay = None
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+
+    @classmethod
+    def from_config(cls, provider: str) -> "LLMClient":
+        """Build a client for "deepseek" or "openrouter" from CONFIG."""
+        timeout = float(CONFIG.get("llm_request_timeout") or 90)
+        if provider == "deepseek":
+            api_key = CONFIG["deepseek_api_key"]
+            if not api_key:
+                raise RuntimeError("DEEPSEEK_API_KEY is required when LLM_PROVIDER=deepseek")
+            return cls(provider, api_key, f"{CONFIG['deepseek_base_url']}/chat/completions", timeout=timeout)
+        api_key = CONFIG["openrouter_api_key"]
+        if not api_key:
+            raise RuntimeError("OPENROUTER_API_KEY is required when LLM_PROVIDER=openrouter")
+        return cls(
+            provider,
+            api_key,
+            f"{CONFIG['openrouter_base_url']}/chat/completions",
+            referer=CONFIG.get("openrouter_referer"),
+            app_title=CONFIG.get("openrouter_app_title"),
+            timeout=timeout,
+        )
+
+    @property
+    def provider_name(self) -> str:
+        return "DeepSeek" if self.provider == "deepseek" else "OpenRouter"
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        if self.referer:
+            headers["HTTP-Referer"] = self.referer
+        if self.app_title:
+            headers["X-Title"] = self.app_title
+        return headers
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            drop_stale(self._sessions)
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, keepalive_timeout=120),
+                # Per-read rather than total: a streamed body may legitimately outlast it
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=min(10.0, self.timeout), sock_read=self.timeout),
+            )
+            self._sessions[loop] = session
+        return session
+
+    async def close(self):
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def post(self, payload: Dict[str, Any], label: str = "decision") -> Dict[str, Any]:
+        """POST a chat-completions payload with retry/backoff; returns the JSON body."""
+        record = self._new_record(payload, label, stream=False)
+        try:
+            if self.replay is not None and self.replay.mode == "replay":
+                data = await self.replay.replay_post(payload, record)
+            else:
+                try:
+                    data = await self._post_with_retry(payload, record)
+                except LLMHTTPError as e:
+                    self._save_exchange(payload, label, record, error=e)
+                    raise
+                self._save_exchange(payload, label, record, response=data)
+            record["ok"] = True
+            record["usage"] = data.get("usage")
+            return data
+        except BaseException as e:
+            record["error"] = "cancelled" if isinstance(e, asyncio.CancelledError) else type(e).__name__
+            raise
+        finally:
+            self._finish_record(record)
+
+    def _new_record(self, payload: Dict[str, Any], label: str, stream: bool) -> Dict[str, Any]:
+        return {
+            "ts": time.time(), "provider": self.provider, "model": payload.get("model"), "label": label,
+            "stream": stream, "ok": False, "retries": 0, "ttfb": None, "status": None, "started": time.monotonic(),
+        }
+
+    def _save_exchange(self, payload: Dict[str, Any], label: str, record: Dict[str, Any], **result):
+        if self.replay is None or self.replay.mode != "record":
+            return
+        try:
+            self.replay.save(payload, label, time.monotonic() - record["started"], record.get("ttfb"), **result)
+        except OSError as e:
+            logging.warning(f"Could not record LLM exchange: {e}")
+
+    def _finish_record(self, record: Dict[str, Any]):
+        record["latency"] = round(time.monotonic() - record.pop("started"), 3)
+        if self.telemetry is not None:
+            self.telemetry.record_request(record)
+
+    async def _post_with_retry(self, payload: Dict[str, Any], record: Dict[str, Any]) -> Dict[str, Any]:
+        provider_name = self.provider_name
+        session = self._get_session()
+        for attempt in range(self.max_retries):
+            last_attempt = attempt == self.max_retries - 1
+            record["retries"] = attempt
+            try:
+                logging.info(f"Making {provider_name} request (attempt {attempt + 1}/{self.max_retries})")
+                attempt_start = time.monotonic()
+                async with session.post(self.base_url, headers=self.headers, json=payload) as resp:
+                    record["ttfb"] = round(time.monotonic() - attempt_start, 3)
+                    record["status"] = resp.status
+                    text = await resp.text()
+                    logging.info(f"Received response from {provider_name} (status: {resp.status})")
+                    if resp.status == 200:
+                        return json.loads(text)
+                    logging.error(f"{provider_name} error: {resp.status} - {text}")
+                    if last_attempt:
+                        raise LLMHTTPError(resp.status, text, provider_name)
+                    # Client errors (bad schema, unsupported params) will not fix themselves
+                    if resp.status in (400, 401, 403, 404, 422):
+                        raise LLMHTTPError(resp.status, text, provider_name)
+                logging.warning("Retrying request in 5 seconds...")
+                await asyncio.sleep(5)
+            except asyncio.TimeoutError:
+                logging.warning(f"Request timeout on attempt {attempt + 1}/{self.max_retries}")
+                if last_attempt:
+                    logging.error("All retry attempts failed due to timeout")
+                    raise
+                logging.warning("Retrying request in 10 seconds...")
+                await asyncio.sleep(10)
+            except aiohttp.ClientConnectionError:
+                logging.warning(f"Connection error on attempt {attempt + 1}/{self.max_retries}")
+                if last_attempt:
+                    logging.error("All retry attempts failed due to connection error")
+                    raise
+                logging.warning("Retrying request in 5 seconds...")
+                await asyncio.sleep(5)
+            except ValueError as e:
+                # A 200 with a truncated or non-JSON body (e.g. from a proxy) is usually transient
+                logging.warning(f"Invalid JSON body on attempt {attempt + 1}/{self.max_retries}: {e}")
+                if last_attempt:
+                    logging.error("All retry attempts returned invalid JSON")
+                    raise
+                logging.warning("Retrying request in 5 seconds...")
+                await asyncio.sleep(5)
+        raise RuntimeError("Max retries exceeded")
+
+    async def stream(self, payload: Dict[str, Any], label: str = "decision") -> AsyncIterator[Dict[str, Any]]:
+        """POST with ``stream: true`` and yield each server-sent chunk as a dict.
+
+        Failures before the first chunk are retried like ``post``; once data has
+        been yielded a failure is raised, since a retry would replay output.
+        Time to first byte is measured to the first data chunk.
+        """
+        record = self._new_record(payload, label, stream=True)
+        replaying = self.replay is not None and self.replay.mode == "replay"
+        chunks = None if replaying or self.replay is None else []
+        try:
+            source = self.replay.replay_stream(payload, record) if replaying else self._stream_with_retry(payload, record)
+            try:
+                async for chunk in source:
+                    if chunk.get("usage"):
+                        record["usage"] = chunk["usage"]
+                    if chunks is not None:
+                        chunks.append(chunk)
+                    yield chunk
+            except LLMHTTPError as e:
+                if chunks is not None and not chunks:
+                    self._save_exchange(payload, label, record, error=e)
+                raise
+            record["ok"] = True
+            if chunks is not None:
+                self._save_exchange(payload, label, record, chunks=chunks)
+        except BaseException as e:
+            record["error"] = "cancelled" if isinstance(e, (asyncio.CancelledError, GeneratorExit)) else type(e).__name__
+            raise
+        finally:
+            self._finish_record(record)
+
+    async def _stream_with_retry(self, payload: Dict[str, Any], record: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        provider_name = self.provider_name
+        # include_usage adds a final chunk with token counts (incl. prompt-cache hits)
+        payload = dict(payload, stream=True, stream_options={"include_usage": True})
+        session = self._get_session()
+        for attempt in range(self.max_retries):
+            last_attempt = attempt == self.max_retries - 1
+            record["retries"] = attempt
+            started = False
+            try:
+                logging.info(f"Making streaming {provider_name} request (attempt {attempt + 1}/{self.max_retries})")
+                attempt_start = time.monotonic()
+                async with session.post(self.base_url, headers=self.headers, json=payload) as resp:
+                    record["status"] = resp.status
+                    if resp.status == 200:
+                        if "text/event-stream" not in resp.headers.get("Content-Type", ""):
+                            body = json.loads(await resp.text())
+                            record["ttfb"] = round(time.monotonic() - attempt_start, 3)
+                            started = True
+                            yield body
+                            return
+                        async for line in resp.content:
+                            line = line.decode("utf-8", errors="replace").strip()
+                            # Blank lines separate events; ':' lines are keep-alive comments
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[5:].strip()
+                            if data == "[DONE]":
+                                return
+                            chunk = json.loads(data)
+                            if chunk.get("error"):
+                                code = chunk["error"].get("code")
+                                raise LLMHTTPError(code if isinstance(code, int) else 502, data, provider_name)
+                            if not started:
+                                record["ttfb"] = round(time.monotonic() - attempt_start, 3)
+                                started = True
+                            yield chunk
+                        return
+                    text = await resp.text()
+                    logging.error(f"{provider_name} error: {resp.status} - {text}")
+                    if last_attempt or resp.status in (400, 401, 403, 404, 422):
+                        raise LLMHTTPError(resp.status, text, provider_name)
+                logging.warning("Retrying request in 5 seconds...")
+                await asyncio.sleep(5)
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) as e:
+                logging.warning(f"Stream failed on attempt {attempt + 1}/{self.max_retries}: {type(e).__name__}")
+                if started or last_attempt:
+                    raise
+                logging.warning("Retrying request in 5 seconds...")
+                await asyncio.sleep(5)
+        raise RuntimeError("Max retries exceeded")
@@ -0,0 +1,152 @@
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+# "close after 4 hours", "reassess the trade in 2h", "max hold 90 min", "time stop 90m" ...
+# A duration only counts when an exit verb or phrase introduces it: "trend intact for 4h" is not a deadline.
+_DEADLINE_RE = re.compile(
+    r"(?:\b(?:exit\w*|clos(?:e|es|ing)|flatten\w*|unwind\w*|reassess\w*|re-?evaluat\w*|review\w*)(?:\s+[a-z]+){0,2}?\s+(?:in|by|after|within)"
+    r"|\bmax(?:imum)?(?:\s+hold(?:ing)?(?:\s+time)?)?(?:\s+of)?|\btime[\s-]?stop(?:\s+(?:of|in|after))?)\s+"
+    r"(\d+(?:\.\d+)?)\s*(minutes?|mins?|m|hours?|hrs?|h|days?|d)\b",
+    re.IGNORECASE,
+)
+_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def exit_deadline(trade: Dict[str, Any]) -> Optional[float]:
+    """Epoch seconds at which a time-based exit plan ("close after 4h") is due, if any."""
+    match = _DEADLINE_RE.search(str(trade.get("exit_plan") or ""))
+    opened_at = trade.get("opened_at")
+    if not match or not opened_at:
+        return None
+    try:
+        opened = datetime.fromisoformat(opened_at).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return opened + float(match.group(1)) * _UNIT_SECONDS[match.group(2)[0].lower()]
+
+
+def sampled_atr(prices: Iterable[Any], period: int = 14) -> Optional[float]:
+    """Average absolute change between the last ``period`` price samples (ATR stand-in without highs/lows)."""
+    values = [v for v in (_number(p) for p in prices) if v is not None][-(period + 1):]
+    if len(values) < 3:
+        return None
+    moves = [abs(b - a) for a, b in zip(values, values[1:])]
+    return sum(moves) / len(moves)
+
+
+def regime_flags(ema20=None, ema50=None, rsi=None, macd=None) -> Dict[str, str]:
+    """Coarse indicator regime: trend (EMA20 vs EMA50), RSI zone and MACD sign."""
+    flags = {}
+    ema20, ema50, rsi, macd = _number(ema20), _number(ema50), _number(rsi), _number(macd)
+    if ema20 is not None and ema50 is not None:
+        flags["trend"] = "up" if ema20 >= ema50 else "down"
+    if rsi is not None:
+        flags["rsi"] = "overbought" if rsi >= 70 else "oversold" if rsi <= 30 else "neutral"
+    if macd is not None:
+        flags["macd"] = "positive" if macd >= 0 else "negative"
+    return flags
+
+
+class MaterialityGate:
+    """Skips the LLM call when nothing material changed since the last decision.
+
+    Each cycle the loop builds one snapshot per asset (price, ATR, regime flags,
+    position size, resting orders, exit-plan deadline). Snapshots are compared
+    against the ones taken when the LLM last decided; if every asset moved less
+    than ``atr_threshold`` ATRs (``price_pct`` percent when no ATR is known), no
+    flag flipped, positions/orders are unchanged, no exit deadline came due and
+    every previous decision was a hold, those holds are reused. After
+    ``max_skips`` consecutive reuses the LLM is called regardless.
+    """
+
+    def __init__(self, atr_threshold: float = 0.5, price_pct: float = 0.5, max_skips: int = 6, horizon: float = 0.0):
+        self.atr_threshold = atr_threshold
+        self.price_pct = price_pct
+        self.max_skips = max_skips
+        self.horizon = horizon
+        self._baseline: Optional[Dict[str, Dict[str, Any]]] = None
+        self._baseline_at = 0.0
+        self._decisions: Dict[str, Dict[str, Any]] = {}
+        self.skips = 0
+        self.last_reasons: List[str] = []
+        self.stats = {"evaluated": 0, "skipped": 0, "forced": 0}
+
+    @staticmethod
+    def snapshot(price, atr=None, flags=None, position=0.0, orders=(), deadline=None) -> Dict[str, Any]:
+        return {
+            "price": _number(price),
+            "atr": _number(atr),
+            "flags": dict(flags or {}),
+            "position": round(_number(position) or 0.0, 8),
+            "orders": tuple(sorted(str(o) for o in orders)),
+            "deadline": deadline,
+        }
+
+    def evaluate(self, snapshots: Dict[str, Dict[str, Any]], assets: List[str], now: Optional[float] = None) -> List[str]:
+        """Reasons the current state is material (empty when the previous holds can be reused)."""
+        now = time.time() if now is None else now
+        if self._baseline is None:
+            return ["no previous decision"]
+        if self.skips >= self.max_skips:
+            return [f"forced refresh after {self.skips} skipped cycles"]
+        reasons = []
+        for asset in assets:
+            current, base = snapshots.get(asset), self._baseline.get(asset)
+            previous = self._decisions.get(asset)
+            if not current or not base:
+                reasons.append(f"{asset}: no snapshot")
+                continue
+            if not previous or previous.get("action") != "hold":
+                reasons.append(f"{asset}: previous decision was {previous.get('action') if previous else 'missing'}")
+            if current["price"] is None or base["price"] is None:
+                reasons.append(f"{asset}: no price")
+            else:
+                move = abs(current["price"] - base["price"])
+                atr = base["atr"] or current["atr"]
+                if atr:
+                    if move / atr >= self.atr_threshold:
+                        reasons.append(f"{asset}: price moved {move / atr:.2f} ATR")
+                elif base["price"] and move / base["price"] * 100 >= self.price_pct:
+                    reasons.append(f"{asset}: price moved {move / base['price'] * 100:.2f}%")
+            if current["flags"] != base["flags"]:
+                changed = sorted(k for k in set(current["flags"]) | set(base["flags"]) if current["flags"].get(k) != base["flags"].get(k))
+                reasons.append(f"{asset}: regime changed ({', '.join(changed)})")
+            if current["position"] != base["position"]:
+                reasons.append(f"{asset}: position changed")
+            if current["orders"] != base["orders"]:
+                reasons.append(f"{asset}: open orders changed")
+            deadline = current["deadline"]
+            if deadline is not None and deadline > self._baseline_at and deadline <= now + self.horizon:
+                reasons.append(f"{asset}: exit-plan deadline due")
+        return reasons
+
+    def reuse(self, snapshots: Dict[str, Dict[str, Any]], assets: List[str], now: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+        """The previous hold decisions if nothing is material, else None (call the LLM)."""
+        self.stats["evaluated"] += 1
+        self.last_reasons = self.evaluate(snapshots, assets, now)
+        if self.last_reasons:
+            if self.last_reasons[0].startswith("forced refresh"):
+                self.stats["forced"] += 1
+            return None
+        self.skips += 1
+        self.stats["skipped"] += 1
+        return [dict(self._decisions[a]) for a in assets]
+
+    def record(self, snapshots: Dict[str, Dict[str, Any]], decisions: List[Dict[str, Any]], now: Optional[float] = None):
+        """Make the snapshots taken for a fresh LLM decision the new baseline."""
+        self._baseline = {k: dict(v) for k, v in snapshots.items()}
+        self._baseline_at = time.time() if now is None else now
+        self._decisions = {d.get("asset"): dict(d) for d in decisions if isinstance(d, dict) and d.get("asset")}
+        self.skips = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {**self.stats, "consecutive_skips": self.skips, "last_reasons": list(self.last_reasons)}
@@ -0,0 +1,168 @@
+import math
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Table columns: (key in the per-asset row, header, formatter kind)
+COLUMNS = [
+    ("price", "px", "price"),
+    ("ema20", "ema20", "price"),
+    ("macd", "macd", "osc"),
+    ("rsi7", "rsi7", "rsi"),
+    ("rsi14", "rsi14", "rsi"),
+    ("oi", "oi", "int"),
+    ("funding_apr", "fund%yr", "pct"),
+    ("ema20_4h", "ema20_4h", "price"),
+    ("ema50_4h", "ema50_4h", "price"),
+    ("atr3_4h", "atr3_4h", "price"),
+    ("atr14_4h", "atr14_4h", "price"),
+]
+
+# Series: (key, label, formatter kind); intraday unless suffixed _4h. Series show the
+# shape of the move, so they carry one digit less than the current values in the table.
+SERIES = [
+    ("mids", "mid", "series_price"),
+    ("ema20_series", "ema20", "series_price"),
+    ("macd_series", "macd", "series_osc"),
+    ("rsi7_series", "rsi7", "series_rsi"),
+    ("rsi14_series", "rsi14", "series_rsi"),
+    ("macd_4h_series", "macd_4h", "series_osc"),
+    ("rsi14_4h_series", "rsi14_4h", "series_rsi"),
+]
+
+# Degradation ladder, tried in order until the prompt fits the token budget
+LEVELS = [
+    {"series": 10, "history": 10, "rationale": 80, "orders": 50, "fills": 20},
+    {"series": 6, "history": 6, "rationale": 40, "orders": 20, "fills": 10},
+    {"series": 3, "history": 3, "rationale": 0, "orders": 10, "fills": 5},
+    {"series": 0, "history": 0, "rationale": 0, "orders": 5, "fills": 0},
+]
+
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Local BPE-ish estimate: ~4 letters or 3 digits per token, one per symbol."""
+    total = 0
+    for piece in _TOKEN_RE.findall(text or ""):
+        if piece[0].isalpha():
+            total += math.ceil(len(piece) / 4)
+        elif piece[0].isdigit():
+            total += math.ceil(len(piece) / 3)
+        else:
+            total += 1
+    return total
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _sig(value: float, digits: int) -> str:
+    """``digits`` significant figures without exponent notation or trailing zeros."""
+    if value == 0:
+        return "0"
+    decimals = max(0, digits - 1 - int(math.floor(math.log10(abs(value)))))
+    text = f"{value:.{decimals}f}"
+    return text.rstrip("0").rstrip(".") if "." in text else text
+
+
+def format_value(value: Any, kind: str) -> str:
+    """Fixed precision per field kind; missing values render as "-"."""
+    number = _number(value)
+    if number is None:
+        return "-"
+    if kind == "rsi":
+        return f"{number:.1f}"
+    if kind == "series_rsi":
+        return f"{number:.0f}"
+    if kind == "pct":
+        return f"{number:.2f}"
+    if kind == "int":
+        return f"{number:.0f}"
+    if kind == "osc":
+        return _sig(number, 4)
+    if kind == "series_osc":
+        return _sig(number, 3)
+    if kind == "series_price":
+        return _sig(number, 5)
+    return _sig(number, 6)
+
+
+class PromptEncoder:
+    """Renders the per-cycle context compactly and shrinks it to a token budget.
+
+    Market data becomes one table row per asset plus short comma-separated
+    series; the account section keeps its summary, positions and exit plans
+    verbatim and trims recent history, open orders and fills. ``fit`` walks
+    ``LEVELS`` (shorter series, fewer rows, shorter rationales) until the
+    estimated token count is within ``token_budget`` (0 = no budget).
+    """
+
+    def __init__(self, token_budget: int = 0):
+        self.token_budget = token_budget
+
+    @staticmethod
+    def header() -> str:
+        return "asset|" + "|".join(h for _, h, _ in COLUMNS)
+
+    @staticmethod
+    def row(asset: str, data: Dict[str, Any]) -> str:
+        return f"{asset}|" + "|".join(format_value(data.get(key), kind) for key, _, kind in COLUMNS)
+
+    @staticmethod
+    def series(asset: str, data: Dict[str, Any], length: int) -> List[str]:
+        if length <= 0:
+            return []
+        lines = []
+        for key, label, kind in SERIES:
+            values = list(data.get(key) or [])[-length:]
+            if values:
+                lines.append(f"{asset} {label}: " + ",".join(format_value(v, kind) for v in values))
+        return lines
+
+    def asset_block(self, asset: str, data: Dict[str, Any], level: Optional[Dict[str, int]] = None) -> str:
+        """Self-contained block for one asset (used when assets are decided in groups)."""
+        level = level or LEVELS[0]
+        return "\n".join([self.header(), self.row(asset, data)] + self.series(asset, data, level["series"])) + "\n"
+
+    def market(self, assets: Sequence[str], rows: Dict[str, Dict[str, Any]], level: Optional[Dict[str, int]] = None) -> str:
+        level = level or LEVELS[0]
+        present = [a for a in assets if a in rows]
+        lines = ["Snapshot (intraday 5m unless suffixed _4h; fund%yr = annualized funding):", self.header()]
+        lines += [self.row(a, rows[a]) for a in present]
+        series = [line for a in present for line in self.series(a, rows[a], level["series"])]
+        if series:
+            lines += [f"Series (oldest->newest, last {level['series']}):"] + series
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def account(head: str, history: List[Dict[str, Any]], orders: List[str], fills: List[str],
+                level: Optional[Dict[str, int]] = None) -> str:
+        level = level or LEVELS[0]
+        parts = [head.rstrip("\n") + "\n"]
+        if level["history"]:
+            parts.append(f"\nRecent Trading History (last {level['history']} decisions):\n")
+            for entry in history[-level["history"]:]:
+                line = f"{entry.get('timestamp', '')} - {entry.get('asset', '')}: {entry.get('action', '')}"
+                rationale = str(entry.get("rationale") or "")[:level["rationale"]]
+                parts.append(f"{line} - {rationale}\n" if rationale else f"{line}\n")
+        parts.append("\nActive Open Orders:\n" + "".join(f"{o}\n" for o in orders[:level["orders"]]))
+        if len(orders) > level["orders"]:
+            parts.append(f"(+{len(orders) - level['orders']} more)\n")
+        if level["fills"]:
+            parts.append(f"\nRecent Fills (latest {level['fills']}):\n" + "".join(f"{f}\n" for f in fills[-level["fills"]:]))
+        return "".join(parts)
+
+    def fit(self, render: Callable[[Dict[str, int]], str]) -> Tuple[str, Dict[str, Any]]:
+        """First rendering (most detailed first) that fits the budget, with its token estimate."""
+        text, tokens = "", 0
+        for index, level in enumerate(LEVELS):
+            text = render(level)
+            tokens = estimate_tokens(text)
+            if not self.token_budget or tokens <= self.token_budget:
+                return text, {"level": index, "tokens": tokens, "over_budget": False}
+        return text, {"level": len(LEVELS) - 1, "tokens": tokens, "over_budget": True}
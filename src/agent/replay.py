@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from src.config_loader import CONFIG
+from src.agent.llm_client import LLMHTTPError, StreamedMessage
+
+# Per-cycle text that changes on every invocation (timestamps, counters in the
+# "## Invocation" section) is masked so the same prompt maps to the same key.
+_VOLATILE = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:[+-]\d{2}:\d{2}|Z)?"), "<ts>"),
+    (re.compile(r"It has been \d+ minutes"), "It has been <n> minutes"),
+    (re.compile(r"invoked \d+ times"), "invoked <n> times"),
+]
+
+
+class ReplayMiss(LookupError):
+    """Replay mode found no recorded response for a request."""
+
+
+def _mask(text: Any) -> Any:
+    if not isinstance(text, str):
+        return text
+    for pattern, repl in _VOLATILE:
+        text = pattern.sub(repl, text)
+    return text.strip()
+
+
+def normalize_request(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of a chat payload that determine the reply: model, messages, tools, schema.
+
+    Transport options (stream flags) and provider-assigned tool-call ids are left out.
+    """
+    messages = []
+    for m in payload.get("messages") or []:
+        item = {"role": m.get("role"), "content": _mask(m.get("content"))}
+        if m.get("tool_calls"):
+            item["tool_calls"] = [[(tc.get("function") or {}).get("name"), (tc.get("function") or {}).get("arguments")]
+                                  for tc in m["tool_calls"]]
+        messages.append(item)
+    return {
+        "model": payload.get("model"),
+        "messages": messages,
+        "tools": payload.get("tools"),
+        "tool_choice": payload.get("tool_choice"),
+        "response_format": payload.get("response_format"),
+    }
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    canonical = json.dumps(normalize_request(payload), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def body_from_chunks(chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """A non-streaming response body equivalent to a recorded stream."""
+    streamed = StreamedMessage()
+    for chunk in chunks:
+        streamed.add(chunk)
+    body: Dict[str, Any] = {"choices": [{"index": 0, "message": streamed.message(), "finish_reason": streamed.finish_reason}]}
+    if streamed.usage:
+        body["usage"] = streamed.usage
+    return body
+
+
+class ReplayStore:
+    """Content-addressed store of LLM exchanges for offline, deterministic runs.
+
+    ``record`` mode saves every request/response (or provider error) under the
+    hash of the normalised request, with its latency; ``replay`` mode answers
+    from the store without network access, sleeping ``latency_scale`` times the
+    recorded latency (0 answers immediately). Streamed and non-streamed
+    recordings are interchangeable.
+    """
+
+    def __init__(self, path: str = "llm_replay", mode: str = "record", latency_scale: float = 0.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unsupported replay mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self.stats = {"recorded": 0, "hits": 0, "misses": 0}
+
+    @classmethod
+    def from_config(cls) -> Optional["ReplayStore"]:
+        """Store for LLM_REPLAY_MODE=record|replay, or None when off."""
+        mode = (CONFIG.get("llm_replay_mode") or "off").lower()
+        if mode == "off":
+            return None
+        return cls(CONFIG.get("llm_replay_dir") or "llm_replay", mode,
+                   float(CONFIG.get("llm_replay_latency_scale") or 0))
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f"{key}.json")
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._entry_path(key), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        """Recorded entries in recording order (from the index)."""
+        try:
+            with open(os.path.join(self.path, "index.jsonl"), "r") as f:
+                keys = [json.loads(line)["key"] for line in f if line.strip()]
+        except FileNotFoundError:
+            return
+        for key in dict.fromkeys(keys):
+            entry = self.load(key)
+            if entry:
+                yield entry
+
+    def save(self, payload: Dict[str, Any], label: str, latency: float, ttfb: Optional[float] = None,
+             response: Optional[Dict[str, Any]] = None, chunks: Optional[List[Dict[str, Any]]] = None,
+             error: Optional[LLMHTTPError] = None):
+        key = request_key(payload)
+        entry = {
+            "key": key, "label": label, "recorded_at": time.time(), "latency": round(latency, 3), "ttfb": ttfb,
+            "request": normalize_request(payload),
+        }
+        if error is not None:
+            entry["error"] = {"status": error.status, "text": error.text, "provider_name": error.provider_name}
+        elif chunks is not None:
+            entry["chunks"] = chunks
+        else:
+            entry["response"] = response
+        path = self._entry_path(key)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(entry, f, separators=(",", ":"))
+            os.replace(f"{path}.tmp", path)
+            with open(os.path.join(self.path, "index.jsonl"), "a") as f:
+                f.write(json.dumps({"key": key, "label": label, "ts": entry["recorded_at"]}) + "\n")
+            self.stats["recorded"] += 1
+
+    def lookup(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        key = request_key(payload)
+        entry = self.load(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            raise ReplayMiss(f"No recorded LLM response for request {key[:12]} (model {payload.get('model')})")
+        self.stats["hits"] += 1
+        return entry
+
+    async def _delay(self, seconds: Optional[float]):
+        if self.latency_scale > 0 and seconds:
+            await asyncio.sleep(seconds * self.latency_scale)
+
+    async def replay_post(self, payload: Dict[str, Any], record: Dict[str, Any]) -> Dict[str, Any]:
+        entry = self.lookup(payload)
+        await self._delay(entry.get("latency"))
+        record["ttfb"] = entry.get("ttfb")
+        if entry.get("error"):
+            record["status"] = entry["error"]["status"]
+            raise LLMHTTPError(**entry["error"])
+        record["status"] = 200
+        return entry["response"] if "response" in entry else body_from_chunks(entry["chunks"])
+
+    async def replay_stream(self, payload: Dict[str, Any], record: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        entry = self.lookup(payload)
+        latency = entry.get("latency") or 0.0
+        ttfb = entry.get("ttfb") if entry.get("ttfb") is not None else latency
+        await self._delay(ttfb)
+        record["ttfb"] = entry.get("ttfb")
+        if entry.get("error"):
+            record["status"] = entry["error"]["status"]
+            raise LLMHTTPError(**entry["error"])
+        record["status"] = 200
+        chunks = entry.get("chunks") or [entry["response"]]
+        # Spread the rest of the recorded latency over the chunks
+        gap = max(0.0, latency - ttfb) / max(1, len(chunks) - 1) if len(chunks) > 1 else 0.0
+        for i, chunk in enumerate(chunks):
+            if i:
+                await self._delay(gap)
+            yield chunk
+
+    def summary(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "path": self.path, "latency_scale": self.latency_scale, **self.stats}
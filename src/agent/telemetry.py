@@ -0,0 +1,158 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from src.config_loader import CONFIG
+from src.agent.llm_client import usage_tokens
+
+# USD per 1M tokens: uncached input, cached input, output. Override with LLM_PRICE_TABLE (JSON).
+DEFAULT_PRICES = {
+    "deepseek-chat": {"input": 0.27, "cached_input": 0.07, "output": 1.10},
+    "deepseek-reasoner": {"input": 0.55, "cached_input": 0.14, "output": 2.19},
+    "deepseek/deepseek-chat-v3.1": {"input": 0.27, "cached_input": 0.07, "output": 1.10},
+    "x-ai/grok-4": {"input": 3.00, "cached_input": 0.75, "output": 15.00},
+    "x-ai/grok-4-fast": {"input": 0.20, "cached_input": 0.05, "output": 0.50},
+    "openai/gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "openai/gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "openai/gpt-3.5-turbo": {"input": 0.50, "cached_input": 0.50, "output": 1.50},
+    "anthropic/claude-sonnet-4": {"input": 3.00, "cached_input": 0.30, "output": 15.00},
+}
+
+
+def price_table() -> Dict[str, Dict[str, float]]:
+    prices = dict(DEFAULT_PRICES)
+    override = CONFIG.get("llm_price_table")
+    if override:
+        try:
+            prices.update(json.loads(override))
+        except ValueError:
+            logging.warning("Ignoring LLM_PRICE_TABLE: not valid JSON")
+    return prices
+
+
+def estimate_cost(model: str, tokens: Dict[str, int], prices: Optional[Dict[str, Dict[str, float]]] = None) -> Optional[float]:
+    """Estimated USD cost of one request, or None when the model has no price entry."""
+    price = (prices or price_table()).get(model)
+    if not price:
+        return None
+    cached = tokens.get("cached_tokens", 0)
+    uncached = max(0, tokens.get("prompt_tokens", 0) - cached)
+    cost = (
+        uncached * price["input"]
+        + cached * price.get("cached_input", price["input"])
+        + tokens.get("completion_tokens", 0) * price["output"]
+    ) / 1_000_000
+    return round(cost, 6)
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Nearest-rank p50/p90/p95/p99 and mean of ``values``."""
+    if not values:
+        return {"p50": None, "p90": None, "p95": None, "p99": None, "mean": None}
+    ordered = sorted(values)
+
+    def rank(q):
+        return round(ordered[min(len(ordered) - 1, max(0, -(-len(ordered) * q // 100) - 1))], 3)
+
+    return {"p50": rank(50), "p90": rank(90), "p95": rank(95), "p99": rank(99),
+            "mean": round(sum(ordered) / len(ordered), 3)}
+
+
+class LLMTelemetry:
+    """Rolling per-request and per-decision LLM metrics.
+
+    ``record_request`` is fed by LLMClient (one entry per logical request, after
+    retries); ``record_decision`` by TradingAgent (one entry per decision, covering
+    all tool rounds). Percentiles are computed over the last ``window`` entries,
+    totals over the whole run.
+    """
+
+    def __init__(self, window: int = 500):
+        self.prices = price_table()
+        self._requests: deque = deque(maxlen=window)
+        self._decisions: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.totals = {"requests": 0, "errors": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                       "cached_tokens": 0, "reasoning_tokens": 0, "cost_usd": 0.0, "decisions": 0}
+
+    def record_request(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Complete ``record`` (model, label, ok, latency, ttfb, retries, usage) and store it."""
+        usage = record.pop("usage", None) or {}
+        tokens = usage_tokens(usage)
+        record.update(tokens)
+        # OpenRouter reports the billed cost when usage accounting is on
+        cost = usage.get("cost")
+        if cost is None:
+            cost = estimate_cost(record.get("model") or "", tokens, self.prices)
+        record["cost_usd"] = cost
+        with self._lock:
+            self._requests.append(record)
+            self.totals["requests"] += 1
+            self.totals["errors"] += 0 if record.get("ok") else 1
+            self.totals["retries"] += record.get("retries", 0)
+            for key in ("prompt_tokens", "completion_tokens", "cached_tokens", "reasoning_tokens"):
+                self.totals[key] += tokens[key]
+            self.totals["cost_usd"] = round(self.totals["cost_usd"] + (cost or 0.0), 6)
+        logging.info(
+            f"LLM {record.get('label', 'request')} {record.get('model')}: "
+            f"{'ok' if record.get('ok') else record.get('error', 'error')} in {record.get('latency', 0):.2f}s "
+            f"(ttfb {record.get('ttfb') or 0:.2f}s, {tokens['prompt_tokens']}+{tokens['completion_tokens']} tokens, "
+            f"{tokens['cached_tokens']} cached, retries {record.get('retries', 0)})"
+        )
+        return record
+
+    def record_decision(self, latency: float, tool_rounds: int, ok: bool, assets: int = 0,
+                        prompt_tokens: Optional[List[int]] = None):
+        """``prompt_tokens``: estimated prompt size of each round of the tool loop."""
+        with self._lock:
+            self._decisions.append({"ts": time.time(), "latency": round(latency, 3), "tool_rounds": tool_rounds,
+                                    "ok": ok, "assets": assets, "prompt_tokens": list(prompt_tokens or [])})
+            self.totals["decisions"] += 1
+
+    def decision_latencies(self) -> List[float]:
+        """Latencies of recent successful decisions."""
+        with self._lock:
+            return [d["latency"] for d in self._decisions if d["ok"]]
+
+    def recent(self, n: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._requests)[-n:]
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = list(self._requests)
+            decisions = list(self._decisions)
+            totals = dict(self.totals)
+        ok = [r for r in requests if r.get("ok")]
+        by_model: Dict[str, Dict[str, Any]] = {}
+        for model in sorted({r.get("model") for r in requests if r.get("model")}):
+            rows = [r for r in requests if r.get("model") == model]
+            rows_ok = [r for r in rows if r.get("ok")]
+            by_model[model] = {
+                "requests": len(rows),
+                "errors": len(rows) - len(rows_ok),
+                "latency": percentiles([r["latency"] for r in rows_ok]),
+                "ttfb": percentiles([r["ttfb"] for r in rows_ok if r.get("ttfb") is not None]),
+                "cost_usd": round(sum(r.get("cost_usd") or 0.0 for r in rows), 6),
+            }
+        return {
+            "window": len(requests),
+            "totals": totals,
+            "latency": percentiles([r["latency"] for r in ok]),
+            "ttfb": percentiles([r["ttfb"] for r in ok if r.get("ttfb") is not None]),
+            "prompt_tokens": percentiles([r["prompt_tokens"] for r in ok]),
+            "completion_tokens": percentiles([r["completion_tokens"] for r in ok]),
+            "retries": percentiles([r.get("retries", 0) for r in requests]),
+            "by_model": by_model,
+            "decisions": {
+                "window": len(decisions),
+                "latency": percentiles([d["latency"] for d in decisions if d["ok"]]),
+                "tool_rounds": percentiles([d["tool_rounds"] for d in decisions]),
+                "first_round_tokens": percentiles([d["prompt_tokens"][0] for d in decisions if d["prompt_tokens"]]),
+                "last_round_tokens": percentiles([d["prompt_tokens"][-1] for d in decisions if d["prompt_tokens"]]),
+                "errors": sum(1 for d in decisions if not d["ok"]),
+            },
+        }
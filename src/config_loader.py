@@ -48,6 +48,18 @@ def _get_valid_model() -> str:
 
 CONFIG = {
     "taapi_api_key": _get_env("TAAPI_API_KEY"),  # Optional when using Binance indicators
+    # TAAPI bulk limits (plan dependent): constructs per POST /bulk and indicators per construct
+    "taapi_bulk_max_constructs": _get_env("TAAPI_BULK_MAX_CONSTRUCTS", "1"),
+    "taapi_bulk_max_indicators": _get_env("TAAPI_BULK_MAX_INDICATORS", "20"),
+    "taapi_max_concurrency": _get_env("TAAPI_MAX_CONCURRENCY", "5"),  # Concurrent in-flight TAAPI requests
+    # TAAPI response cache: entries expire at the next candle close of their interval
+    "taapi_cache_enabled": _get_env("TAAPI_CACHE_ENABLED", "true"),  # false also disables the bulk prefetch
+    "taapi_cache_revalidate_seconds": _get_env("TAAPI_CACHE_REVALIDATE_SECONDS", "0"),  # >0: serve forming-bar values stale while refreshing
+    "taapi_cache_grace_seconds": _get_env("TAAPI_CACHE_GRACE_SECONDS", "2"),
+    # TAAPI request budget: plan limits per 15s window (free/basic/pro/expert) or explicit override
+    "taapi_plan": _get_env("TAAPI_PLAN", "basic"),
+    "taapi_rate_limit": _get_env("TAAPI_RATE_LIMIT"),  # requests per 15s; overrides TAAPI_PLAN
+    "taapi_burst": _get_env("TAAPI_BURST"),  # max back-to-back requests (default: a third of the limit)
     "hyperliquid_private_key": _get_env("HYPERLIQUID_PRIVATE_KEY") or _get_env("LIGHTER_PRIVATE_KEY"),
     "mnemonic": _get_env("MNEMONIC"),
     # Hyperliquid network/base URL overrides
@@ -62,7 +74,7 @@ CONFIG = {
     "binance_futures_leverage": _get_env("BINANCE_FUTURES_LEVERAGE", "5.0"),
     "binance_futures_margin_type": _get_env("BINANCE_FUTURES_MARGIN_TYPE", "ISOLATED"),
     # Trading platform selection
-    "trading_platform": _get_env("TRADING_PLATFORM", "hyperliquid"),  # "hyperliquid" or "binance"
+    "trading_platform": _get_env("TRADING_PLATFORM", "hyperliquid"),  # "hyperliquid", "binance" or "simulated" (load tests)
     # LLM Configuration
     "llm_provider": _get_env("LLM_PROVIDER", "deepseek"),  # "openrouter" or "deepseek"
     # OpenRouter Configuration (when LLM_PROVIDER="openrouter")
@@ -74,6 +86,56 @@ CONFIG = {
     "deepseek_api_key": _get_env("DEEPSEEK_API_KEY"),
     "deepseek_base_url": _get_env("DEEPSEEK_BASE_URL", "https://api.deepseek.com"),
     "llm_model": _get_valid_model(),
+    "llm_request_timeout": _get_env("LLM_REQUEST_TIMEOUT", "90"),  # seconds without data on an HTTP read
+    "llm_decision_timeout": _get_env("LLM_DECISION_TIMEOUT", "300"),  # seconds for a whole decision (tool rounds + retries); 0 = no limit
+    "llm_stream": _get_env("LLM_STREAM", "false"),  # stream completions; execute each asset's decision as soon as it is complete
+    "llm_tool_concurrency": _get_env("LLM_TOOL_CONCURRENCY", "4"),  # tool calls of one turn executed in parallel
+    "llm_tool_timeout": _get_env("LLM_TOOL_TIMEOUT", "20"),  # seconds per tool call; 0 = no limit
+    "llm_tool_cache_enabled": _get_env("LLM_TOOL_CACHE_ENABLED", "true"),  # reuse tool results until the candle closes
+    "llm_tool_max_points": _get_env("LLM_TOOL_MAX_POINTS", "10"),  # latest values kept per series in tool results
+    "llm_tool_history_chars": _get_env("LLM_TOOL_HISTORY_CHARS", "8000"),  # tool output resent per tool-loop round; 0 = unbounded
+    "llm_telemetry_window": _get_env("LLM_TELEMETRY_WINDOW", "500"),  # recent requests kept for latency percentiles
+    "llm_price_table": _get_env("LLM_PRICE_TABLE"),  # JSON {model: {input, cached_input, output}} USD per 1M tokens
+    # Hedged decisions: after a delay, race a backup provider/model and keep the first valid answer
+    "llm_hedge_enabled": _get_env("LLM_HEDGE_ENABLED", "false"),
+    "llm_hedge_provider": _get_env("LLM_HEDGE_PROVIDER"),  # default: the other provider
+    "llm_hedge_model": _get_env("LLM_HEDGE_MODEL"),
+    "llm_hedge_delay": _get_env("LLM_HEDGE_DELAY", "0"),  # seconds; 0 = p95 of recent decision latency
+    "llm_hedge_min_delay": _get_env("LLM_HEDGE_MIN_DELAY", "5"),
+    "llm_hedge_initial_delay": _get_env("LLM_HEDGE_INITIAL_DELAY", "30"),  # until enough latency samples exist
+    "llm_hedge_max_rate": _get_env("LLM_HEDGE_MAX_RATE", "0.25"),  # max share of the last 20 decisions that may hedge
+    "llm_shard_size": _get_env("LLM_SHARD_SIZE", "0"),  # assets per decision request (0 = all in one)
+    "llm_shard_token_budget": _get_env("LLM_SHARD_TOKEN_BUDGET", "0"),  # est. market-data tokens per request (0 = off)
+    "llm_shard_concurrency": _get_env("LLM_SHARD_CONCURRENCY", "4"),
+    "llm_materiality_enabled": _get_env("LLM_MATERIALITY_ENABLED", "false"),
+    "llm_materiality_atr": _get_env("LLM_MATERIALITY_ATR", "0.5"),  # price move (in ATRs) that forces an LLM call
+    "llm_materiality_price_pct": _get_env("LLM_MATERIALITY_PRICE_PCT", "0.5"),  # fallback when no ATR is known
+    "llm_materiality_max_skips": _get_env("LLM_MATERIALITY_MAX_SKIPS", "6"),  # forced refresh after N reused cycles
+    "llm_capability_cache_path": _get_env("LLM_CAPABILITY_CACHE_PATH", "llm_capabilities.json"),  # empty = memory only
+    "llm_capability_ttl": _get_env("LLM_CAPABILITY_TTL", "86400"),  # seconds a learned rejection is trusted
+    "log_max_bytes": _get_env("LOG_MAX_BYTES", "10000000"),  # rotate llm_requests/prompts logs at this size
+    "log_rotate_seconds": _get_env("LOG_ROTATE_SECONDS", "0"),  # also rotate by age (0 = size only)
+    "log_backups": _get_env("LOG_BACKUPS", "5"),  # gzipped rotated files kept per log
+    "llm_log_sample_rate": _get_env("LLM_LOG_SAMPLE_RATE", "1.0"),  # share of full payloads/prompts written
+    "llm_replay_mode": _get_env("LLM_REPLAY_MODE", "off"),  # off | record | replay
+    "llm_replay_dir": _get_env("LLM_REPLAY_DIR", "llm_replay"),
+    "llm_replay_latency_scale": _get_env("LLM_REPLAY_LATENCY_SCALE", "0"),  # 1 = original latency, 0 = instant
+    "llm_prompt_compact": _get_env("LLM_PROMPT_COMPACT", "false"),  # tabular market data instead of prose
+    "llm_prompt_token_budget": _get_env("LLM_PROMPT_TOKEN_BUDGET", "0"),  # est. tokens; compact prompts degrade to fit
+    "gather_concurrency": _get_env("GATHER_CONCURRENCY", "10"),  # assets whose market data is fetched at once
+    "gather_asset_timeout": _get_env("GATHER_ASSET_TIMEOUT", "30"),  # seconds per asset; 0 = no limit
+    "pipeline_prefetch_lead": _get_env("PIPELINE_PREFETCH_LEAD", "10"),  # seconds before a tick the next snapshot is read; 0 = at the tick
+    "cycle_align": _get_env("CYCLE_ALIGN", "true"),  # start cycles on candle closes of INTERVAL (false = INTERVAL after the previous cycle)
+    "cycle_offset": _get_env("CYCLE_OFFSET", "5"),  # seconds after the close; keep above TAAPI_CACHE_GRACE_SECONDS
+    "cycle_overrun": _get_env("CYCLE_OVERRUN", "coalesce"),  # skip | coalesce missed ticks after a long cycle
+    "event_triggers_enabled": _get_env("EVENT_TRIGGERS_ENABLED", "false"),  # wake the loop early between ticks
+    "event_trigger_atr": _get_env("EVENT_TRIGGER_ATR", "1.0"),  # price move (in sampled ATRs) that triggers a cycle
+    "event_trigger_price_pct": _get_env("EVENT_TRIGGER_PRICE_PCT", "1.0"),  # fallback when no ATR is known
+    "event_trigger_liq_pct": _get_env("EVENT_TRIGGER_LIQ_PCT", "5.0"),  # position this close (percent) to liquidation
+    "event_trigger_debounce": _get_env("EVENT_TRIGGER_DEBOUNCE", "10"),  # seconds a condition must persist
+    "event_trigger_min_spacing": _get_env("EVENT_TRIGGER_MIN_SPACING", "120"),  # min seconds between LLM cycles
+    "event_trigger_poll": _get_env("EVENT_TRIGGER_POLL", "15"),  # seconds between price/fill/position reads
+    "simulated_latency": _get_env("SIMULATED_LATENCY", "0"),  # seconds per read on TRADING_PLATFORM=simulated
     # Runtime controls via env
     "assets": _get_env("ASSETS"),  # e.g., "BTC ETH SOL" or "BTC,ETH,SOL"
     "interval": _get_env("INTERVAL"),  # e.g., "5m", "1h"
@@ -4,6 +4,7 @@ import aiohttp
 from typing import Dict, List, Optional, Any
 import time
 from src.config_loader import CONFIG
+from src.utils.async_bridge import drop_stale, run_sync
 
 class BinanceIndicators:
     """Binance-based technical indicators client using Binance's klines API."""
@@ -14,6 +15,27 @@ class BinanceIndicators:
         
         if self.testnet:
             self.base_url = "https://testnet.binance.vision"
+        
+        # One pooled session per event loop (aiohttp sessions are loop-bound): the
+        # application loop and the sync-facade background loop each get their own.
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session for the running loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            # Drop (and close) sessions whose loops have gone away
+            drop_stale(self._sessions)
+            session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+            self._sessions[loop] = session
+        return session
+    
+    async def close(self):
+        """Close the session bound to the running loop."""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
     
     async def _make_request(self, endpoint: str, params: Dict = None) -> Dict[str, Any]:
         """Make HTTP request to Binance API."""
@@ -24,12 +46,12 @@ class BinanceIndicators:
         
         for attempt in range(3):
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, params=params, timeout=10) as response:
-                        if response.status != 200:
-                            error_text = await response.text()
-                            raise aiohttp.ClientError(f"HTTP {response.status}: {error_text}")
-                        return await response.json()
+                session = self._get_session()
+                async with session.get(url, params=params) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        raise aiohttp.ClientError(f"HTTP {response.status}: {error_text}")
+                    return await response.json()
             except Exception as e:
                 if attempt == 2:  # Last attempt
                     raise e
@@ -284,19 +306,19 @@ class BinanceIndicators:
     def get_historical_indicator(self, indicator: str, symbol: str, interval: str, results: int = 10, params: Dict = None) -> List[Dict[str, Any]]:
         """Get historical indicator data (synchronous wrapper)."""
         try:
-            # Run async method synchronously
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # If we're already in an async context, we need to handle this differently
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(asyncio.run, self.fetch_series(indicator, symbol, interval, results, params))
-                    values = future.result()
-            else:
-                values = asyncio.run(self.fetch_series(indicator, symbol, interval, results, params))
-            
+            values = run_sync(self.fetch_series(indicator, symbol, interval, results, params))
             # Format as expected by the existing code
             return [{"value": val} for val in values]
         except Exception as e:
             logging.error(f"Error getting historical indicator {indicator}: {e}")
             return []
+    
+    # Sync facade: thin wrappers that run the async API on the shared background loop.
+    def get_indicators_sync(self, asset: str, interval: str) -> Dict[str, Any]:
+        return run_sync(self.get_indicators(asset, interval))
+    
+    def fetch_series_sync(self, indicator: str, symbol: str, interval: str, results: int = 10, params: Dict = None, value_key: str = "value") -> List[float]:
+        return run_sync(self.fetch_series(indicator, symbol, interval, results=results, params=params, value_key=value_key))
+    
+    def fetch_value_sync(self, indicator: str, symbol: str, interval: str, params: Dict = None, key: str = "value") -> Optional[float]:
+        return run_sync(self.fetch_value(indicator, symbol, interval, params=params, key=key))
@@ -0,0 +1,54 @@
+import asyncio
+import random
+from typing import Any, Dict, Optional
+
+from src.config_loader import CONFIG
+
+
+class SimulatedIndicators:
+    """Synthetic indicator values for load tests (TRADING_PLATFORM=simulated).
+
+    Nothing goes over the network: every read answers after ``latency`` seconds.
+    Price-like indicators (EMA, SMA, Bollinger bands) sit around the simulated
+    exchange's last price; RSI and MACD are random in plausible ranges.
+    """
+
+    def __init__(self, market, latency: Optional[float] = None, seed: Optional[int] = None):
+        self.market = market
+        self.latency = float(CONFIG.get("simulated_latency") or 0) if latency is None else latency
+        self._rng = random.Random(seed)
+
+    def _value(self, indicator: str, symbol: str) -> float:
+        price = self.market.mid(symbol.split("/")[0])
+        if indicator == "rsi":
+            return round(self._rng.uniform(30, 70), 4)
+        if indicator == "macd":
+            return round(self._rng.gauss(0.0, price * 0.001), 4)
+        return round(price * (1 + self._rng.gauss(0.0, 0.002)), 4)
+
+    async def get_indicators(self, asset: str, interval: str) -> Dict[str, Any]:
+        await asyncio.sleep(self.latency)
+        symbol = f"{asset}/USDT"
+        price = self.market.mid(asset)
+        macd = self._value("macd", symbol)
+        return {
+            "rsi": self._value("rsi", symbol),
+            "macd": {"valueMACD": macd, "valueMACDSignal": round(macd * 0.8, 4), "valueMACDHist": round(macd * 0.2, 4)},
+            "sma": self._value("sma", symbol),
+            "ema": self._value("ema", symbol),
+            "bbands": {"valueUpperBand": round(price * 1.02, 4), "valueMiddleBand": round(price, 4),
+                       "valueLowerBand": round(price * 0.98, 4)},
+        }
+
+    async def fetch_series(self, indicator: str, symbol: str, interval: str, results: int = 10,
+                           params: Optional[dict] = None, value_key: str = "value") -> list:
+        await asyncio.sleep(self.latency)
+        return [self._value(indicator, symbol) for _ in range(results)]
+
+    async def fetch_value(self, indicator: str, symbol: str, interval: str, params: Optional[dict] = None,
+                          key: str = "value"):
+        await asyncio.sleep(self.latency)
+        return self._value(indicator, symbol)
+
+    async def close(self):
+        pass
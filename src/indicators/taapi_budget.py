@@ -0,0 +1,168 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from src.config_loader import CONFIG
+
+# Lower value = served first
+PRIORITY_LOOP = 0   # per-cycle indicator gathering
+PRIORITY_EXIT = 1   # exit-plan checks
+PRIORITY_TOOL = 2   # LLM tool calls
+
+# Requests allowed per 15-second window by TAAPI plan
+PLAN_LIMITS = {
+    "free": 1,
+    "basic": 5,
+    "pro": 30,
+    "expert": 75,
+}
+
+_current_priority: contextvars.ContextVar[int] = contextvars.ContextVar("taapi_priority", default=PRIORITY_LOOP)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """Tag TAAPI requests made inside this block (and tasks it spawns) with a priority."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> int:
+    return _current_priority.get()
+
+
+class RequestBudgeter:
+    """Plan-aware TAAPI request budget with priority queueing and burst smoothing.
+
+    A sliding window enforces the hard plan limit (``max_requests`` per ``window``
+    seconds); a token bucket refilled at the plan rate spreads grants out so bursts
+    do not spend the whole window at once. Waiters are served strictly by priority,
+    then FIFO. Safe to share between event loops (the sync facade uses its own loop).
+    """
+
+    def __init__(self, max_requests: int, window: float = 15.0, burst: Optional[int] = None):
+        self.max_requests = max(1, int(max_requests))
+        self.window = float(window)
+        self.rate = self.max_requests / self.window
+        self.burst = max(1, min(self.max_requests, int(burst) if burst else -(-self.max_requests // 3)))
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._grants: deque = deque()
+        self._queue: list = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.granted = 0
+        self.throttled = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(float(self.burst), self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+        while self._grants and now - self._grants[0] >= self.window:
+            self._grants.popleft()
+
+    def _delay_until_capacity(self, now: float) -> float:
+        """Seconds until one more request may be granted (0 if available now)."""
+        delays = [max(0.0, self._paused_until - now)]
+        if len(self._grants) >= self.max_requests:
+            delays.append(self._grants[0] + self.window - now)
+        if self._tokens < 1:
+            delays.append((1 - self._tokens) / self.rate)
+        return max(delays)
+
+    async def acquire(self, priority: Optional[int] = None):
+        """Wait until this request may be sent."""
+        priority = current_priority() if priority is None else priority
+        entry = (priority, next(self._seq))
+        start = time.monotonic()
+        with self._lock:
+            heapq.heappush(self._queue, entry)
+        waited = False
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    self._refill(now)
+                    delay = self._delay_until_capacity(now)
+                    if self._queue[0] == entry and delay <= 0:
+                        heapq.heappop(self._queue)
+                        self._tokens -= 1
+                        self._grants.append(now)
+                        self.granted += 1
+                        if waited:
+                            self.throttled += 1
+                            self.total_wait += now - start
+                        return
+                # Someone ahead of us (or no capacity yet): poll again shortly
+                waited = True
+                await asyncio.sleep(min(max(delay, 0.01), 0.25) if self._queue[0] == entry else max(delay, 0.02))
+        except BaseException:
+            with self._lock:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+            raise
+
+    def penalize(self, retry_after: Optional[float] = None):
+        """Record a 429 and pause all grants for retry_after (default: one window)."""
+        with self._lock:
+            self.rate_limited += 1
+            pause = float(retry_after) if retry_after else self.window
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            self._tokens = 0.0
+        logging.warning(f"TAAPI rate limited (429); pausing requests for {pause:.1f}s")
+
+    def projected_completion(self, pending: int) -> float:
+        """Estimated seconds to send ``pending`` more requests behind the current queue."""
+        if pending <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            total = pending + len(self._queue)
+            paused = max(0.0, self._paused_until - now)
+            available = 0 if paused else min(int(self._tokens), self.max_requests - len(self._grants))
+        remaining = total - max(0, available)
+        if remaining <= 0:
+            return round(paused, 2)
+        return round(paused + remaining / self.rate, 2)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "limit": f"{self.max_requests}/{self.window:g}s",
+                "granted": self.granted,
+                "throttled": self.throttled,
+                "rate_limited": self.rate_limited,
+                "queued": len(self._queue),
+                "avg_wait": round(self.total_wait / self.throttled, 3) if self.throttled else 0.0,
+            }
+
+
+_SHARED_BUDGETER: Optional[RequestBudgeter] = None
+
+
+def shared_budgeter() -> RequestBudgeter:
+    """Process-wide budgeter: every TAAPIClient counts against the same plan limit."""
+    global _SHARED_BUDGETER
+    if _SHARED_BUDGETER is None:
+        plan = (CONFIG.get("taapi_plan") or "basic").lower()
+        limit = CONFIG.get("taapi_rate_limit") or PLAN_LIMITS.get(plan)
+        if limit is None:
+            logging.warning(f"Unknown TAAPI_PLAN '{plan}', assuming basic limits")
+            limit = PLAN_LIMITS["basic"]
+        burst = CONFIG.get("taapi_burst")
+        _SHARED_BUDGETER = RequestBudgeter(int(limit), burst=int(burst) if burst else None)
+    return _SHARED_BUDGETER
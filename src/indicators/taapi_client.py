@@ -1,106 +1,332 @@
-import requests
-import os
-import time
+import asyncio
+import aiohttp
+import json
 import logging
 from src.config_loader import CONFIG
+from src.utils.async_bridge import drop_stale, run_sync
+from src.utils.candle_cache import CandleCache
+from src.indicators.taapi_budget import RequestBudgeter, shared_budgeter, current_priority
+
+
+def _indicator_key(indicator: str, symbol: str, interval: str, params: dict | None = None) -> str:
+    """Canonical identity of an indicator request (secret/exchange excluded, params sorted)."""
+    clean = {k: v for k, v in (params or {}).items() if k not in ("secret", "exchange", "symbol", "interval") and v is not None}
+    return json.dumps([indicator.lower(), symbol.upper(), interval, clean], sort_keys=True, separators=(",", ":"))
+
+
+def _is_forming_bar(params: dict | None) -> bool:
+    """True unless the request is pinned to closed bars via backtrack>=1."""
+    try:
+        return int((params or {}).get("backtrack") or 0) < 1
+    except (TypeError, ValueError):
+        return True
+
+
+# Indicators get_indicators reads at the trading interval
+INDICATOR_NAMES = ("rsi", "macd", "sma", "ema", "bbands")
+
+_SHARED_CACHE: CandleCache | None = None
+
+
+def shared_cache() -> CandleCache:
+    """Process-wide TAAPI response cache shared by the main loop and LLM tool calls."""
+    global _SHARED_CACHE
+    if _SHARED_CACHE is None:
+        _SHARED_CACHE = CandleCache(
+            revalidate_after=float(CONFIG.get("taapi_cache_revalidate_seconds") or 0),
+            close_grace=float(CONFIG.get("taapi_cache_grace_seconds") or 2),
+        )
+    return _SHARED_CACHE
+
 
 class TAAPIClient:
-    def __init__(self):
+    """Asyncio-native TAAPI client with a pooled session and bounded concurrency.
+
+    The async methods are the primary API; *_sync wrappers (and get_historical_indicator)
+    run them on the shared background loop for scripts.
+    """
+
+    def __init__(self, cache: CandleCache | None = None, budgeter: RequestBudgeter | None = None):
         self.api_key = CONFIG.get("taapi_api_key")
         if not self.api_key:
             raise ValueError("TAAPI_API_KEY is required when using TAAPI indicators")
         self.base_url = "https://api.taapi.io/"
+        self.exchange = "binance"
+        self.bulk_max_constructs = max(1, int(CONFIG.get("taapi_bulk_max_constructs") or 1))
+        self.bulk_max_indicators = max(1, int(CONFIG.get("taapi_bulk_max_indicators") or 20))
+        self.max_concurrency = max(1, int(CONFIG.get("taapi_max_concurrency") or 5))
+        # Candle-close-aware response cache, keyed by _indicator_key
+        cache_enabled = str(CONFIG.get("taapi_cache_enabled") or "true").lower() == "true"
+        self.cache = cache or (shared_cache() if cache_enabled else None)
+        # Plan-aware request budget shared by every client in the process
+        self.budgeter = budgeter or shared_budgeter()
+        # Session and semaphore are loop-bound, so keep one pair per event loop
+        self._pools: dict[asyncio.AbstractEventLoop, tuple[aiohttp.ClientSession, asyncio.Semaphore]] = {}
 
-    def _get_with_retry(self, url, params, retries=3, backoff=0.5):
-        """GET with exponential backoff retry."""
+    def _get_pool(self) -> tuple[aiohttp.ClientSession, asyncio.Semaphore]:
+        """Return the pooled session and concurrency semaphore for the running loop."""
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None or pool[0].closed:
+            drop_stale(self._pools, session_of=lambda pool: pool[0])
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=30),
+            )
+            pool = (session, asyncio.Semaphore(self.max_concurrency))
+            self._pools[loop] = pool
+        return pool
+
+    async def close(self):
+        """Close the session bound to the running loop."""
+        pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None and not pool[0].closed:
+            await pool[0].close()
+
+    async def _request_with_retry(self, method, url, params=None, body=None, timeout=10, retries=3, backoff=0.5, priority=None):
+        """HTTP request within the plan budget, retrying 429s, 5xx and timeouts (non-blocking)."""
+        session, semaphore = self._get_pool()
+        label = "TAAPI bulk" if body is not None else "TAAPI"
+        priority = current_priority() if priority is None else priority
         for attempt in range(retries):
             try:
-                resp = requests.get(url, params=params, timeout=10)
-                resp.raise_for_status()
-                return resp.json()
-            except requests.HTTPError as e:
-                if e.response.status_code >= 500 and attempt < retries - 1:
+                await self.budgeter.acquire(priority)
+                async with semaphore:
+                    async with session.request(method, url, params=params, json=body,
+                                               timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                        if resp.status == 429:
+                            retry_after = resp.headers.get("Retry-After")
+                            self.budgeter.penalize(float(retry_after) if retry_after and retry_after.replace(".", "", 1).isdigit() else None)
+                        resp.raise_for_status()
+                        return await resp.json(content_type=None)
+            except aiohttp.ClientResponseError as e:
+                if e.status == 429 and attempt < retries - 1:
+                    # The budgeter pause delays the next acquire(); no extra sleep needed
+                    continue
+                if e.status >= 500 and attempt < retries - 1:
                     wait = backoff * (2 ** attempt)
-                    logging.warning(f"TAAPI {e.response.status_code}, retrying in {wait}s")
-                    time.sleep(wait)
+                    logging.warning(f"{label} {e.status}, retrying in {wait}s")
+                    await asyncio.sleep(wait)
                 else:
                     raise
-            except requests.Timeout as e:
+            except asyncio.TimeoutError:
                 if attempt < retries - 1:
                     wait = backoff * (2 ** attempt)
-                    logging.warning(f"TAAPI timeout, retrying in {wait}s")
-                    time.sleep(wait)
+                    logging.warning(f"{label} timeout, retrying in {wait}s")
+                    await asyncio.sleep(wait)
                 else:
                     raise
         raise RuntimeError("Max retries exceeded")
 
-    def get_indicators(self, asset, interval):
-        params = {
+    async def _get_with_retry(self, url, params, retries=3, backoff=0.5, priority=None):
+        """GET with exponential backoff retry."""
+        return await self._request_with_retry("GET", url, params=params, retries=retries, backoff=backoff, priority=priority)
+
+    async def _post_with_retry(self, url, body, retries=3, backoff=0.5, priority=None):
+        """POST with exponential backoff retry (used by the bulk endpoint)."""
+        return await self._request_with_retry("POST", url, body=body, timeout=30, retries=retries, backoff=backoff, priority=priority)
+
+    def _build_bulk_calls(self, specs: list[dict]) -> tuple[list[list[dict]], dict[str, str]]:
+        """Group specs into constructs (one per symbol/interval) chunked to plan limits.
+
+        Returns (calls, id_to_key) where each call is a list of constructs for one POST /bulk.
+        """
+        groups: dict[tuple[str, str], list[tuple[str, dict]]] = {}
+        seen = set()
+        for spec in specs:
+            params = spec.get("params") or {}
+            key = _indicator_key(spec["indicator"], spec["symbol"], spec["interval"], params)
+            if key in seen:
+                continue
+            seen.add(key)
+            groups.setdefault((spec["symbol"], spec["interval"]), []).append((key, {"indicator": spec["indicator"], **params}))
+
+        constructs = []
+        id_to_key = {}
+        for (symbol, interval), items in groups.items():
+            for start in range(0, len(items), self.bulk_max_indicators):
+                indicators = []
+                for key, entry in items[start:start + self.bulk_max_indicators]:
+                    entry_id = f"i{len(id_to_key)}"
+                    id_to_key[entry_id] = key
+                    indicators.append({**entry, "id": entry_id})
+                constructs.append({
+                    "exchange": self.exchange,
+                    "symbol": symbol,
+                    "interval": interval,
+                    "indicators": indicators,
+                })
+        calls = [constructs[i:i + self.bulk_max_constructs] for i in range(0, len(constructs), self.bulk_max_constructs)]
+        return calls, id_to_key
+
+    async def _post_bulk(self, constructs: list[dict], id_to_key: dict[str, str], priority=None) -> dict[str, dict]:
+        body = {
             "secret": self.api_key,
-            "exchange": "binance",
-            "symbol": f"{asset}/USDT",
-            "interval": interval
-        }
-        rsi_response = self._get_with_retry(f"{self.base_url}rsi", params)
-        macd_response = self._get_with_retry(f"{self.base_url}macd", params)
-        sma_response = self._get_with_retry(f"{self.base_url}sma", params)
-        ema_response = self._get_with_retry(f"{self.base_url}ema", params)
-        bbands_response = self._get_with_retry(f"{self.base_url}bbands", params)
-        return {
-            "rsi": rsi_response.get("value"),
-            "macd": macd_response,
-            "sma": sma_response.get("value"),
-            "ema": ema_response.get("value"),
-            "bbands": bbands_response
+            "construct": constructs[0] if len(constructs) == 1 else constructs,
         }
+        try:
+            data = await self._post_with_retry(f"{self.base_url}bulk", body, priority=priority)
+        except Exception as e:
+            logging.error(f"TAAPI bulk request failed ({sum(len(c['indicators']) for c in constructs)} indicators): {e}")
+            return {}
+        results = {}
+        for item in (data or {}).get("data", []):
+            key = id_to_key.get(item.get("id"))
+            if key is None:
+                continue
+            if item.get("errors"):
+                logging.error(f"TAAPI bulk error for {key}: {item.get('errors')}")
+                continue
+            if isinstance(item.get("result"), dict):
+                results[key] = item["result"]
+        return results
 
-    def get_historical_indicator(self, indicator, symbol, interval, results=10, params=None):
+    async def fetch_bulk(self, specs: list[dict], priority=None) -> dict[str, dict]:
+        """Fetch many indicators via POST /bulk, issuing the chunked calls concurrently.
+
+        Each spec is {"indicator", "symbol", "interval", "params"?}. Returns a mapping of
+        _indicator_key -> raw TAAPI result; failed entries are omitted.
+        """
+        calls, id_to_key = self._build_bulk_calls(specs)
+        results: dict[str, dict] = {}
+        for partial in await asyncio.gather(*(self._post_bulk(constructs, id_to_key, priority) for constructs in calls)):
+            results.update(partial)
+        logging.info(f"TAAPI bulk: {len(results)}/{len(id_to_key)} indicators in {len(calls)} request(s)")
+        return results
+
+    def _missing_specs(self, specs: list[dict]) -> list[dict]:
+        if self.cache is None:
+            return list(specs)
+        return [spec for spec in specs
+                if self.cache.peek(_indicator_key(spec["indicator"], spec["symbol"], spec["interval"], spec.get("params"))) is None]
+
+    def projected_fetch_seconds(self, specs: list[dict]) -> tuple[int, float]:
+        """(bulk requests needed, projected seconds to get them through the plan budget)."""
+        missing = self._missing_specs(specs)
+        if not missing:
+            return 0, 0.0
+        calls, _ = self._build_bulk_calls(missing)
+        return len(calls), self.budgeter.projected_completion(len(calls))
+
+    def budget_stats(self) -> dict:
+        return self.budgeter.stats()
+
+    async def prefetch(self, specs: list[dict], priority=None) -> int:
+        """Bulk-fetch the specs not already cached so matching fetch_* calls are served locally.
+
+        Returns the number of specs available from the cache afterwards. Bulk
+        results are only kept in the cache, so with the cache disabled
+        (TAAPI_CACHE_ENABLED=false) this does nothing and returns 0; every
+        fetch_* call is then a separate GET.
+        """
+        if self.cache is None:
+            return 0
+        intervals = {}
+        for spec in specs:
+            intervals[_indicator_key(spec["indicator"], spec["symbol"], spec["interval"], spec.get("params"))] = spec["interval"]
+        missing = self._missing_specs(specs)
+        if missing:
+            for key, result in (await self.fetch_bulk(missing, priority=priority)).items():
+                self.cache.set(key, intervals[key], result)
+        return sum(1 for key in intervals if self.cache.peek(key) is not None)
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats() if self.cache is not None else {}
+
+    async def fetch_raw(self, indicator: str, symbol: str, interval: str, params: dict | None = None, priority=None) -> dict:
+        """Single indicator lookup served from the candle cache, falling back to a direct GET."""
+        priority = current_priority() if priority is None else priority
+        if self.cache is None:
+            return await self._fetch_direct(indicator, symbol, interval, params, priority)
+        return await self.cache.get_or_fetch(
+            _indicator_key(indicator, symbol, interval, params),
+            interval,
+            lambda: self._fetch_direct(indicator, symbol, interval, params, priority),
+            revalidate=_is_forming_bar(params),
+        )
+
+    async def _fetch_direct(self, indicator: str, symbol: str, interval: str, params: dict | None = None, priority=None) -> dict:
         base_params = {
             "secret": self.api_key,
-            "exchange": "binance",
+            "exchange": self.exchange,
             "symbol": symbol,
-            "interval": interval,
-            "results": results
+            "interval": interval
         }
         if params:
             base_params.update(params)
-        response = self._get_with_retry(f"{self.base_url}{indicator}", base_params)
-        return response
+        return await self._get_with_retry(f"{self.base_url}{indicator}", base_params, priority=priority)
+
+    async def get_indicators(self, asset, interval):
+        symbol = f"{asset}/USDT"
+        names = list(INDICATOR_NAMES)
+        # One bulk call for any of the five not already cached instead of five sequential GETs
+        await self.prefetch([{"indicator": n, "symbol": symbol, "interval": interval} for n in names])
+
+        async def _one(name):
+            try:
+                return await self.fetch_raw(name, symbol, interval)
+            except Exception as e:
+                logging.error(f"TAAPI {name} failed for {symbol} {interval}: {e}")
+                return {}
+
+        responses = dict(zip(names, await asyncio.gather(*(_one(n) for n in names))))
+        return {
+            "rsi": responses["rsi"].get("value"),
+            "macd": responses["macd"],
+            "sma": responses["sma"].get("value"),
+            "ema": responses["ema"].get("value"),
+            "bbands": responses["bbands"]
+        }
 
-    def fetch_series(self, indicator: str, symbol: str, interval: str, results: int = 10, params: dict | None = None, value_key: str = "value") -> list:
+    async def fetch_historical(self, indicator, symbol, interval, results=10, params=None):
+        merged = {"results": results}
+        if params:
+            merged.update(params)
+        return await self.fetch_raw(indicator, symbol, interval, merged)
+
+    async def fetch_series(self, indicator: str, symbol: str, interval: str, results: int = 10, params: dict | None = None, value_key: str = "value") -> list:
         """Fetch historical series. TAAPI returns {"value": [array]} for simple indicators or {"valueMACD": [...], ...} for complex ones."""
         try:
-            data = self.get_historical_indicator(indicator, symbol, interval, results=results, params=params)
+            data = await self.fetch_historical(indicator, symbol, interval, results=results, params=params)
             if isinstance(data, dict):
                 # Simple indicators: {"value": [1,2,3]}
                 if value_key in data and isinstance(data[value_key], list):
                     return [round(v, 4) if isinstance(v, (int, float)) else v for v in data[value_key]]
                 # Error response
                 if "error" in data:
-                    import logging
                     logging.error(f"TAAPI error for {indicator} {symbol} {interval}: {data.get('error')}")
                     return []
             return []
         except Exception as e:
-            import logging
             logging.error(f"TAAPI fetch_series exception for {indicator}: {e}")
             return []
 
-    def fetch_value(self, indicator: str, symbol: str, interval: str, params: dict | None = None, key: str = "value"):
+    async def fetch_value(self, indicator: str, symbol: str, interval: str, params: dict | None = None, key: str = "value"):
         """Fetch single value (no results param). TAAPI returns {"value": number}."""
         try:
-            base_params = {
-                "secret": self.api_key,
-                "exchange": "binance",
-                "symbol": symbol,
-                "interval": interval
-            }
-            if params:
-                base_params.update(params)
-            data = self._get_with_retry(f"{self.base_url}{indicator}", base_params)
+            data = await self.fetch_raw(indicator, symbol, interval, params)
             if isinstance(data, dict):
                 val = data.get(key)
                 return round(val, 4) if isinstance(val, (int, float)) else val
             return None
         except Exception:
             return None
+
+    # Sync facade: thin wrappers that run the async API on the shared background loop.
+    def get_historical_indicator(self, indicator, symbol, interval, results=10, params=None):
+        return run_sync(self.fetch_historical(indicator, symbol, interval, results=results, params=params))
+
+    def get_indicators_sync(self, asset, interval):
+        return run_sync(self.get_indicators(asset, interval))
+
+    def fetch_series_sync(self, indicator: str, symbol: str, interval: str, results: int = 10, params: dict | None = None, value_key: str = "value") -> list:
+        return run_sync(self.fetch_series(indicator, symbol, interval, results=results, params=params, value_key=value_key))
+
+    def fetch_value_sync(self, indicator: str, symbol: str, interval: str, params: dict | None = None, key: str = "value"):
+        return run_sync(self.fetch_value(indicator, symbol, interval, params=params, key=key))
+
+    def fetch_raw_sync(self, indicator: str, symbol: str, interval: str, params: dict | None = None, priority=None) -> dict:
+        return run_sync(self.fetch_raw(indicator, symbol, interval, params=params, priority=priority))
+
+    def prefetch_sync(self, specs: list[dict]) -> int:
+        return run_sync(self.prefetch(specs))
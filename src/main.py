@@ -3,10 +3,16 @@ import argparse
 import pathlib
 sys.path.append(str(pathlib.Path(__file__).parent.parent))
 from src.agent.decision_maker import TradingAgent
-from src.indicators.taapi_client import TAAPIClient
+from src.agent.materiality import MaterialityGate, exit_deadline, regime_flags, sampled_atr
+from src.agent.prompt_encoder import LEVELS, PromptEncoder, estimate_tokens
+from src.agent.telemetry import percentiles
+from src.indicators.taapi_client import INDICATOR_NAMES, TAAPIClient
 from src.indicators.binance_indicators import BinanceIndicators
+from src.indicators.simulated_indicators import SimulatedIndicators
+from src.indicators.taapi_budget import PRIORITY_EXIT, request_priority
 from src.trading.hyperliquid_api import HyperliquidAPI
 from src.trading.binance_api import BinanceAPI
+from src.trading.simulated_api import SimulatedTradingAPI
 from src.trading.base_trading_api import BaseTradingAPI
 from src.risk.risk_manager import RiskManager
 import time
@@ -20,6 +26,10 @@ import os
 import json
 from aiohttp import web
 from src.utils.formatting import format_number as fmt, format_size as fmt_sz
+from src.utils.intervals import interval_seconds
+from src.utils.log_sink import get_sink, flush_all
+from src.utils.scheduler import CycleScheduler
+from src.utils.event_triggers import EventTriggers
 
 load_dotenv()
 
@@ -29,17 +39,156 @@ def clear_terminal():
     os.system('cls' if os.name == 'nt' else 'clear')
 
 def get_interval_seconds(interval_str):
-    # Clean interval string - remove quotes and extra characters
-    clean_interval = interval_str.strip().replace('"', '').replace("'", '')
-    
-    if clean_interval.endswith('m'):
-        return int(clean_interval[:-1]) * 60
-    elif clean_interval.endswith('h'):
-        return int(clean_interval[:-1]) * 3600
-    elif clean_interval.endswith('d'):
-        return int(clean_interval[:-1]) * 86400
-    else:
-        raise ValueError(f"Unsupported interval: {clean_interval}")
+    return interval_seconds(interval_str)
+
+# Per-asset indicator reads besides get_indicators: (result key, indicator, interval, params, results, value key).
+# results=None reads a single value (fetch_value); otherwise a series of that length (fetch_series).
+ASSET_INDICATORS = [
+    ("ema_series", "ema", "5m", {"period": 20}, 10, "value"),
+    ("macd_series", "macd", "5m", None, 10, "valueMACD"),
+    ("rsi7_series", "rsi", "5m", {"period": 7}, 10, "value"),
+    ("rsi14_series", "rsi", "5m", {"period": 14}, 10, "value"),
+    ("lt_ema20", "ema", "4h", {"period": 20}, None, "value"),
+    ("lt_ema50", "ema", "4h", {"period": 50}, None, "value"),
+    ("lt_macd_series", "macd", "4h", None, 10, "valueMACD"),
+    ("lt_rsi_series", "rsi", "4h", {"period": 14}, 10, "value"),
+]
+
+def indicator_specs(asset, interval):
+    """Every indicator request the gather phase makes for one asset (used for bulk prefetch)."""
+    symbol = f"{asset}/USDT"
+    specs = [{"indicator": name, "symbol": symbol, "interval": interval} for name in INDICATOR_NAMES]
+    for _, indicator, tf, params, results, _ in ASSET_INDICATORS:
+        spec = {"indicator": indicator, "symbol": symbol, "interval": tf}
+        spec_params = dict(params or {}, **({"results": results} if results else {}))
+        if spec_params:
+            spec["params"] = spec_params
+        specs.append(spec)
+    return specs
+
+async def fetch_asset_quotes(asset, trading_api):
+    """Exchange reads for one asset (price, open interest, funding); these do not depend on closed bars."""
+    price, oi, funding = await asyncio.gather(
+        trading_api.get_current_price(asset),
+        trading_api.get_open_interest(asset),
+        trading_api.get_funding_rate(asset),
+    )
+    return {"price": price, "oi": oi, "funding": funding}
+
+async def fetch_asset_indicators(asset, indicators_client, interval):
+    """Indicator reads for one asset, issued concurrently."""
+    symbol = f"{asset}/USDT"
+    reads = [
+        indicators_client.fetch_value(indicator, symbol, tf, params=params, key=value_key) if results is None
+        else indicators_client.fetch_series(indicator, symbol, tf, results=results, params=params, value_key=value_key)
+        for _, indicator, tf, params, results, value_key in ASSET_INDICATORS
+    ]
+    indicators, *values = await asyncio.gather(indicators_client.get_indicators(asset, interval), *reads)
+    data = {"indicators": indicators}
+    data.update(zip((key for key, *_ in ASSET_INDICATORS), values))
+    return data
+
+async def fetch_asset_data(asset, trading_api, indicators_client, interval):
+    """Every network read the gather phase makes for one asset, issued concurrently."""
+    quotes, indicators = await asyncio.gather(
+        fetch_asset_quotes(asset, trading_api),
+        fetch_asset_indicators(asset, indicators_client, interval),
+    )
+    return {**quotes, **indicators}
+
+async def gather_assets(assets, fetch, concurrency=10, timeout=None):
+    """Run ``fetch(asset)`` for every asset, at most ``concurrency`` at once, each bounded by ``timeout`` seconds.
+
+    Returns {asset: result or the exception it raised}; a slow or failing asset
+    does not hold up the others.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(asset):
+        async with semaphore:
+            return await asyncio.wait_for(fetch(asset), timeout)
+
+    results = await asyncio.gather(*(run(a) for a in assets), return_exceptions=True)
+    return dict(zip(assets, results))
+
+def _unwrap(value):
+    """Re-raise an exception captured in a snapshot where the value is used."""
+    if isinstance(value, Exception):
+        raise value
+    return value
+
+async def _capture(coro):
+    try:
+        return await coro
+    except Exception as e:
+        return e
+
+def _capture_value(value):
+    """None for a read that failed (see _capture)."""
+    return None if isinstance(value, Exception) else value
+
+async def take_snapshot(trading_api, indicators_client, assets, interval, add_event=logging.info, indicators_at=None):
+    """Account state and market data for one cycle, with account and market reads running concurrently.
+
+    Indicator reads wait until ``indicators_at`` (wall-clock seconds, None = now) so
+    a prefetched snapshot only reads bars that have closed; account and quote reads
+    start right away. Open orders and fills hold the exception instead when their
+    read failed; ``gathered`` maps each asset to its data or exception (see gather_assets).
+    """
+    from src.config_loader import CONFIG
+    started = time.monotonic()
+
+    async def account():
+        state = await trading_api.get_user_state()
+        coins = list(dict.fromkeys(pos.get('coin') for pos in state['positions'] if pos.get('coin')))
+        prices = await asyncio.gather(*(trading_api.get_current_price(c) for c in coins))
+        return state, dict(zip(coins, prices))
+
+    def gather(fetch):
+        return gather_assets(
+            assets, fetch,
+            concurrency=int(CONFIG.get("gather_concurrency") or 10),
+            timeout=float(CONFIG.get("gather_asset_timeout") or 0) or None,
+        )
+
+    async def indicators():
+        if indicators_at is not None:
+            await asyncio.sleep(max(0.0, indicators_at - time.time()))
+        # Bulk-prefetch every indicator the gather phase needs (TAAPI POST /bulk, chunked to plan limits);
+        # results land in the TAAPI cache, so there is nothing to prefetch into when it is disabled
+        if hasattr(indicators_client, 'prefetch') and getattr(indicators_client, 'cache', None) is not None:
+            try:
+                specs = [spec for asset in assets for spec in indicator_specs(asset, interval)]
+                if hasattr(indicators_client, 'projected_fetch_seconds'):
+                    n_requests, eta = indicators_client.projected_fetch_seconds(specs)
+                    add_event(f"TAAPI budget: {n_requests} bulk request(s), projected completion in {eta:.1f}s ({indicators_client.budget_stats()})")
+                fetched = await indicators_client.prefetch(specs)
+                add_event(f"Prefetched {fetched}/{len(specs)} indicators via bulk")
+            except Exception as e:
+                add_event(f"Indicator prefetch error: {e}")
+        return await gather(lambda a: fetch_asset_indicators(a, indicators_client, interval))
+
+    async def market():
+        gather_started = time.monotonic()
+        quotes, bars = await asyncio.gather(gather(lambda a: fetch_asset_quotes(a, trading_api)), indicators())
+        gathered = {}
+        for asset in assets:
+            # An asset whose quote or indicator reads failed carries that exception
+            failed = [r for r in (quotes[asset], bars[asset]) if isinstance(r, Exception)]
+            gathered[asset] = failed[0] if failed else {**quotes[asset], **bars[asset]}
+        add_event(f"Gathered market data for {sum(1 for r in gathered.values() if not isinstance(r, Exception))}/{len(assets)} assets in {time.monotonic() - gather_started:.1f}s")
+        return gathered
+
+    (state, position_prices), open_orders, fills, gathered = await asyncio.gather(
+        account(),
+        _capture(trading_api.get_open_orders()),
+        _capture(trading_api.get_recent_fills(limit=50)),
+        market(),
+    )
+    return {
+        "state": state, "position_prices": position_prices, "open_orders": open_orders, "fills": fills,
+        "gathered": gathered, "seconds": time.monotonic() - started, "ready_at": time.monotonic(),
+    }
 
 def create_trading_api() -> BaseTradingAPI:
     """Create the appropriate trading API instance based on configuration."""
@@ -50,8 +199,10 @@ def create_trading_api() -> BaseTradingAPI:
         return BinanceAPI()
     elif platform == "hyperliquid":
         return HyperliquidAPI()
+    elif platform == "simulated":
+        return SimulatedTradingAPI()
     else:
-        raise ValueError(f"Unsupported trading platform: {platform}. Supported platforms: hyperliquid, binance")
+        raise ValueError(f"Unsupported trading platform: {platform}. Supported platforms: hyperliquid, binance, simulated")
 
 def main():
     clear_terminal()
@@ -76,16 +227,19 @@ def main():
     if not args.assets or not args.interval:
         parser.error("Please provide --assets and --interval, or set ASSETS and INTERVAL in .env")
 
+    trading_api = create_trading_api()
     # Choose indicators client based on trading platform
     from src.config_loader import CONFIG
     platform = CONFIG.get("trading_platform", "hyperliquid").lower()
     
     if platform == "binance":
         indicators_client = BinanceIndicators()
+    elif platform == "simulated":
+        # Synthetic indicators around the simulated exchange's prices (load tests)
+        indicators_client = SimulatedIndicators(trading_api)
     else:
         indicators_client = TAAPIClient()
-    
-    trading_api = create_trading_api()
+
     agent = TradingAgent()
     risk_manager = RiskManager()
 
@@ -99,6 +253,46 @@ def main():
     initial_account_value = None
     # Perp mid-price history sampled each loop (authoritative, avoids spot/perp basis mismatch)
     price_history = {}
+    # Compact tables instead of prose, shrunk to LLM_PROMPT_TOKEN_BUDGET (LLM_PROMPT_COMPACT)
+    prompt_encoder = None
+    if str(CONFIG.get("llm_prompt_compact", "false")).lower() == "true":
+        prompt_encoder = PromptEncoder(int(CONFIG.get("llm_prompt_token_budget") or 0))
+    # Reuse the previous holds while nothing material moves (LLM_MATERIALITY_ENABLED)
+    materiality = None
+    if str(CONFIG.get("llm_materiality_enabled", "false")).lower() == "true":
+        materiality = MaterialityGate(
+            atr_threshold=float(CONFIG.get("llm_materiality_atr") or 0.5),
+            price_pct=float(CONFIG.get("llm_materiality_price_pct") or 0.5),
+            max_skips=int(CONFIG.get("llm_materiality_max_skips") or 6),
+            horizon=get_interval_seconds(args.interval),
+        )
+
+    # Next cycle's snapshot is read this many seconds before its tick (PIPELINE_PREFETCH_LEAD)
+    prefetch_lead = float(CONFIG.get("pipeline_prefetch_lead") or 0)
+    pipeline_history = deque(maxlen=100)
+    # Cycles start on candle closes plus CYCLE_OFFSET, so indicators come from just-closed bars
+    scheduler = CycleScheduler(
+        args.interval,
+        offset=float(CONFIG.get("cycle_offset") or 0),
+        align=str(CONFIG.get("cycle_align", "true")).lower() == "true",
+        overrun=(CONFIG.get("cycle_overrun") or "coalesce").lower(),
+    )
+    indicator_grace = float(CONFIG.get("taapi_cache_grace_seconds") or 2)
+    if prefetch_lead > 0 and scheduler.align and scheduler.offset < indicator_grace:
+        logging.warning(
+            f"CYCLE_OFFSET ({scheduler.offset:g}s) is below TAAPI_CACHE_GRACE_SECONDS ({indicator_grace:g}s): "
+            "prefetched indicator reads only start after each tick")
+    # Early cycles on sharp moves, fills, liquidation risk or exit deadlines (EVENT_TRIGGERS_ENABLED)
+    triggers = None
+    if str(CONFIG.get("event_triggers_enabled", "false")).lower() == "true":
+        triggers = EventTriggers(
+            atr_multiple=float(CONFIG.get("event_trigger_atr") or 1.0),
+            price_pct=float(CONFIG.get("event_trigger_price_pct") or 1.0),
+            liq_pct=float(CONFIG.get("event_trigger_liq_pct") or 5.0),
+            debounce=float(CONFIG.get("event_trigger_debounce") or 0),
+            min_spacing=float(CONFIG.get("event_trigger_min_spacing") or 0),
+            poll=float(CONFIG.get("event_trigger_poll") or 15),
+        )
 
     print(f"Starting trading agent for assets: {args.assets} at interval: {args.interval}")
 
@@ -107,14 +301,26 @@ def main():
 
     async def run_loop():
         nonlocal invocation_count, initial_account_value
+        pending_snapshot = None
+        next_tick = None
+        trigger_reasons = None
         while True:
+            scheduler.begin(next_tick)
+            tick = time.monotonic()
+            cycle_started_at = time.time()
+            prefetched = pending_snapshot is not None
+            if prefetched:
+                snapshot, pending_snapshot = await pending_snapshot, None
+            else:
+                snapshot = await take_snapshot(trading_api, indicators_client, args.assets, args.interval, add_event)
+            snapshot_wait = time.monotonic() - tick
             invocation_count += 1
             minutes_since_start = (datetime.now(timezone.utc) - start_time).total_seconds() / 60
 
             # number formatting helpers imported from src.utils.formatting
 
             # Global account state
-            state = await trading_api.get_user_state()
+            state = snapshot["state"]
             sharpe = calculate_sharpe(trade_log)
 
             # Format account info like example
@@ -134,7 +340,7 @@ def main():
             account_info += f"Current live positions & performance:\n"
             for pos in state['positions']:
                 coin = pos.get('coin')
-                current_px = round(await trading_api.get_current_price(coin), 2) if coin else 0
+                current_px = round(snapshot["position_prices"][coin], 2) if coin else 0
                 liq_px = fmt(pos.get('liquidationPx') or pos.get('liqPx', 0), 2)
                 qty_disp = fmt_sz(pos.get('szi'))
                 entry_disp = fmt(pos.get('entryPx'), 2)
@@ -157,6 +363,10 @@ def main():
                     f"TP OID: {trade['tp_oid']}, SL OID: {trade['sl_oid']}, Exit Plan: {trade['exit_plan']}\n"
                 )
             
+            # Trimmable parts are also kept as lists for the compact prompt encoder
+            account_head = account_info
+            history_entries, order_lines, fill_lines = [], [], []
+
             # Include recent diary entries for context
             account_info += "\nRecent Trading History (last 10 decisions):\n"
             try:
@@ -164,13 +374,15 @@ def main():
                     lines = f.readlines()
                     for line in lines[-10:]:
                         entry = json.loads(line)
+                        history_entries.append(entry)
                         account_info += f"{entry.get('timestamp', '')} - {entry.get('asset', '')}: {entry.get('action', '')} - {entry.get('rationale', '')[:80]}\n"
             except Exception:
                 pass
 
             # Include active open orders context (TP/SL or any resting orders)
+            open_orders = []
             try:
-                open_orders = await trading_api.get_open_orders()
+                open_orders = _unwrap(snapshot["open_orders"])
                 account_info += "\nActive Open Orders:\n"
                 for o in open_orders[:50]:  # cap to 50 for prompt size
                     coin = o.get('coin')
@@ -186,9 +398,11 @@ def main():
                     else:
                         order_type = str(order_type_obj)
                     if trig_px is not None and px is None:
-                        account_info += f"oid:{oid} {coin} {'BUY' if side else 'SELL'} sz:{sz} triggerPx:{fmt(trig_px,2)} type:{order_type}\n"
+                        order_line = f"oid:{oid} {coin} {'BUY' if side else 'SELL'} sz:{sz} triggerPx:{fmt(trig_px,2)} type:{order_type}"
                     else:
-                        account_info += f"oid:{oid} {coin} {'BUY' if side else 'SELL'} sz:{sz} px:{px} type:{order_type}\n"
+                        order_line = f"oid:{oid} {coin} {'BUY' if side else 'SELL'} sz:{sz} px:{px} type:{order_type}"
+                    order_lines.append(order_line)
+                    account_info += order_line + "\n"
             except Exception:
                 pass
 
@@ -220,7 +434,7 @@ def main():
 
             # Include recent fills to reflect executed TP/SL
             try:
-                fills = await trading_api.get_recent_fills(limit=50)
+                fills = _unwrap(snapshot["fills"])
                 account_info += "\nRecent Fills (latest 20):\n"
                 for f in fills[-20:]:
                     try:
@@ -238,7 +452,9 @@ def main():
                                 t_iso = datetime.fromtimestamp(t_int, tz=timezone.utc).isoformat()
                         except Exception:
                             t_iso = str(t_raw)
-                        account_info += f"{t_iso} {coin} {'BUY' if is_buy else 'SELL'} sz:{sz} px:{px}\n"
+                        fill_line = f"{t_iso} {coin} {'BUY' if is_buy else 'SELL'} sz:{sz} px:{px}"
+                        fill_lines.append(fill_line)
+                        account_info += fill_line + "\n"
                     except Exception:
                         continue
             except Exception:
@@ -246,7 +462,9 @@ def main():
 
             # Check and close if exit conditions met
             for trade in active_trades[:]:
-                if await check_exit_condition(trade, indicators_client, trading_api):
+                with request_priority(PRIORITY_EXIT):
+                    exit_triggered = await check_exit_condition(trade, indicators_client, trading_api)
+                if exit_triggered:
                     close_order = await trading_api.place_sell_order(trade['asset'], trade['amount']) if trade['is_long'] else await trading_api.place_buy_order(trade['asset'], trade['amount'])
                     add_event(f"Closed {trade['asset']} due to exit plan: {trade['exit_plan']}")
                     # Cancel all remaining orders for this asset (TP/SL and any orphans)
@@ -266,81 +484,125 @@ def main():
 
             # Gather data for ALL assets first
             all_market_data = ""
+            market_sections = {}
+            market_rows = {}
+            snapshots = {}
             asset_prices = {}
+            gathered = snapshot["gathered"]
             for asset in args.assets:
                 try:
-                    # Gather data like example
-                    current_price = round(await trading_api.get_current_price(asset), 2)
+                    data = gathered[asset]
+                    if isinstance(data, Exception):
+                        raise data
+                    current_price = round(data["price"], 2)
                     # Update perp mid-price history (sampled per loop)
                     if asset not in price_history:
                         price_history[asset] = deque(maxlen=60)
                     price_history[asset].append({"t": datetime.now(timezone.utc).isoformat(), "mid": fmt(current_price, 2)})
-                    oi = await trading_api.get_open_interest(asset)
-                    funding = await trading_api.get_funding_rate(asset)
-
-                    # Initial indicators (intraday) from indicators client
-                    indicators = await indicators_client.get_indicators(asset, args.interval) if hasattr(indicators_client, 'get_indicators') else indicators_client.get_indicators(asset, args.interval)
-                    hist_prices = []
-
-                    intraday_tf = "5m"
-                    ema_series = await indicators_client.fetch_series("ema", f"{asset}/USDT", intraday_tf, results=10, params={"period": 20}, value_key="value") if hasattr(indicators_client, 'fetch_series') else indicators_client.fetch_series("ema", f"{asset}/USDT", intraday_tf, results=10, params={"period": 20}, value_key="value")
-                    macd_series = await indicators_client.fetch_series("macd", f"{asset}/USDT", intraday_tf, results=10, value_key="valueMACD") if hasattr(indicators_client, 'fetch_series') else indicators_client.fetch_series("macd", f"{asset}/USDT", intraday_tf, results=10, value_key="valueMACD")
-                    rsi7_series = await indicators_client.fetch_series("rsi", f"{asset}/USDT", intraday_tf, results=10, params={"period": 7}, value_key="value") if hasattr(indicators_client, 'fetch_series') else indicators_client.fetch_series("rsi", f"{asset}/USDT", intraday_tf, results=10, params={"period": 7}, value_key="value")
-                    rsi14_series = await indicators_client.fetch_series("rsi", f"{asset}/USDT", intraday_tf, results=10, params={"period": 14}, value_key="value") if hasattr(indicators_client, 'fetch_series') else indicators_client.fetch_series("rsi", f"{asset}/USDT", intraday_tf, results=10, params={"period": 14}, value_key="value")
+                    oi = data["oi"]
+                    funding = data["funding"]
+
+                    ema_series = data["ema_series"]
+                    macd_series = data["macd_series"]
+                    rsi7_series = data["rsi7_series"]
+                    rsi14_series = data["rsi14_series"]
                     cur_rsi7 = round(rsi7_series[-1], 2) if rsi7_series else "N/A"
                     cur_ema20 = round(ema_series[-1], 2) if ema_series else "N/A"
                     cur_macd = round(macd_series[-1], 2) if macd_series else "N/A"
-                    ema_series_r = [fmt(v, 2) for v in ema_series] if ema_series else []
-                    macd_series_r = [fmt(v, 2) for v in macd_series] if macd_series else []
-                    rsi7_series_r = [fmt(v, 2) for v in rsi7_series] if rsi7_series else []
-                    rsi14_series_r = [fmt(v, 2) for v in rsi14_series] if rsi14_series else []
 
                     # Long-term (4h)
-                    lt_ema20 = await indicators_client.fetch_value("ema", f"{asset}/USDT", "4h", params={"period": 20}, key="value") if hasattr(indicators_client, 'fetch_value') else indicators_client.fetch_value("ema", f"{asset}/USDT", "4h", params={"period": 20}, key="value")
-                    lt_ema20 = round(lt_ema20, 2) if lt_ema20 is not None else "N/A"
-                    lt_ema50 = await indicators_client.fetch_value("ema", f"{asset}/USDT", "4h", params={"period": 50}, key="value") if hasattr(indicators_client, 'fetch_value') else indicators_client.fetch_value("ema", f"{asset}/USDT", "4h", params={"period": 50}, key="value")
-                    lt_ema50 = round(lt_ema50, 2) if lt_ema50 is not None else "N/A"
+                    lt_ema20 = round(data["lt_ema20"], 2) if data["lt_ema20"] is not None else "N/A"
+                    lt_ema50 = round(data["lt_ema50"], 2) if data["lt_ema50"] is not None else "N/A"
                     # ATR not implemented in Binance indicators yet, using placeholder
                     lt_atr3 = "N/A"
                     lt_atr14 = "N/A"
-                    lt_macd_series = await indicators_client.fetch_series("macd", f"{asset}/USDT", "4h", results=10, value_key="valueMACD") if hasattr(indicators_client, 'fetch_series') else indicators_client.fetch_series("macd", f"{asset}/USDT", "4h", results=10, value_key="valueMACD")
-                    lt_rsi_series = await indicators_client.fetch_series("rsi", f"{asset}/USDT", "4h", results=10, params={"period": 14}, value_key="value") if hasattr(indicators_client, 'fetch_series') else indicators_client.fetch_series("rsi", f"{asset}/USDT", "4h", results=10, params={"period": 14}, value_key="value")
-                    lt_macd_series_r = [fmt(v, 2) for v in lt_macd_series] if lt_macd_series else []
-                    lt_rsi_series_r = [fmt(v, 2) for v in lt_rsi_series] if lt_rsi_series else []
+                    lt_macd_series = data["lt_macd_series"]
+                    lt_rsi_series = data["lt_rsi_series"]
 
-                    # Format like example
                     # Compute annualized funding (paid hourly: × 24 × 365)
                     funding_annualized = round(funding * 24 * 365 * 100, 2) if funding else None
-                    market_data = f"ALL {asset.upper()} DATA\ncurrent_price = {current_price}, current_ema20 = {cur_ema20}, current_macd = {cur_macd}, current_rsi (7 period) = {cur_rsi7}\n"
-                    market_data += f"Open Interest: {oi}\nFunding Rate: {funding} (Annualized: {funding_annualized}%)\n"
                     # Perp mid prices sampled per interval (authoritative, concise)
                     recent_mids = [p["mid"] for p in list(price_history.get(asset, []))[-10:]]
-                    market_data += f"Perp mid prices (sampled): {json.dumps(recent_mids)}\n"
-                    market_data += f"EMA indicators (20-period): {json.dumps(ema_series_r)}\n"
-                    market_data += f"MACD indicators: {json.dumps(macd_series_r)}\n"
-                    market_data += f"RSI indicators (7-Period): {json.dumps(rsi7_series_r)}\n"
-                    market_data += f"RSI indicators (14-Period): {json.dumps(rsi14_series_r)}\n"
-                    market_data += f"Longer-term context (4-hour timeframe):\n20-Period EMA: {lt_ema20} vs. 50-Period EMA: {lt_ema50}\n3-Period ATR: {lt_atr3} vs. {lt_atr14}\nMACD indicators: {json.dumps(lt_macd_series_r)}\nRSI indicators (14-Period): {json.dumps(lt_rsi_series_r)}\n\n"
-
-                    all_market_data += market_data
+                    if not prompt_encoder:
+                        # Prose section, formatted like the example; the compact encoder renders market_rows instead
+                        ema_series_r = [fmt(v, 2) for v in ema_series] if ema_series else []
+                        macd_series_r = [fmt(v, 2) for v in macd_series] if macd_series else []
+                        rsi7_series_r = [fmt(v, 2) for v in rsi7_series] if rsi7_series else []
+                        rsi14_series_r = [fmt(v, 2) for v in rsi14_series] if rsi14_series else []
+                        lt_macd_series_r = [fmt(v, 2) for v in lt_macd_series] if lt_macd_series else []
+                        lt_rsi_series_r = [fmt(v, 2) for v in lt_rsi_series] if lt_rsi_series else []
+                        market_data = f"ALL {asset.upper()} DATA\ncurrent_price = {current_price}, current_ema20 = {cur_ema20}, current_macd = {cur_macd}, current_rsi (7 period) = {cur_rsi7}\n"
+                        market_data += f"Open Interest: {oi}\nFunding Rate: {funding} (Annualized: {funding_annualized}%)\n"
+                        market_data += f"Perp mid prices (sampled): {json.dumps(recent_mids)}\n"
+                        market_data += f"EMA indicators (20-period): {json.dumps(ema_series_r)}\n"
+                        market_data += f"MACD indicators: {json.dumps(macd_series_r)}\n"
+                        market_data += f"RSI indicators (7-Period): {json.dumps(rsi7_series_r)}\n"
+                        market_data += f"RSI indicators (14-Period): {json.dumps(rsi14_series_r)}\n"
+                        market_data += f"Longer-term context (4-hour timeframe):\n20-Period EMA: {lt_ema20} vs. 50-Period EMA: {lt_ema50}\n3-Period ATR: {lt_atr3} vs. {lt_atr14}\nMACD indicators: {json.dumps(lt_macd_series_r)}\nRSI indicators (14-Period): {json.dumps(lt_rsi_series_r)}\n\n"
+                        all_market_data += market_data
+                        market_sections[asset] = market_data
+                    market_rows[asset] = {
+                        "price": current_price, "ema20": cur_ema20, "macd": cur_macd, "rsi7": cur_rsi7,
+                        "rsi14": rsi14_series[-1] if rsi14_series else None, "oi": oi, "funding_apr": funding_annualized,
+                        "ema20_4h": lt_ema20, "ema50_4h": lt_ema50, "atr3_4h": lt_atr3, "atr14_4h": lt_atr14,
+                        "mids": recent_mids, "ema20_series": ema_series, "macd_series": macd_series,
+                        "rsi7_series": rsi7_series, "rsi14_series": rsi14_series,
+                        "macd_4h_series": lt_macd_series, "rsi14_4h_series": lt_rsi_series,
+                    }
+                    if materiality:
+                        position = sum(float(p.get('szi') or 0) for p in state['positions'] if p.get('coin') == asset)
+                        deadlines = [d for d in (exit_deadline(t) for t in active_trades if t.get('asset') == asset) if d]
+                        snapshots[asset] = MaterialityGate.snapshot(
+                            current_price,
+                            atr=lt_atr14 if lt_atr14 != "N/A" else sampled_atr(p["mid"] for p in price_history[asset]),
+                            flags=regime_flags(lt_ema20, lt_ema50, lt_rsi_series[-1] if lt_rsi_series else None,
+                                               lt_macd_series[-1] if lt_macd_series else None),
+                            position=position,
+                            orders=[o.get('oid') for o in open_orders if o.get('coin') == asset],
+                            deadline=min(deadlines) if deadlines else None,
+                        )
                     asset_prices[asset] = current_price
+                except asyncio.TimeoutError:
+                    add_event(f"Data gather timeout {asset} (GATHER_ASSET_TIMEOUT)")
+                    continue
                 except Exception as e:
-                    import traceback
                     add_event(f"Data gather error {asset}: {e}")
                     continue
 
-            # Single LLM call with all assets
-            context = (
+            if hasattr(indicators_client, 'cache_stats'):
+                stats = indicators_client.cache_stats()
+                if stats:
+                    add_event(f"TAAPI cache: {stats['hits']} hits, {stats['stale_hits']} stale, {stats['misses']} misses (hit rate {stats['hit_rate']:.0%})")
+
+            # Single LLM call with all assets. The agent prepends the static policy and
+            # asset header; the invocation/time text changes every call, so it goes last.
+            invocation = (
                 f"## Invocation\n"
                 f"It has been {minutes_since_start:.0f} minutes since you started trading. "
-                f"The current time is {datetime.now(timezone.utc).isoformat()} and you've been invoked {invocation_count} times.\n\n"
-                f"## Market Data\n{all_market_data}\n"
-                f"## Account Information & Performance\n{account_info}\n"
-                f"## Instructions\nDecide actions for ALL assets: {', '.join(args.assets)}. Output a STRICT JSON array only.\n"
+                f"The current time is {datetime.now(timezone.utc).isoformat()} and you've been invoked {invocation_count} times.\n"
             )
-            add_event(f"Combined prompt length: {len(context)} chars for {len(args.assets)} assets")
-            with open("prompts.log", "a") as f:
-                f.write(f"\n\n--- {datetime.now()} - ALL ASSETS ---\n{context}\n")
+            if trigger_reasons:
+                invocation += f"This invocation is early (before the scheduled interval) because: {'; '.join(trigger_reasons)}.\n"
+            if prompt_encoder:
+                def render_account(level):
+                    account = prompt_encoder.account(account_head, history_entries, order_lines, fill_lines, level)
+                    return f"## Account Information & Performance\n{account}\n" + invocation
+
+                context, prompt_info = prompt_encoder.fit(
+                    lambda level: f"## Market Data\n{prompt_encoder.market(args.assets, market_rows, level)}\n" + render_account(level)
+                )
+                level = LEVELS[prompt_info["level"]]
+                shared_context = render_account(level)
+                market_sections = {a: prompt_encoder.asset_block(a, row, level) for a, row in market_rows.items()}
+                add_event(
+                    f"Compact prompt: ~{prompt_info['tokens']} tokens ({len(context)} chars) for {len(args.assets)} assets, "
+                    f"detail level {prompt_info['level']}{' (over budget)' if prompt_info['over_budget'] else ''}"
+                )
+            else:
+                shared_context = f"## Account Information & Performance\n{account_info}\n" + invocation
+                context = f"## Market Data\n{all_market_data}\n" + shared_context
+                add_event(f"Combined prompt: ~{estimate_tokens(context)} tokens ({len(context)} chars) for {len(args.assets)} assets")
+            get_sink("prompts.log").write({"event": "prompt", "assets": args.assets, "context": context}, sampled=True)
 
             def _is_failed_outputs(outs):
                 if not outs:
@@ -350,40 +612,12 @@ def main():
                 except Exception:
                     return True
 
-            try:
-                outputs = agent.decide_trade(args.assets, context)
-                if not isinstance(outputs, list):
-                    add_event(f"Invalid output format (expected list): {outputs}")
-                    outputs = []
-            except Exception as e:
-                import traceback
-                add_event(f"Agent error: {e}")
-                add_event(f"Traceback: {traceback.format_exc()}")
-                outputs = []
-
-            # Retry once on failure/parse error with a stricter instruction prefix
-            if _is_failed_outputs(outputs):
-                add_event("Retrying LLM once due to invalid/parse-error output")
-                context_retry = (
-                    "## Retry Instruction\nReturn ONLY the JSON array per schema with no prose.\n\n" + context
-                )
-                try:
-                    outputs = agent.decide_trade(args.assets, context_retry)
-                    if not isinstance(outputs, list):
-                        add_event(f"Retry invalid format: {outputs}")
-                        outputs = []
-                except Exception as e:
-                    import traceback
-                    add_event(f"Retry agent error: {e}")
-                    add_event(f"Retry traceback: {traceback.format_exc()}")
-                    outputs = []
-
-            # Execute trades for each asset
-            for output in outputs:
+            async def execute_decision(output):
+                """Validate one decision and place its orders (or log the hold)."""
                 try:
                     asset = output.get("asset")
                     if not asset or asset not in args.assets:
-                        continue
+                        return
                     action = output.get("action")
                     current_price = asset_prices.get(asset, 0)
                     action = output["action"]
@@ -392,7 +626,7 @@ def main():
                         alloc_usd = float(output.get("allocation_usd", 0.0))
                         if alloc_usd <= 0:
                             add_event(f"Holding {asset}: zero/negative allocation")
-                            continue
+                            return
                         
                         # Risk management validation
                         is_valid, reason, adjusted_allocation = risk_manager.validate_allocation(
@@ -411,7 +645,7 @@ def main():
                                     "risk_reason": reason
                                 }
                                 f.write(json.dumps(diary_entry) + "\n")
-                            continue
+                            return
                         
                         # Use adjusted allocation if risk manager modified it
                         if adjusted_allocation != alloc_usd:
@@ -427,7 +661,7 @@ def main():
                         
                         if not is_size_valid:
                             add_event(f"Position sizing blocked {asset}: {size_reason}")
-                            continue
+                            return
                         
                         if adjusted_amount != amount:
                             add_event(f"Position size adjusted for {asset}: {amount:.4f} -> {adjusted_amount:.4f}")
@@ -516,7 +750,155 @@ def main():
                     import traceback
                     add_event(f"Execution error {asset}: {e}")
 
-            await asyncio.sleep(get_interval_seconds(args.interval))
+            outputs = []
+            executed = set()
+            # Event-triggered cycles always ask the LLM
+            reused = materiality.reuse(snapshots, args.assets) if materiality and not trigger_reasons else None
+            if materiality and reused is None:
+                add_event(f"Materiality gate: calling LLM ({'; '.join(materiality.last_reasons[:5])})")
+            if reused is not None:
+                add_event(f"Materiality gate: nothing material moved, reusing holds (skip {materiality.skips}/{materiality.max_skips})")
+                outputs = reused
+            elif agent.stream:
+                # Place each asset's orders while the model is still writing the rest
+                try:
+                    async for output in agent.stream_decisions(args.assets, context):
+                        outputs.append(output)
+                        # Parse-error holds wait for the retry below
+                        if not _is_failed_outputs([output]):
+                            executed.add(output.get("asset"))
+                            await execute_decision(output)
+                except Exception as e:
+                    import traceback
+                    add_event(f"Agent stream error: {e}")
+                    add_event(f"Traceback: {traceback.format_exc()}")
+            elif agent.sharded:
+                # Concurrent per-group requests; failed groups are retried by the agent
+                try:
+                    outputs = await agent.decide_sharded(args.assets, market_sections, shared_context)
+                    add_event(f"Sharded decisions: {agent.shard_stats}")
+                except Exception as e:
+                    import traceback
+                    add_event(f"Agent shard error: {e}")
+                    add_event(f"Traceback: {traceback.format_exc()}")
+            else:
+                try:
+                    outputs = await agent.decide_trade(args.assets, context)
+                    if not isinstance(outputs, list):
+                        add_event(f"Invalid output format (expected list): {outputs}")
+                        outputs = []
+                except Exception as e:
+                    import traceback
+                    add_event(f"Agent error: {e}")
+                    add_event(f"Traceback: {traceback.format_exc()}")
+                    outputs = []
+
+            # Retry once on failure/parse error with a stricter instruction prefix
+            if _is_failed_outputs(outputs):
+                add_event("Retrying LLM once due to invalid/parse-error output")
+                context_retry = (
+                    "## Retry Instruction\nReturn ONLY the JSON array per schema with no prose.\n\n" + context
+                )
+                try:
+                    outputs = await agent.decide_trade(args.assets, context_retry)
+                    if not isinstance(outputs, list):
+                        add_event(f"Retry invalid format: {outputs}")
+                        outputs = []
+                except Exception as e:
+                    import traceback
+                    add_event(f"Retry agent error: {e}")
+                    add_event(f"Retry traceback: {traceback.format_exc()}")
+                    outputs = []
+
+            if materiality and reused is None and not _is_failed_outputs(outputs):
+                materiality.record(snapshots, outputs)
+
+            cycle = {
+                "prefetched": prefetched,
+                "snapshot_wait": round(snapshot_wait, 3),
+                "snapshot_age": round(tick + snapshot_wait - snapshot["ready_at"], 3) if prefetched else 0.0,
+                "snapshot_seconds": round(snapshot["seconds"], 3),
+                "decision_latency": round(time.monotonic() - tick, 3),
+            }
+            pipeline_history.append(cycle)
+            add_event(f"Cycle {invocation_count}: decisions {cycle['decision_latency']:.1f}s after tick (snapshot {'prefetched, waited' if prefetched else 'read'} {snapshot_wait:.1f}s)")
+
+            # Execute trades for each asset not already handled while streaming
+            for output in outputs:
+                if output.get("asset") in executed:
+                    continue
+                await execute_decision(output)
+
+            cache = agent.prompt_cache_stats()
+            if cache["requests"]:
+                add_event(f"LLM prompt cache: {cache['cached_tokens']}/{cache['prompt_tokens']} prompt tokens cached (hit rate {cache['hit_rate']:.0%})")
+
+            scheduler.end()
+            next_tick = scheduler.next_tick()
+            trigger_reasons = None
+            if triggers:
+                # Fills are re-read after execution so this cycle's own orders do not count as new
+                triggers.arm(
+                    asset_prices,
+                    atrs={a: sampled_atr(p["mid"] for p in price_history.get(a, [])) for a in asset_prices},
+                    fills=_capture_value(await _capture(trading_api.get_recent_fills(limit=50))),
+                    positions=state['positions'],
+                    deadlines=[exit_deadline(t) for t in active_trades],
+                    now=cycle_started_at,
+                )
+            # Pipelining: the next snapshot is read in the background shortly before the
+            # next tick, only after this cycle's orders are placed, so it sees their effect
+            if prefetch_lead > 0:
+                prefetch_at = next_tick - min(prefetch_lead, scheduler.period)
+                close = scheduler.candle_close(next_tick)
+                # Indicator reads wait for the bar to close and the indicator cache to expire it
+                indicators_at = close + indicator_grace if close is not None else None
+                trigger_reasons = await idle_until(prefetch_at, state['positions'])
+                if not trigger_reasons:
+                    pending_snapshot = asyncio.create_task(take_snapshot(
+                        trading_api, indicators_client, args.assets, args.interval, add_event, indicators_at=indicators_at))
+            if not trigger_reasons:
+                trigger_reasons = await idle_until(next_tick, state['positions'], pending_snapshot)
+            if trigger_reasons:
+                add_event(f"Event trigger: {'; '.join(trigger_reasons)}; starting the next cycle early")
+                next_tick = None
+
+    async def probe_triggers(positions, pending=None):
+        """Reads the event triggers compare against the last cycle.
+
+        Only prices are read live (one batch request where the exchange has one);
+        positions and fills come from the prefetched snapshot once it is ready,
+        otherwise the last cycle's positions are used and fills are not checked.
+        """
+        if hasattr(trading_api, 'get_current_prices'):
+            prices = await trading_api.get_current_prices(args.assets)
+        else:
+            prices = {a: p for a, p in (await gather_assets(args.assets, trading_api.get_current_price)).items()
+                      if not isinstance(p, Exception)}
+        fills = None
+        if pending is not None and pending.done() and not pending.cancelled() and pending.exception() is None:
+            snapshot = pending.result()
+            positions, fills = snapshot["state"]["positions"], _capture_value(snapshot["fills"])
+        return {"prices": prices, "fills": fills, "positions": positions}
+
+    async def idle_until(when, positions=None, pending=None):
+        """Sleep until ``when``, or return the reasons an event trigger fired first."""
+        if triggers is None:
+            await scheduler.sleep_until(when)
+            return None
+        return await triggers.wait(when, lambda: probe_triggers(positions, pending))
+
+    def pipeline_summary():
+        cycles = list(pipeline_history)
+        return {
+            "prefetch_lead": prefetch_lead,
+            "cycles": len(cycles),
+            "prefetched": sum(1 for c in cycles if c["prefetched"]),
+            "snapshot_wait": percentiles([c["snapshot_wait"] for c in cycles]),
+            "snapshot_age": percentiles([c["snapshot_age"] for c in cycles if c["prefetched"]]),
+            "snapshot_seconds": percentiles([c["snapshot_seconds"] for c in cycles]),
+            "decision_latency": percentiles([c["decision_latency"] for c in cycles]),
+        }
 
     async def handle_diary(request):
         try:
@@ -561,9 +943,33 @@ def main():
         except Exception as e:
             return web.json_response({"error": str(e)}, status=500)
 
+    async def handle_llm_metrics(request):
+        try:
+            summary = agent.telemetry.summary()
+            summary["prompt_cache"] = agent.prompt_cache_stats()
+            summary["parse"] = dict(agent.parse_stats)
+            summary["hedge"] = agent.hedge_summary()
+            summary["shards"] = dict(agent.shard_stats)
+            summary["capabilities"] = agent.capabilities.snapshot()
+            if agent.replay:
+                summary["replay"] = agent.replay.summary()
+            if materiality:
+                summary["materiality"] = materiality.summary()
+            summary["pipeline"] = pipeline_summary()
+            summary["scheduler"] = scheduler.summary()
+            if triggers:
+                summary["event_triggers"] = triggers.summary()
+            recent = request.query.get('recent')
+            if recent:
+                summary["recent"] = agent.telemetry.recent(int(recent))
+            return web.json_response(summary)
+        except Exception as e:
+            return web.json_response({"error": str(e)}, status=500)
+
     async def start_api(app):
         app.router.add_get('/diary', handle_diary)
         app.router.add_get('/logs', handle_logs)
+        app.router.add_get('/llm-metrics', handle_llm_metrics)
 
     async def main_async():
         app = web.Application()
@@ -573,7 +979,13 @@ def main():
         await runner.setup()
         site = web.TCPSite(runner, CFG.get("api_host"), int(CFG.get("api_port")))
         await site.start()
-        await run_loop()
+        try:
+            await run_loop()
+        finally:
+            # Pooled HTTP sessions are bound to this loop; close them before asyncio.run tears it down
+            await agent.close()
+            await indicators_client.close()
+            await runner.cleanup()
 
     def calculate_total_return(state, trade_log):
         initial = 10000
@@ -613,7 +1025,10 @@ def main():
             return False
         return False
 
-    asyncio.run(main_async())
+    try:
+        asyncio.run(main_async())
+    finally:
+        flush_all()
 
 
 if __name__ == "__main__":
@@ -15,6 +15,11 @@ class BaseTradingAPI(ABC):
         """Get current price for an asset."""
         pass
     
+    async def get_current_prices(self, assets: List[str]) -> Dict[str, float]:
+        """Get current prices for several assets (platforms with a batch endpoint override this)."""
+        prices = await asyncio.gather(*(self.get_current_price(a) for a in assets), return_exceptions=True)
+        return {a: p for a, p in zip(assets, prices) if not isinstance(p, Exception)}
+    
     @abstractmethod
     async def place_buy_order(self, asset: str, amount: float, **kwargs) -> Dict[str, Any]:
         """Place a buy order."""
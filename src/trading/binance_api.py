@@ -159,6 +159,12 @@ class BinanceAPI(BaseTradingAPI):
             logging.error(f"Error getting current price for {asset}: {e}")
             return 0.0
     
+    async def get_current_prices(self, assets: List[str]) -> Dict[str, float]:
+        """Current prices for several assets from one ticker request (unknown symbols are left out)."""
+        symbols = {a.strip().strip('"').strip("'").upper() + "USDT": a for a in assets}
+        data = await self._make_request('GET', '/api/v3/ticker/price', {'symbols': json.dumps(list(symbols), separators=(',', ':'))})
+        return {symbols[t['symbol']]: float(t['price']) for t in data if t.get('symbol') in symbols}
+
     async def place_buy_order(self, asset: str, amount: float, **kwargs) -> Dict[str, Any]:
         """Place a buy order."""
         try:
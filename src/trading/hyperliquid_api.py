@@ -181,6 +181,11 @@ class HyperliquidAPI:
         mids = await self._retry(lambda: self.info.all_mids())
         return float(mids.get(asset, 0.0))
 
+    async def get_current_prices(self, assets):
+        """Mid prices for several assets from one all-mids request (assets without a mid are left out)."""
+        mids = await self._retry(lambda: self.info.all_mids())
+        return {a: float(mids[a]) for a in assets if a in mids}
+
     async def get_meta_and_ctxs(self):
         """Cache meta and asset contexts to avoid repeated calls."""
         if not hasattr(self, '_meta_cache') or not self._meta_cache:
@@ -0,0 +1,146 @@
+import asyncio
+import itertools
+import math
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from src.config_loader import CONFIG
+from src.trading.base_trading_api import BaseTradingAPI
+
+# Starting prices of the random walk; other assets start at 100
+_START_PRICES = {"BTC": 60000.0, "ETH": 3000.0, "SOL": 150.0, "BNB": 600.0, "XRP": 0.5, "DOGE": 0.15}
+
+
+class SimulatedTradingAPI(BaseTradingAPI):
+    """In-memory exchange with random-walk prices for load tests (TRADING_PLATFORM=simulated).
+
+    Nothing goes over the network: every call answers after ``latency`` seconds.
+    Market orders fill at once at the current price and update the position and
+    balance; TP/SL orders rest as trigger orders and never execute. Each price
+    read advances that asset's walk by one step of ``volatility``.
+    """
+
+    def __init__(self, balance: float = 10000.0, volatility: float = 0.001, latency: Optional[float] = None,
+                 seed: Optional[int] = None):
+        self.balance = balance
+        self.volatility = volatility
+        self.latency = float(CONFIG.get("simulated_latency") or 0) if latency is None else latency
+        self._rng = random.Random(seed)
+        self._prices: Dict[str, float] = {}
+        self._positions: Dict[str, Dict[str, Any]] = {}
+        self._orders: List[Dict[str, Any]] = []
+        self._fills: List[Dict[str, Any]] = []
+        self._ids = itertools.count(1)
+
+    async def _wait(self):
+        await asyncio.sleep(self.latency)
+
+    def mid(self, asset: str) -> float:
+        """Last price of ``asset`` without advancing the walk."""
+        return self._prices.get(asset) or _START_PRICES.get(asset, 100.0)
+
+    def _step(self, asset: str) -> float:
+        price = self.mid(asset) * math.exp(self._rng.gauss(0.0, self.volatility))
+        self._prices[asset] = price
+        return price
+
+    async def get_user_state(self) -> Dict[str, Any]:
+        await self._wait()
+        positions = []
+        for coin, pos in self._positions.items():
+            pnl = (self.mid(coin) - pos["entryPx"]) * pos["szi"]
+            positions.append({"coin": coin, "szi": pos["szi"], "entryPx": pos["entryPx"], "pnl": pnl,
+                              "leverage": 1, "liquidationPx": None})
+        return {"balance": self.balance, "positions": positions}
+
+    async def get_current_price(self, asset: str) -> float:
+        await self._wait()
+        return self._step(asset)
+
+    async def get_current_prices(self, assets: List[str]) -> Dict[str, float]:
+        await self._wait()
+        return {a: self._step(a) for a in assets}
+
+    def _fill(self, asset: str, is_buy: bool, amount: float) -> Dict[str, Any]:
+        px = self.mid(asset)
+        signed = amount if is_buy else -amount
+        pos = self._positions.get(asset)
+        if pos is None:
+            self._positions[asset] = {"szi": signed, "entryPx": px}
+        elif pos["szi"] * signed > 0:
+            # Adding to the position: volume-weighted entry
+            size = pos["szi"] + signed
+            pos["entryPx"] = (pos["entryPx"] * pos["szi"] + px * signed) / size
+            pos["szi"] = size
+        else:
+            closed = min(abs(signed), abs(pos["szi"]))
+            self.balance += (px - pos["entryPx"]) * closed * (1 if pos["szi"] > 0 else -1)
+            size = pos["szi"] + signed
+            if abs(size) < 1e-12:
+                del self._positions[asset]
+            else:
+                # Flipped sides: the remainder opened at this price
+                pos["entryPx"] = px if pos["szi"] * size < 0 else pos["entryPx"]
+                pos["szi"] = size
+        oid = next(self._ids)
+        self._fills.append({"coin": asset, "isBuy": is_buy, "sz": amount, "px": px,
+                            "time": int(time.time() * 1000), "tid": oid, "oid": oid})
+        return {"status": "ok", "response": {"data": {"statuses": [{"filled": {"oid": oid, "totalSz": amount, "avgPx": px}}]}}}
+
+    async def place_buy_order(self, asset: str, amount: float, **kwargs) -> Dict[str, Any]:
+        await self._wait()
+        return self._fill(asset, True, self.round_size(asset, amount))
+
+    async def place_sell_order(self, asset: str, amount: float, **kwargs) -> Dict[str, Any]:
+        await self._wait()
+        return self._fill(asset, False, self.round_size(asset, amount))
+
+    def _rest(self, asset: str, is_buy: bool, amount: float, trigger_px: float, tpsl: str) -> Dict[str, Any]:
+        oid = next(self._ids)
+        self._orders.append({"coin": asset, "oid": oid, "isBuy": not is_buy, "sz": self.round_size(asset, amount),
+                             "px": None, "triggerPx": float(trigger_px), "orderType": {"trigger": {"tpsl": tpsl}}})
+        return {"status": "ok", "response": {"data": {"statuses": [{"resting": {"oid": oid}}]}}}
+
+    async def place_take_profit(self, asset: str, is_buy: bool, amount: float, tp_price: float) -> Dict[str, Any]:
+        await self._wait()
+        return self._rest(asset, is_buy, amount, tp_price, "tp")
+
+    async def place_stop_loss(self, asset: str, is_buy: bool, amount: float, sl_price: float) -> Dict[str, Any]:
+        await self._wait()
+        return self._rest(asset, is_buy, amount, sl_price, "sl")
+
+    async def cancel_order(self, asset: str, order_id: str) -> Dict[str, Any]:
+        await self._wait()
+        before = len(self._orders)
+        self._orders = [o for o in self._orders if not (o["coin"] == asset and o["oid"] == order_id)]
+        return {"status": "ok" if len(self._orders) < before else "error"}
+
+    async def cancel_all_orders(self, asset: str) -> Dict[str, Any]:
+        await self._wait()
+        before = len(self._orders)
+        self._orders = [o for o in self._orders if o["coin"] != asset]
+        return {"status": "ok", "cancelled_count": before - len(self._orders)}
+
+    async def get_open_orders(self) -> List[Dict[str, Any]]:
+        await self._wait()
+        return [dict(o) for o in self._orders]
+
+    async def get_recent_fills(self, limit: int = 50) -> List[Dict[str, Any]]:
+        await self._wait()
+        return [dict(f) for f in self._fills[-limit:]]
+
+    def extract_oids(self, order_result: Dict[str, Any]) -> List[str]:
+        statuses = (order_result.get("response") or {}).get("data", {}).get("statuses", [])
+        return [s[k]["oid"] for s in statuses for k in ("filled", "resting") if k in s]
+
+    async def get_open_interest(self, asset: str) -> Optional[float]:
+        await self._wait()
+        return round(1_000_000 / self.mid(asset), 2)
+
+    async def get_funding_rate(self, asset: str) -> Optional[float]:
+        await self._wait()
+        return 0.0000125
+
+    def round_size(self, asset: str, amount: float) -> float:
+        return round(amount, 6)
@@ -0,0 +1,107 @@
+import asyncio
+import atexit
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class BackgroundLoop:
+    """A single persistent event loop running in a daemon thread.
+
+    Sync callers (scripts, tool executors, tests) submit coroutines here instead of
+    creating a fresh event loop and worker thread for every call.
+    """
+
+    def __init__(self, name: str = "async-bridge"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _run(self, ready: threading.Event):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            try:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                loop.close()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Return the background loop, starting the thread on first use."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed() or not (self._thread and self._thread.is_alive()):
+                ready = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(ready,), name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the background loop and block until it completes."""
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("BackgroundLoop.run() cannot be called from the background loop thread")
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self):
+        """Stop the loop and join the thread (idempotent)."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(loop.stop)
+        if thread is not None and thread.is_alive():
+            thread.join(timeout=5)
+
+
+_DEFAULT_LOOP = BackgroundLoop()
+# Close tasks for sessions of closed loops, kept referenced until they finish
+_closing = set()
+
+
+def _closed(task: asyncio.Task):
+    _closing.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logging.debug(f"Stale session close error: {task.exception()}")
+
+
+def drop_stale(pools: Dict[asyncio.AbstractEventLoop, Any], session_of: Callable[[Any], Any] = lambda entry: entry):
+    """Remove ``pools`` entries whose event loop has closed and close their sessions on the running loop.
+
+    ``session_of`` picks the aiohttp session out of an entry (e.g. a (session, semaphore) pair).
+    """
+    for stale_loop in [l for l in pools if l.is_closed()]:
+        session = session_of(pools.pop(stale_loop))
+        if not session.closed:
+            task = asyncio.get_running_loop().create_task(session.close())
+            _closing.add(task)
+            task.add_done_callback(_closed)
+
+
+def run_sync(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """Run a coroutine to completion from sync code using the shared background loop."""
+    return _DEFAULT_LOOP.run(coro, timeout=timeout)
+
+
+def get_background_loop() -> BackgroundLoop:
+    return _DEFAULT_LOOP
+
+
+@atexit.register
+def _shutdown_default_loop():
+    try:
+        _DEFAULT_LOOP.stop()
+    except Exception as e:
+        logging.debug(f"Background loop shutdown error: {e}")
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src.utils.intervals import next_candle_close
+
+
+class CandleCache:
+    """Response cache whose entries expire at the next candle close of their interval.
+
+    Values computed on the still-forming bar can optionally be served stale while a
+    background refresh runs (``revalidate_after`` seconds after they were fetched);
+    at the candle close every entry is hard-expired and refetched inline.
+    Concurrent lookups of the same key on the same loop share one in-flight fetch.
+    """
+
+    def __init__(self, revalidate_after: Optional[float] = None, close_grace: float = 2.0, max_entries: int = 5000):
+        self.revalidate_after = revalidate_after if revalidate_after and revalidate_after > 0 else None
+        self.close_grace = close_grace
+        self.max_entries = max_entries
+        # key -> (fetched_at, expires_at, value)
+        self._entries: Dict[str, Tuple[float, float, Any]] = {}
+        self._inflight: Dict[Tuple[int, str], asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+
+    def expiry_for(self, interval: str, now: Optional[float] = None) -> float:
+        # Small grace after the close so the provider has the closed bar available
+        return next_candle_close(interval, now) + self.close_grace
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Return a fresh cached value without touching counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and time.time() < entry[1]:
+            return entry[2]
+        return None
+
+    def set(self, key: str, interval: str, value: Any, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._entries[key] = (now, self.expiry_for(interval, now), value)
+            if len(self._entries) > self.max_entries:
+                self._evict(now)
+
+    def _evict(self, now: float):
+        expired = [k for k, (_, expires_at, _) in self._entries.items() if expires_at <= now]
+        for k in expired:
+            self._entries.pop(k, None)
+        # Still too large: drop the oldest fetches
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            for k, _ in sorted(self._entries.items(), key=lambda kv: kv[1][0])[:overflow]:
+                self._entries.pop(k, None)
+
+    def _fetch_task(self, key: str, interval: str, fetcher: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), key)
+        task = self._inflight.get(inflight_key)
+        if task is None or task.done():
+            async def _run():
+                try:
+                    value = await fetcher()
+                    if value is not None:
+                        self.set(key, interval, value)
+                    return value
+                finally:
+                    self._inflight.pop(inflight_key, None)
+            task = loop.create_task(_run())
+            self._inflight[inflight_key] = task
+        return task
+
+    async def get_or_fetch(self, key: str, interval: str, fetcher: Callable[[], Awaitable[Any]], revalidate: bool = True) -> Any:
+        """Return the cached value for key, fetching (or revalidating) it when needed.
+
+        ``revalidate`` should be False for requests pinned to closed bars (e.g. backtrack>=1),
+        whose values cannot change before the candle close.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and now < entry[1]:
+            fetched_at, _, value = entry
+            if revalidate and self.revalidate_after and now - fetched_at >= self.revalidate_after:
+                self.stale_hits += 1
+                running = self._inflight.get((id(asyncio.get_running_loop()), key))
+                if running is None or running.done():
+                    self.refreshes += 1
+                    self._fetch_task(key, interval, fetcher).add_done_callback(_log_refresh_error)
+            else:
+                self.hits += 1
+            return value
+        self.misses += 1
+        return await asyncio.shield(self._fetch_task(key, interval, fetcher))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _log_refresh_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logging.warning(f"Background cache refresh failed: {task.exception()}")
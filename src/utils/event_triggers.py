@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def fill_key(fill: Dict[str, Any]) -> tuple:
+    """Identity of a fill across reads (exchanges differ in field names)."""
+    return (fill.get("tid") or fill.get("id") or fill.get("time") or fill.get("timestamp"),
+            fill.get("coin") or fill.get("asset"), fill.get("px") or fill.get("price"), fill.get("sz") or fill.get("size"))
+
+
+class EventTriggers:
+    """Wakes the run loop between ticks when something happens that should not wait.
+
+    After each cycle ``arm`` stores that cycle's prices, ATRs, fills, positions near
+    liquidation and exit-plan deadlines. ``wait`` then sleeps until the next tick,
+    polling ``probe`` every ``poll`` seconds. It returns early with the reasons when
+    one of these happens:
+
+    - a price moves more than ``atr_multiple`` ATRs, or ``price_pct`` percent when
+      no ATR is known;
+    - a new fill appears (e.g. a TP/SL);
+    - a position comes within ``liq_pct`` percent of its liquidation price;
+    - an exit-plan deadline passes.
+
+    A condition must still hold ``debounce`` seconds after it was first seen, and
+    at least ``min_spacing`` seconds must separate cycles.
+    """
+
+    def __init__(self, atr_multiple: float = 1.0, price_pct: float = 1.0, liq_pct: float = 5.0,
+                 debounce: float = 10.0, min_spacing: float = 60.0, poll: float = 15.0,
+                 clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep):
+        self.atr_multiple = atr_multiple
+        self.price_pct = price_pct
+        self.liq_pct = liq_pct
+        self.debounce = debounce
+        self.min_spacing = min_spacing
+        self.poll = max(0.1, poll)
+        self._clock = clock
+        self._sleep = sleep
+        self._prices: Dict[str, float] = {}
+        self._atrs: Dict[str, Optional[float]] = {}
+        self._fills: Optional[set] = set()
+        self._near_liquidation: set = set()
+        self._deadlines: List[float] = []
+        self._armed_at = 0.0
+        self.last_reasons: List[str] = []
+        self.stats = {"polls": 0, "probe_errors": 0, "fired": 0, "debounced": 0, "spaced": 0}
+
+    def arm(self, prices: Dict[str, float], atrs: Optional[Dict[str, Optional[float]]] = None,
+            fills: Optional[Iterable[Dict[str, Any]]] = None, positions: Optional[Iterable[Dict[str, Any]]] = None,
+            deadlines: Iterable[Optional[float]] = (), now: Optional[float] = None):
+        """Baseline from the cycle that just ran (its start time counts for ``min_spacing``)."""
+        self._armed_at = self._clock() if now is None else now
+        self._prices = {a: p for a, p in prices.items() if _number(p)}
+        self._atrs = dict(atrs or {})
+        # Unknown fills (failed read): the first probe becomes the baseline
+        self._fills = None if fills is None else {fill_key(f) for f in fills}
+        self._near_liquidation = set(self._liquidation_risks(positions, prices))
+        self._deadlines = [d for d in deadlines if d and d > self._armed_at]
+
+    def _liquidation_risks(self, positions, prices) -> List[str]:
+        risks = []
+        for pos in positions or []:
+            coin = pos.get("coin")
+            liq = _number(pos.get("liquidationPx") or pos.get("liqPx"))
+            price = _number(prices.get(coin))
+            if liq and price and abs(float(pos.get("szi") or 0)) > 0 and abs(price - liq) / price * 100 <= self.liq_pct:
+                risks.append(coin)
+        return risks
+
+    def check(self, prices: Optional[Dict[str, float]] = None, fills: Optional[Iterable[Dict[str, Any]]] = None,
+              positions: Optional[Iterable[Dict[str, Any]]] = None, now: Optional[float] = None) -> List[str]:
+        """Reasons to start a cycle now (empty when nothing happened)."""
+        now = self._clock() if now is None else now
+        prices = prices or {}
+        reasons = []
+        for asset, base in self._prices.items():
+            price = _number(prices.get(asset))
+            if price is None:
+                continue
+            atr = self._atrs.get(asset)
+            if atr:
+                moved = abs(price - base) / atr
+                if moved > self.atr_multiple:
+                    reasons.append(f"{asset} moved {moved:.1f} ATR ({base} -> {price})")
+            elif abs(price - base) / base * 100 > self.price_pct:
+                reasons.append(f"{asset} moved {(price - base) / base * 100:+.2f}% ({base} -> {price})")
+        if self._fills is None:
+            self._fills = None if fills is None else {fill_key(f) for f in fills}
+        new_fills = [f for f in fills or [] if self._fills is not None and fill_key(f) not in self._fills]
+        if new_fills:
+            coins = sorted({str(f.get("coin") or f.get("asset")) for f in new_fills})
+            reasons.append(f"{len(new_fills)} new fill(s): {', '.join(coins)}")
+        for coin in self._liquidation_risks(positions, prices):
+            if coin not in self._near_liquidation:
+                reasons.append(f"{coin} within {self.liq_pct}% of liquidation")
+        due = [d for d in self._deadlines if d <= now]
+        if due:
+            reasons.append(f"{len(due)} exit-plan deadline(s) passed")
+        return reasons
+
+    async def wait(self, until: float, probe: Callable[[], Awaitable[Dict[str, Any]]]) -> Optional[List[str]]:
+        """Sleep until ``until``; the trigger reasons if a cycle should start earlier, else None."""
+        pending_since = None
+        while True:
+            now = self._clock()
+            if now >= until:
+                if pending_since is not None:
+                    self.stats["spaced"] += 1
+                return None
+            wake = now + self.poll
+            if pending_since is not None:
+                wake = min(wake, max(pending_since + self.debounce, self._armed_at + self.min_spacing))
+            await self._sleep(max(0.0, min(wake, until) - now))
+            if self._clock() >= until:
+                continue
+            self.stats["polls"] += 1
+            try:
+                reads = await probe()
+            except Exception as e:
+                self.stats["probe_errors"] += 1
+                logging.warning(f"Event trigger probe failed: {e}")
+                continue
+            now = self._clock()
+            reasons = self.check(now=now, **reads)
+            if not reasons:
+                if pending_since is not None:
+                    self.stats["debounced"] += 1
+                pending_since = None
+                continue
+            if pending_since is None:
+                pending_since = now
+            if now - pending_since >= self.debounce and now - self._armed_at >= self.min_spacing:
+                self.stats["fired"] += 1
+                self.last_reasons = reasons
+                return reasons
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "atr_multiple": self.atr_multiple, "price_pct": self.price_pct, "liq_pct": self.liq_pct,
+            "debounce": self.debounce, "min_spacing": self.min_spacing, "poll": self.poll,
+            **self.stats, "last_reasons": self.last_reasons,
+        }
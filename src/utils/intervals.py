@@ -0,0 +1,30 @@
+import time
+
+
+def interval_seconds(interval_str: str) -> int:
+    """Parse a candle interval such as "5m", "4h", "1d" or "1w" into seconds ("30s" for simulated load tests)."""
+    # Clean interval string - remove quotes and extra characters
+    clean_interval = interval_str.strip().replace('"', '').replace("'", '')
+
+    if clean_interval.endswith('s'):
+        return int(clean_interval[:-1])
+    elif clean_interval.endswith('m'):
+        return int(clean_interval[:-1]) * 60
+    elif clean_interval.endswith('h'):
+        return int(clean_interval[:-1]) * 3600
+    elif clean_interval.endswith('d'):
+        return int(clean_interval[:-1]) * 86400
+    elif clean_interval.endswith('w'):
+        return int(clean_interval[:-1]) * 604800
+    else:
+        raise ValueError(f"Unsupported interval: {clean_interval}")
+
+
+def next_candle_close(interval_str: str, now: float | None = None) -> float:
+    """Epoch seconds of the next close of a UTC-aligned candle of the given interval."""
+    if now is None:
+        now = time.time()
+    step = interval_seconds(interval_str)
+    # Weekly candles on Binance open Monday 00:00 UTC; the epoch started on a Thursday
+    offset = 4 * 86400 if interval_str.strip().strip('"\'').endswith('w') else 0
+    return ((now - offset) // step + 1) * step + offset
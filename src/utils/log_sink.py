@@ -0,0 +1,156 @@
+import atexit
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from src.config_loader import CONFIG
+
+_STOP = object()
+
+
+class LogSink:
+    """Queue-backed JSON-lines file writer running in a daemon thread.
+
+    ``write`` never blocks the caller: records are queued and serialised by the
+    worker, which rotates the file by size and/or age and gzips rotated files
+    (keeping ``backups`` of them). ``sampled`` records (full payloads) are kept
+    with probability ``sample_rate``. Records are dropped, and counted, when the
+    queue is full.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10_000_000, rotate_seconds: float = 0, backups: int = 5,
+                 sample_rate: float = 1.0, queue_size: int = 10000):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backups = backups
+        self.sample_rate = sample_rate
+        self.stats = {"written": 0, "dropped": 0, "sampled_out": 0, "rotations": 0}
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._opened_at = 0.0
+        self._thread = threading.Thread(target=self._run, name=f"log-sink:{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any], sampled: bool = False) -> bool:
+        """Queue one record (a ``ts`` is added if missing); False if sampled out or dropped."""
+        if sampled and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.stats["sampled_out"] += 1
+            return False
+        record.setdefault("ts", datetime.now(timezone.utc).isoformat())
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+
+    def flush(self, timeout: Optional[float] = 5.0):
+        """Block until everything queued so far is on disk."""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            if isinstance(item, threading.Event):
+                if self._file:
+                    self._file.flush()
+                item.set()
+                continue
+            try:
+                line = json.dumps(item, separators=(",", ":"), default=str) + "\n"
+                self._rotate_if_needed(len(line))
+                self._file.write(line)
+                self.stats["written"] += 1
+                # Flush once the burst is written rather than per record
+                if self._queue.empty():
+                    self._file.flush()
+            except Exception as e:
+                logging.debug(f"Log sink {self.path} write error: {e}")
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "a")
+        self._opened_at = time.time()
+
+    def _rotate_if_needed(self, incoming: int):
+        if self._file is None:
+            self._open()
+        size = self._file.tell()
+        too_big = self.max_bytes and size and size + incoming > self.max_bytes
+        too_old = self.rotate_seconds and size and time.time() - self._opened_at >= self.rotate_seconds
+        if not (too_big or too_old):
+            return
+        self._file.close()
+        rotated = f"{self.path}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+        os.replace(self.path, rotated)
+        with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(rotated)
+        archives = sorted(glob.glob(f"{glob.escape(self.path)}.*.gz"))
+        for old in archives[:max(0, len(archives) - self.backups)]:
+            os.remove(old)
+        self.stats["rotations"] += 1
+        self._open()
+
+
+_SINKS: Dict[str, LogSink] = {}
+_SINKS_LOCK = threading.Lock()
+
+
+def get_sink(path: str) -> LogSink:
+    """Shared sink for ``path`` (resolved against the current directory), configured from env."""
+    key = os.path.abspath(path)
+    with _SINKS_LOCK:
+        sink = _SINKS.get(key)
+        if sink is None:
+            sink = LogSink(
+                key,
+                max_bytes=int(CONFIG.get("log_max_bytes") or 10_000_000),
+                rotate_seconds=float(CONFIG.get("log_rotate_seconds") or 0),
+                backups=int(CONFIG.get("log_backups") or 5),
+                sample_rate=float(CONFIG.get("llm_log_sample_rate") or 1.0),
+            )
+            _SINKS[key] = sink
+        return sink
+
+
+def flush_all(timeout: Optional[float] = 5.0):
+    for sink in list(_SINKS.values()):
+        sink.flush(timeout)
+
+
+@atexit.register
+def close_all():
+    with _SINKS_LOCK:
+        sinks = list(_SINKS.values())
+        _SINKS.clear()
+    for sink in sinks:
+        try:
+            sink.close()
+        except Exception as e:
+            logging.debug(f"Log sink shutdown error: {e}")
@@ -0,0 +1,94 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from src.agent.telemetry import percentiles
+from src.utils.intervals import interval_seconds, next_candle_close
+
+OVERRUN_POLICIES = ("skip", "coalesce")
+
+
+class CycleScheduler:
+    """Wall-clock cycle ticks aligned to candle closes plus ``offset`` seconds.
+
+    ``next_tick`` is called after a cycle finishes. When the cycle ran past one or
+    more boundaries, ``overrun="skip"`` waits for the next future boundary and
+    ``"coalesce"`` starts one catch-up cycle right away for all the missed ones.
+    With ``align=False`` the next tick is simply ``interval`` after the cycle ends.
+    Start lag (start time minus tick) and cycle duration are kept for the last
+    ``window`` cycles.
+    """
+
+    def __init__(self, interval: str, offset: float = 0.0, align: bool = True, overrun: str = "coalesce",
+                 window: int = 100, clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep):
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"Unsupported overrun policy: {overrun} (use one of {OVERRUN_POLICIES})")
+        self.interval = interval
+        self.period = interval_seconds(interval)
+        if align and self.period <= 0:
+            raise ValueError(f"Aligned cycles need a positive interval, got {interval} (use CYCLE_ALIGN=false)")
+        self.offset = offset
+        self.align = align
+        self.overrun = overrun
+        self._clock = clock
+        self._sleep = sleep
+        self._last_tick: Optional[float] = None
+        self._started: Optional[float] = None
+        self._lags: deque = deque(maxlen=window)
+        self._durations: deque = deque(maxlen=window)
+        self.stats = {"cycles": 0, "overruns": 0, "skipped": 0, "coalesced": 0}
+
+    def boundary_after(self, t: float) -> float:
+        """First aligned tick strictly after ``t``."""
+        return next_candle_close(self.interval, t - self.offset) + self.offset
+
+    def candle_close(self, tick: float) -> Optional[float]:
+        """Close of the candle a tick belongs to (None when not aligned)."""
+        return tick - self.offset if self.align else None
+
+    def begin(self, tick: Optional[float] = None) -> float:
+        """Mark a cycle start for ``tick`` (None = now, e.g. the first cycle)."""
+        now = self._clock()
+        tick = now if tick is None else tick
+        self._lags.append(max(0.0, now - tick))
+        self._last_tick = tick
+        self._started = now
+        self.stats["cycles"] += 1
+        return tick
+
+    def end(self):
+        if self._started is not None:
+            self._durations.append(self._clock() - self._started)
+            self._started = None
+
+    def next_tick(self) -> float:
+        """Time the next cycle should start."""
+        now = self._clock()
+        if not self.align:
+            return now + self.period
+        due = self.boundary_after(self._last_tick if self._last_tick is not None else now)
+        if due > now:
+            return due
+        missed = int((now - due) // self.period) + 1
+        self.stats["overruns"] += 1
+        if self.overrun == "skip":
+            self.stats["skipped"] += missed
+            return self.boundary_after(now)
+        # One catch-up cycle for the latest missed boundary stands in for all of them
+        self.stats["coalesced"] += missed - 1
+        return due + (missed - 1) * self.period
+
+    async def sleep_until(self, when: float):
+        delay = when - self._clock()
+        if delay > 0:
+            await self._sleep(delay)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval, "offset": self.offset, "align": self.align, "overrun": self.overrun,
+            **self.stats,
+            "start_lag": percentiles(list(self._lags)),
+            "cycle_duration": percentiles(list(self._durations)),
+        }
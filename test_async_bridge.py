@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent background-loop sync facade
+"""
+import asyncio
+import threading
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.async_bridge import run_sync, get_background_loop
+from src.indicators.binance_indicators import BinanceIndicators
+
+
+async def _loop_identity():
+    await asyncio.sleep(0)
+    return id(asyncio.get_running_loop()), threading.current_thread().name
+
+
+def test_run_sync_reuses_loop():
+    """Repeated sync calls run on the same loop and thread."""
+    print("Testing run_sync loop reuse...")
+    first = run_sync(_loop_identity())
+    second = run_sync(_loop_identity())
+    assert first == second, f"expected same loop/thread, got {first} vs {second}"
+    print(f"✅ Same loop reused across calls: {first}")
+
+
+def test_run_sync_from_running_loop():
+    """run_sync works when called from inside another running event loop."""
+    print("Testing run_sync from async context...")
+
+    async def caller():
+        return run_sync(_loop_identity())
+
+    loop_id, thread_name = asyncio.run(caller())
+    assert thread_name == get_background_loop().name
+    print(f"✅ Dispatched to background thread '{thread_name}'")
+
+
+def test_historical_indicator_facade():
+    """get_historical_indicator formats series values without creating new loops."""
+    print("Testing BinanceIndicators.get_historical_indicator facade...")
+    indicators = BinanceIndicators()
+    loops = []
+
+    async def fake_fetch_series(indicator, symbol, interval, results=10, params=None, value_key="value"):
+        loops.append(asyncio.get_running_loop())
+        return [1.0, 2.0, 3.0][-results:]
+
+    indicators.fetch_series = fake_fetch_series
+    out1 = indicators.get_historical_indicator("ema", "BTC/USDT", "5m", results=2)
+    out2 = indicators.get_historical_indicator("ema", "BTC/USDT", "5m", results=3)
+    assert out1 == [{"value": 2.0}, {"value": 3.0}]
+    assert out2 == [{"value": 1.0}, {"value": 2.0}, {"value": 3.0}]
+    assert loops[0] is loops[1], "facade should reuse the persistent loop"
+    print("✅ Facade results formatted and loop reused")
+
+
+def test_session_shared_per_loop():
+    """The aiohttp session is created once per loop and reused."""
+    print("Testing shared session per loop...")
+    indicators = BinanceIndicators()
+
+    async def get_twice():
+        s1 = indicators._get_session()
+        s2 = indicators._get_session()
+        same = s1 is s2
+        await indicators.close()
+        return same
+
+    assert run_sync(get_twice())
+    print("✅ Session reused within a loop")
+
+
+def test_stale_loop_session_closed():
+    """A session left behind by a closed loop is closed, not just dropped, when the next loop needs one."""
+    print("Testing stale session cleanup...")
+    indicators = BinanceIndicators()
+
+    async def make_session():
+        return indicators._get_session()
+
+    stale = asyncio.run(make_session())
+    assert not stale.closed
+
+    async def next_loop():
+        fresh = indicators._get_session()
+        await asyncio.sleep(0.05)
+        await indicators.close()
+        return fresh
+
+    fresh = asyncio.run(next_loop())
+    assert stale.closed and fresh is not stale and not indicators._sessions
+    print("✅ Stale session closed")
+
+
+if __name__ == "__main__":
+    test_run_sync_reuses_loop()
+    test_run_sync_from_running_loop()
+    test_historical_indicator_facade()
+    test_session_shared_per_loop()
+    test_stale_loop_session_closed()
+    print("🎉 Async bridge tests completed!")
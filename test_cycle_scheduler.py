@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test script for the wall-clock-aligned cycle scheduler
+"""
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.scheduler import CycleScheduler
+
+BASE = 1_700_000_100.0  # an exact 5m close
+
+
+class _Clock:
+    def __init__(self, now):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _scheduler(clock, **kwargs):
+    return CycleScheduler("5m", offset=5, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_ticks_align_to_closes():
+    """Ticks land on closes plus the offset regardless of cycle duration."""
+    print("Testing aligned ticks...")
+    clock = _Clock(BASE + 42)
+    scheduler = _scheduler(clock)
+    scheduler.begin()  # first cycle runs at startup
+    ticks = []
+    for work in (20, 95, 3):
+        clock.now += work
+        scheduler.end()
+        tick = scheduler.next_tick()
+        asyncio.run(scheduler.sleep_until(tick))
+        scheduler.begin(tick)
+        ticks.append(tick)
+    assert ticks == [BASE + 305, BASE + 605, BASE + 905], ticks
+    summary = scheduler.summary()
+    assert summary["cycles"] == 4 and summary["overruns"] == 0
+    assert summary["start_lag"]["p99"] == 0 and summary["cycle_duration"]["p50"] == 20
+    print(f"✅ Ticks at close+5s: {[t - BASE for t in ticks]}")
+
+
+def test_overrun_skip_and_coalesce():
+    """A cycle that runs past several ticks is skipped to the next close or coalesced into one catch-up."""
+    print("Testing overrun handling...")
+    for policy, expected, counter in (("skip", BASE + 1205, "skipped"), ("coalesce", BASE + 905, "coalesced")):
+        clock = _Clock(BASE + 5)
+        scheduler = _scheduler(clock, overrun=policy)
+        scheduler.begin(BASE + 5)
+        clock.now = BASE + 1000  # missed close+5 at 305, 605 and 905
+        scheduler.end()
+        tick = scheduler.next_tick()
+        assert tick == expected, (policy, tick - BASE)
+        asyncio.run(scheduler.sleep_until(tick))
+        scheduler.begin(tick)
+        stats = scheduler.summary()
+        assert stats["overruns"] == 1 and stats[counter] == (3 if policy == "skip" else 2), stats
+        if policy == "coalesce":
+            assert clock.sleeps == [] and stats["start_lag"]["p99"] == 95
+        # Back on the grid afterwards
+        clock.now += 10
+        assert scheduler.next_tick() == expected + 300
+    print("✅ Overruns skipped or coalesced")
+
+
+def test_unaligned_mode():
+    """With alignment off the next tick is one interval after the cycle ends."""
+    print("Testing unaligned mode...")
+    clock = _Clock(BASE + 42)
+    scheduler = _scheduler(clock, align=False)
+    scheduler.begin()
+    clock.now += 30
+    assert scheduler.next_tick() == BASE + 372 and scheduler.candle_close(BASE) is None
+    try:
+        CycleScheduler("5m", overrun="drop")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("✅ Unaligned mode")
+
+
+if __name__ == "__main__":
+    test_ticks_align_to_closes()
+    test_overrun_skip_and_coalesce()
+    test_unaligned_mode()
+    print("🎉 Cycle scheduler tests completed!")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-cycle snapshot used by the pipelined run loop
+"""
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.config_loader import CONFIG
+from src.main import _unwrap, take_snapshot
+
+DELAY = 0.1
+
+
+class _FakeTradingAPI:
+    def __init__(self):
+        self.calls = []
+
+    async def _read(self, name, value):
+        self.calls.append(name)
+        await asyncio.sleep(DELAY)
+        return value
+
+    async def get_user_state(self):
+        return await self._read("state", {"balance": 1000.0, "positions": [{"coin": "BTC", "szi": 0.1}, {"coin": "DOGE", "szi": 5}]})
+
+    async def get_current_price(self, asset):
+        return await self._read(f"price:{asset}", 100.0)
+
+    async def get_open_orders(self):
+        await self._read("orders", None)
+        raise RuntimeError("orders endpoint down")
+
+    async def get_recent_fills(self, limit=50):
+        return await self._read("fills", [{"coin": "BTC", "px": 100.0}])
+
+    async def get_open_interest(self, asset):
+        return await self._read(f"oi:{asset}", 1.0)
+
+    async def get_funding_rate(self, asset):
+        return await self._read(f"funding:{asset}", 0.0)
+
+
+class _FakeIndicators:
+    def __init__(self):
+        self.started = None
+
+    async def get_indicators(self, asset, interval):
+        self.started = self.started or time.time()
+        await asyncio.sleep(DELAY)
+        return {}
+
+    async def fetch_series(self, indicator, symbol, interval, results=10, params=None, value_key="value"):
+        await asyncio.sleep(DELAY)
+        return [1.0] * results
+
+    async def fetch_value(self, indicator, symbol, interval, params=None, key="value"):
+        await asyncio.sleep(DELAY)
+        return 1.0
+
+
+def test_snapshot_reads_overlap():
+    """Account and market reads run together; failed reads are carried, not raised."""
+    print("Testing cycle snapshot...")
+    CONFIG["gather_concurrency"] = "10"
+    CONFIG["gather_asset_timeout"] = "5"
+    api = _FakeTradingAPI()
+    events = []
+    started = time.perf_counter()
+    snapshot = asyncio.run(take_snapshot(api, _FakeIndicators(), ["BTC", "ETH"], "1h", events.append))
+    elapsed = time.perf_counter() - started
+    # state -> position prices is the longest chain: two round trips
+    assert elapsed < 3 * DELAY, elapsed
+    assert snapshot["position_prices"] == {"BTC": 100.0, "DOGE": 100.0}
+    assert snapshot["fills"][0]["coin"] == "BTC"
+    assert isinstance(snapshot["open_orders"], RuntimeError)
+    try:
+        _unwrap(snapshot["open_orders"])
+        assert False, "expected the captured error"
+    except RuntimeError:
+        pass
+    assert set(snapshot["gathered"]) == {"BTC", "ETH"} and snapshot["gathered"]["ETH"]["price"] == 100.0
+    assert snapshot["ready_at"] <= time.monotonic() and snapshot["seconds"] < 3 * DELAY
+    assert any(e.startswith("Gathered market data for 2/2 assets") for e in events), events
+    print(f"✅ Snapshot of {len(api.calls)} reads in {elapsed:.2f}s")
+
+
+def test_indicator_reads_deferred():
+    """Account and quote reads start right away; indicator reads wait for ``indicators_at``."""
+    print("Testing deferred indicator reads...")
+    CONFIG["gather_concurrency"] = "10"
+    CONFIG["gather_asset_timeout"] = "5"
+    api, indicators = _FakeTradingAPI(), _FakeIndicators()
+    started = time.time()
+    snapshot = asyncio.run(take_snapshot(api, indicators, ["BTC"], "1h", lambda e: None, indicators_at=started + 3 * DELAY))
+    elapsed = time.time() - started
+    assert indicators.started >= started + 3 * DELAY and elapsed < 5 * DELAY, (indicators.started - started, elapsed)
+    assert snapshot["gathered"]["BTC"]["price"] == 100.0 and snapshot["gathered"]["BTC"]["indicators"] == {}
+    assert snapshot["position_prices"] == {"BTC": 100.0, "DOGE": 100.0}
+    print(f"✅ Indicators read {indicators.started - started:.2f}s in, snapshot ready in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    test_snapshot_reads_overlap()
+    test_indicator_reads_deferred()
+    print("🎉 Cycle snapshot tests completed!")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script for event-driven decision triggers between scheduled ticks
+"""
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.trading.hyperliquid_api import HyperliquidAPI
+from src.utils.event_triggers import EventTriggers
+
+T0 = 1_700_000_000.0
+
+
+class _Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+def _triggers(clock, **kwargs):
+    settings = {"atr_multiple": 1.0, "price_pct": 1.0, "liq_pct": 5.0, "debounce": 10, "min_spacing": 60, "poll": 5}
+    settings.update(kwargs)
+    triggers = EventTriggers(clock=clock, sleep=clock.sleep, **settings)
+    triggers.arm({"BTC": 60000.0, "ETH": 3000.0}, atrs={"BTC": 100.0, "ETH": None},
+                 fills=[{"tid": 1, "coin": "BTC", "px": 60000.0, "sz": 0.1}],
+                 positions=[{"coin": "ETH", "szi": 1.0, "liquidationPx": 2000.0}],
+                 deadlines=[T0 + 1000], now=T0)
+    return triggers
+
+
+def test_conditions_detected():
+    """ATR moves, percentage moves, new fills, liquidation proximity and deadlines each trigger."""
+    print("Testing trigger conditions...")
+    clock = _Clock(T0 + 30)
+    triggers = _triggers(clock)
+    assert triggers.check(prices={"BTC": 60090.0, "ETH": 3020.0}) == []
+    reasons = triggers.check(prices={"BTC": 60150.0, "ETH": 2960.0}, now=T0 + 1001,
+                             fills=[{"tid": 1, "coin": "BTC", "px": 60000.0, "sz": 0.1}, {"tid": 2, "coin": "BTC", "px": 60150.0, "sz": 0.1}],
+                             positions=[{"coin": "BTC", "szi": -0.5, "liquidationPx": 62000.0}])
+    assert reasons == ["BTC moved 1.5 ATR (60000.0 -> 60150.0)", "ETH moved -1.33% (3000.0 -> 2960.0)",
+                       "1 new fill(s): BTC", "BTC within 5.0% of liquidation", "1 exit-plan deadline(s) passed"], reasons
+    # A position already near liquidation when armed does not re-trigger
+    triggers.arm({"SOL": 100.0}, positions=[{"coin": "SOL", "szi": 3, "liquidationPx": 97.0}], now=T0)
+    assert triggers.check(prices={"SOL": 99.5}, positions=[{"coin": "SOL", "szi": 3, "liquidationPx": 97.0}]) == []
+    print("✅ Conditions detected")
+
+
+def test_debounce_and_spacing():
+    """A blip shorter than the debounce is ignored; a lasting move fires once the spacing allows."""
+    print("Testing debounce and spacing...")
+    clock = _Clock(T0 + 20)
+    triggers = _triggers(clock)
+    moves = iter([60000.0, 60300.0, 60000.0] + [60300.0] * 50)
+
+    async def probe():
+        return {"prices": {"BTC": next(moves)}}
+
+    reasons = asyncio.run(triggers.wait(T0 + 600, probe))
+    assert reasons and reasons[0].startswith("BTC moved 3.0 ATR"), reasons
+    # First lasting detection at T0+35; must persist 10s and wait for T0+60 spacing
+    assert T0 + 60 <= clock.now < T0 + 70, clock.now - T0
+    assert triggers.stats["debounced"] == 1 and triggers.stats["fired"] == 1
+    print(f"✅ Fired {clock.now - T0:.0f}s after the last cycle ({triggers.stats})")
+
+
+def test_quiet_until_tick():
+    """Nothing happening sleeps until the tick; probe errors are counted, not raised."""
+    print("Testing quiet interval...")
+    clock = _Clock(T0 + 5)
+    triggers = _triggers(clock)
+    calls = {"n": 0}
+
+    async def probe():
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise RuntimeError("exchange busy")
+        return {"prices": {"BTC": 60010.0}, "fills": None}
+
+    assert asyncio.run(triggers.wait(T0 + 300, probe)) is None
+    assert clock.now == T0 + 300 and triggers.stats["probe_errors"] == 1 and triggers.stats["fired"] == 0
+    print(f"✅ Quiet until the tick ({triggers.stats['polls']} polls)")
+
+
+def test_unknown_fill_baseline():
+    """When fills could not be read at arm time, the first probe becomes the baseline."""
+    print("Testing fill baseline...")
+    triggers = EventTriggers()
+    triggers.arm({"BTC": 60000.0}, fills=None, now=T0)
+    fills = [{"tid": 7, "coin": "BTC"}]
+    assert triggers.check(prices={}, fills=fills) == []
+    assert triggers.check(prices={}, fills=fills + [{"tid": 8, "coin": "BTC"}]) == ["1 new fill(s): BTC"]
+    print("✅ Fill baseline")
+
+
+def test_probe_prices_one_request():
+    """Trigger polls read every asset's price from a single all-mids request."""
+    print("Testing batched probe prices...")
+
+    class _Info:
+        calls = 0
+
+        def all_mids(self):
+            self.calls += 1
+            return {"BTC": "60000.5", "ETH": "3000", "SOL": "150"}
+
+    api = HyperliquidAPI.__new__(HyperliquidAPI)
+    api.info = _Info()
+    prices = asyncio.run(api.get_current_prices(["BTC", "ETH", "DOGE"]))
+    assert prices == {"BTC": 60000.5, "ETH": 3000.0} and api.info.calls == 1, prices
+    print("✅ One request for all prices")
+
+
+if __name__ == "__main__":
+    test_conditions_detected()
+    test_debounce_and_spacing()
+    test_quiet_until_tick()
+    test_unknown_fill_baseline()
+    test_probe_prices_one_request()
+    print("🎉 Event trigger tests completed!")
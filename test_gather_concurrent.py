@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for concurrent per-asset market data gathering
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.indicators.taapi_client import INDICATOR_NAMES
+from src.main import fetch_asset_data, gather_assets, indicator_specs
+
+DELAY = 0.05
+
+
+class _FakeTradingAPI:
+    def __init__(self, slow=None, failing=None):
+        self.slow = slow
+        self.failing = failing
+
+    async def get_current_price(self, asset):
+        if asset == self.slow:
+            await asyncio.sleep(5)
+        if asset == self.failing:
+            raise RuntimeError("no market")
+        await asyncio.sleep(DELAY)
+        return 100.0
+
+    async def get_open_interest(self, asset):
+        await asyncio.sleep(DELAY)
+        return 1000.0
+
+    async def get_funding_rate(self, asset):
+        await asyncio.sleep(DELAY)
+        return 0.0001
+
+
+class _FakeIndicators:
+    def __init__(self):
+        self.calls = 0
+        self.requests = []
+
+    async def get_indicators(self, asset, interval):
+        self.calls += 1
+        self.requests += [(name, interval, {}) for name in INDICATOR_NAMES]
+        await asyncio.sleep(DELAY)
+        return {}
+
+    async def fetch_series(self, indicator, symbol, interval, results=10, params=None, value_key="value"):
+        self.calls += 1
+        self.requests.append((indicator, interval, dict(params or {}, results=results)))
+        await asyncio.sleep(DELAY)
+        return [float(i) for i in range(results)]
+
+    async def fetch_value(self, indicator, symbol, interval, params=None, key="value"):
+        self.calls += 1
+        self.requests.append((indicator, interval, dict(params or {})))
+        await asyncio.sleep(DELAY)
+        return float(params["period"])
+
+
+def test_assets_fetched_in_one_round_trip():
+    """Ten assets with eleven reads each take about one round trip, not 110."""
+    print("Testing concurrent gather...")
+    indicators = _FakeIndicators()
+    api = _FakeTradingAPI()
+    assets = [f"A{i}" for i in range(10)]
+
+    started = time.perf_counter()
+    results = asyncio.run(gather_assets(assets, lambda a: fetch_asset_data(a, api, indicators, "1h"), concurrency=10, timeout=2))
+    elapsed = time.perf_counter() - started
+    assert list(results) == assets and indicators.calls == 90
+    assert results["A3"]["lt_ema50"] == 50.0 and results["A3"]["rsi14_series"][-1] == 9.0
+    assert elapsed < 10 * DELAY, elapsed
+    print(f"✅ 10 assets gathered in {elapsed:.2f}s (sequential would be ~{110 * DELAY:.1f}s)")
+
+
+def test_slow_or_failing_asset_isolated():
+    """A timed-out or failing asset is reported without delaying the rest."""
+    print("Testing per-asset isolation...")
+    api = _FakeTradingAPI(slow="SLOW", failing="BAD")
+    assets = ["BTC", "SLOW", "BAD", "ETH"]
+    started = time.perf_counter()
+    results = asyncio.run(gather_assets(assets, lambda a: fetch_asset_data(a, api, _FakeIndicators(), "1h"), concurrency=2, timeout=0.3))
+    elapsed = time.perf_counter() - started
+    assert isinstance(results["SLOW"], asyncio.TimeoutError)
+    assert isinstance(results["BAD"], RuntimeError)
+    assert results["BTC"]["price"] == results["ETH"]["price"] == 100.0
+    assert elapsed < 1.0, elapsed
+    print(f"✅ Slow and failing assets isolated ({elapsed:.2f}s)")
+
+
+def test_prefetch_specs_match_reads():
+    """The bulk prefetch specs cover exactly the reads the gather phase makes."""
+    print("Testing prefetch specs...")
+    indicators = _FakeIndicators()
+    data = asyncio.run(fetch_asset_data("BTC", _FakeTradingAPI(), indicators, "1h"))
+    specs = [(s["indicator"], s["interval"], s.get("params", {})) for s in indicator_specs("BTC", "1h")]
+    key = lambda request: json.dumps(request, sort_keys=True)
+    assert sorted(map(key, indicators.requests)) == sorted(map(key, specs)), (indicators.requests, specs)
+    assert data["lt_ema50"] == 50.0 and len(data["rsi7_series"]) == 10
+    print(f"✅ {len(specs)} specs match the reads")
+
+
+if __name__ == "__main__":
+    test_assets_fetched_in_one_round_trip()
+    test_slow_or_failing_asset_isolated()
+    test_prefetch_specs_match_reads()
+    print("🎉 Concurrent gather tests completed!")
@@ -19,6 +19,7 @@ def test_interval_parsing():
         ('"5m"', 300),  # With quotes
         ("'1h'", 3600),  # With single quotes
         ('"1d"', 86400),  # With quotes
+        ("30s", 30),  # Seconds (simulated load tests)
         (" 5m ", 300),  # With spaces
         (' "5m" ', 300),  # With spaces and quotes
     ]
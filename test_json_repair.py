@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for the local decision JSON repair stage
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.config_loader import CONFIG
+from src.agent.json_repair import repair_decisions, extract_balanced, lenient_loads
+
+CONFIG.update({
+    "llm_provider": "openrouter",
+    "openrouter_api_key": CONFIG.get("openrouter_api_key") or "test-key",
+    "taapi_api_key": CONFIG.get("taapi_api_key") or "test-key",
+})
+from src.agent.decision_maker import TradingAgent, build_decision_schema
+
+ASSETS = ["BTC", "ETH"]
+SCHEMA = build_decision_schema(ASSETS)
+
+
+def test_common_failures_repaired():
+    """Fences, prose, single quotes, trailing commas and wrappers are fixed locally."""
+    print("Testing local repair...")
+    cases = {
+        "fenced": '```json\n[{"asset": "BTC", "action": "buy", "allocation_usd": 100, "tp_price": 70000, "sl_price": 60000, "exit_plan": "x", "rationale": "y"}]\n```',
+        "prose": 'Sure! Here are my decisions:\n[{"asset": "BTC", "action": "hold", "allocation_usd": 0, "tp_price": null, "sl_price": null, "exit_plan": "", "rationale": "flat"}]\nLet me know.',
+        "single_quotes": "[{'asset': 'BTC', 'action': 'sell', 'allocation_usd': 50, 'tp_price': None, 'sl_price': null, 'exit_plan': 'x', 'rationale': \"it's weak\"}]",
+        "trailing_commas": '{"trade_decisions": [{"asset": "BTC", "action": "hold", "allocation_usd": 0, "tp_price": null, "sl_price": null, "exit_plan": "", "rationale": "",},],}',
+        "aliases": '{"notes": "n", "decisions": [{"Symbol": "btc/usdt", "Side": "LONG", "Allocation": "$1,200", "TP": "71000", "SL": null, "Exit Plan": "x", "Reasoning": "y"}]}',
+    }
+    for name, text in cases.items():
+        decisions, errors = repair_decisions(text, SCHEMA)
+        assert decisions and decisions[0]["asset"] == "BTC", (name, errors)
+    decisions, _ = repair_decisions(cases["aliases"], SCHEMA)
+    assert decisions[0] == {"asset": "BTC", "action": "buy", "allocation_usd": 1200.0, "tp_price": 71000.0,
+                            "sl_price": None, "exit_plan": "x", "rationale": "y"}, decisions
+    print(f"✅ {len(cases)} malformed replies repaired")
+
+
+def test_schema_violations_rejected():
+    """Output that cannot satisfy the schema is left to the sanitizer."""
+    print("Testing schema validation...")
+    decisions, errors = repair_decisions('[{"asset": "DOGE", "action": "buy", "allocation_usd": 10}]', SCHEMA)
+    assert decisions is None and any("DOGE" in e for e in errors), errors
+    decisions, errors = repair_decisions('[{"asset": "BTC", "action": "yolo"}]', SCHEMA)
+    assert decisions is None
+    decisions, errors = repair_decisions("I cannot decide today.", SCHEMA)
+    assert decisions is None
+    # literal_eval raises TypeError on unhashable keys
+    for text in ('{[1]: 2}', '{{"a": 1}}'):
+        decisions, errors = repair_decisions(text, SCHEMA)
+        assert decisions is None and errors, (text, errors)
+    assert extract_balanced('a {"x": "}"} b [1]') == ['[1]', '{"x": "}"}']
+    assert lenient_loads("{'a': true, 'b': None,}") == {"a": True, "b": None}
+    print("✅ Invalid decisions rejected")
+
+
+def test_agent_skips_sanitizer_when_repaired():
+    """_parse_decisions only calls the sanitizer model when local repair fails."""
+    print("Testing parse path counters...")
+    agent = TradingAgent()
+    sanitizer_calls = []
+
+    async def fake_sanitize(raw, assets):
+        sanitizer_calls.append(raw)
+        return [{"asset": "BTC", "action": "hold"}]
+
+    agent._sanitize_to_array = fake_sanitize
+    good = json.dumps([{"asset": "BTC", "action": "hold"}])
+    fenced = "```json\n" + json.dumps([{"asset": "ETH", "action": "hold", "allocation_usd": 0, "tp_price": None,
+                                        "sl_price": None, "exit_plan": "", "rationale": ""}]) + "\n```"
+
+    async def scenario():
+        out = [await agent._parse_decisions({"content": good}, ASSETS)]
+        out.append(await agent._parse_decisions({"content": fenced}, ASSETS))
+        out.append(await agent._parse_decisions({"content": "no json here"}, ASSETS))
+        return out
+
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())
+    try:
+        direct, repaired, sanitized = asyncio.run(scenario())
+    finally:
+        os.chdir(cwd)
+    assert direct[0]["asset"] == "BTC" and repaired[0]["asset"] == "ETH" and sanitized[0]["asset"] == "BTC"
+    assert sanitizer_calls == ["no json here"]
+    assert agent.parse_stats == {"direct": 1, "repaired": 1, "sanitized": 1, "failed": 0}, agent.parse_stats
+    print(f"✅ Parse stats: {agent.parse_stats}")
+
+
+if __name__ == "__main__":
+    test_common_failures_repaired()
+    test_schema_violations_rejected()
+    test_agent_skips_sanitizer_when_repaired()
+    print("🎉 JSON repair tests completed!")
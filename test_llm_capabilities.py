@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script for the persisted provider/model capability cache (local stub server)
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+from src.config_loader import CONFIG
+from conftest import isolated_config, start_stub
+from src.agent.capabilities import CapabilityCache
+
+
+def _reply():
+    content = json.dumps([{"asset": "BTC", "action": "hold", "allocation_usd": 0, "tp_price": None,
+                           "sl_price": None, "exit_plan": "", "rationale": "stub"}])
+    return web.json_response({"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+
+async def _scenario():
+    seen = []
+
+    async def handler(request):
+        body = await request.json()
+        seen.append(body)
+        if "response_format" in body:
+            return web.json_response({"error": {"message": "response_format is not supported by this model"}}, status=400)
+        return _reply()
+
+    runner, base_url = await start_stub(handler)
+    try:
+        CONFIG.update({
+            "llm_provider": "openrouter",
+            "openrouter_api_key": "test-key",
+            "openrouter_base_url": base_url,
+            "taapi_api_key": CONFIG.get("taapi_api_key") or "test-key",
+            "llm_model": "x-ai/grok-4",
+            "llm_stream": "false",
+            "llm_hedge_enabled": "false",
+            "llm_capability_cache_path": "capabilities.json",
+            "llm_capability_ttl": "3600",
+        })
+        from src.agent.decision_maker import TradingAgent
+        first = TradingAgent()
+        await first.decide_trade(["BTC"], "context")
+        await first.close()
+        first_requests = len(seen)
+        # A fresh process (new agent) reads the learned rejection from disk
+        second = TradingAgent()
+        out = await second.decide_trade(["BTC"], "context")
+        await second.close()
+        with open("capabilities.json") as f:
+            stored = json.load(f)
+        return first_requests, seen, out, stored
+    finally:
+        await runner.cleanup()
+
+
+def test_rejection_persisted_and_reused():
+    """The second agent skips response_format without a failed round trip."""
+    print("Testing persisted capabilities...")
+    with isolated_config():
+        first_requests, seen, out, stored = asyncio.run(_scenario())
+    assert first_requests == 2 and "response_format" in seen[0] and "response_format" not in seen[1]
+    assert len(seen) == 3 and "response_format" not in seen[2] and "tools" in seen[2]
+    assert out[0]["asset"] == "BTC"
+    assert list(stored) == ["openrouter|x-ai/grok-4"] and list(stored["openrouter|x-ai/grok-4"]) == ["allow_structured"]
+    print(f"✅ {len(seen)} requests across two agents; stored {stored}")
+
+
+def test_entries_expire():
+    """Rejections are retried after the TTL, and unwritable paths stay in memory."""
+    print("Testing capability expiry...")
+    path = os.path.join(tempfile.mkdtemp(), "caps.json")
+    cache = CapabilityCache(path, ttl=60)
+    assert cache.flags("deepseek", "deepseek-chat") == {"allow_tools": True, "allow_structured": True}
+    cache.mark_unsupported("deepseek", "deepseek-chat", "allow_tools", now=1000)
+    assert cache.flags("deepseek", "deepseek-chat", now=1030) == {"allow_tools": False, "allow_structured": True}
+    assert cache.flags("deepseek", "deepseek-chat", now=1061)["allow_tools"] is True
+    assert CapabilityCache(path, ttl=60).flags("deepseek", "deepseek-chat", now=1030)["allow_tools"] is False
+    memory = CapabilityCache("", ttl=60)
+    memory.mark_unsupported("openrouter", "m", "allow_structured")
+    assert memory.flags("openrouter", "m")["allow_structured"] is False
+    print("✅ Entries expire")
+
+
+if __name__ == "__main__":
+    test_rejection_persisted_and_reused()
+    test_entries_expire()
+    print("🎉 Capability cache tests completed!")
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Test script for the non-blocking async LLM client used by TradingAgent (local stub server)
+"""
+import asyncio
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+from src.config_loader import CONFIG
+from conftest import isolated_config, start_stub
+
+
+def _decision_array(assets):
+    return [{"asset": a, "action": "hold", "allocation_usd": 0, "tp_price": None, "sl_price": None,
+             "exit_plan": "none", "rationale": "stub"} for a in assets]
+
+
+def _make_agent(base_url):
+    CONFIG.update({
+        "llm_provider": "openrouter",
+        "openrouter_api_key": "test-key",
+        "openrouter_base_url": base_url,
+        "taapi_api_key": CONFIG.get("taapi_api_key") or "test-key",
+        "llm_model": "x-ai/grok-4",
+    })
+    from src.agent.decision_maker import TradingAgent
+    return TradingAgent()
+
+
+async def _scenario():
+    seen = []
+
+    async def handler(request):
+        body = await request.json()
+        seen.append(body)
+        if "response_format" in body:
+            return web.json_response({"error": {"message": "response_format not supported"}}, status=422)
+        await asyncio.sleep(0.2)
+        content = json.dumps(_decision_array(["BTC", "ETH"]))
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+    runner, base_url = await start_stub(handler)
+    try:
+        agent = _make_agent(base_url)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        outputs = await agent.decide_trade(["BTC", "ETH"], "context")
+        tick_task.cancel()
+        await agent.close()
+        return outputs, seen, ticks
+    finally:
+        await runner.cleanup()
+
+
+async def _cancel_scenario():
+    async def handler(request):
+        await asyncio.sleep(1)
+        return web.json_response({})
+
+    runner, base_url = await start_stub(handler)
+    try:
+        agent = _make_agent(base_url)
+        task = asyncio.create_task(agent.decide_trade(["BTC"], "context"))
+        await asyncio.sleep(0.1)
+        started = asyncio.get_running_loop().time()
+        task.cancel()
+        try:
+            await task
+            cancelled = False
+        except asyncio.CancelledError:
+            cancelled = asyncio.get_running_loop().time() - started < 0.5
+        await agent.close()
+        return cancelled
+    finally:
+        await runner.cleanup()
+
+
+async def _slow_stream_scenario(gap, chunks):
+    async def handler(request):
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        for i in range(chunks):
+            await asyncio.sleep(gap)
+            delta = {"choices": [{"index": 0, "delta": {"content": str(i)}}]}
+            await resp.write(f"data: {json.dumps(delta)}\n\n".encode())
+        await resp.write(b"data: [DONE]\n\n")
+        return resp
+
+    runner, base_url = await start_stub(handler)
+    try:
+        from src.agent.llm_client import LLMClient
+        client = LLMClient("openrouter", "test-key", f"{base_url}/chat/completions", timeout=0.3, max_retries=1)
+        received = []
+        try:
+            async for chunk in client.stream({"model": "x"}):
+                received.append(chunk["choices"][0]["delta"]["content"])
+        except asyncio.TimeoutError:
+            received.append("timeout")
+        finally:
+            await client.close()
+        return received
+    finally:
+        await runner.cleanup()
+
+
+async def _truncated_body_scenario(max_retries):
+    calls = []
+
+    async def handler(request):
+        calls.append(await request.json())
+        if len(calls) == 1:
+            return web.Response(text='{"choices": [{"message": {"role": "assi', content_type="application/json")
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": "[]"}}]})
+
+    runner, base_url = await start_stub(handler)
+    try:
+        from src.agent.llm_client import LLMClient
+        client = LLMClient("openrouter", "test-key", f"{base_url}/chat/completions", max_retries=max_retries)
+        try:
+            return await client.post({"model": "x"}), len(calls)
+        except ValueError as e:
+            return e, len(calls)
+        finally:
+            await client.close()
+    finally:
+        await runner.cleanup()
+
+
+def test_decide_trade_non_blocking():
+    """The loop keeps ticking during the LLM call; 422 on response_format falls back."""
+    print("Testing async decide_trade...")
+    with isolated_config():
+        outputs, seen, ticks = asyncio.run(_scenario())
+    assert [o["asset"] for o in outputs] == ["BTC", "ETH"], outputs
+    assert len(seen) == 2 and "response_format" in seen[0] and "response_format" not in seen[1]
+    assert ticks >= 10, f"event loop blocked (ticks={ticks})"
+    print(f"✅ Decisions parsed, loop ticked {ticks} times during the call")
+
+
+def test_decide_trade_cancellable():
+    """Cancelling the decision task aborts the in-flight request promptly."""
+    print("Testing cancellation...")
+    with isolated_config():
+        assert asyncio.run(_cancel_scenario())
+    print("✅ In-flight decision cancelled")
+
+
+def test_timeout_is_per_read():
+    """A slow stream that keeps sending data outlives the timeout; a stalled one does not."""
+    print("Testing per-read timeout...")
+    # 8 chunks 0.1s apart: 0.8s in total against a 0.3s timeout
+    assert asyncio.run(_slow_stream_scenario(0.1, 8)) == [str(i) for i in range(8)]
+    assert asyncio.run(_slow_stream_scenario(0.6, 2)) == ["timeout"]
+    print("✅ Timeout applies between reads, not to the whole body")
+
+
+def test_truncated_body_retried():
+    """A 200 whose body is not valid JSON is retried; only the last attempt raises."""
+    print("Testing truncated 200 body...")
+    body, calls = asyncio.run(_truncated_body_scenario(max_retries=2))
+    assert calls == 2 and body["choices"][0]["message"]["content"] == "[]", body
+    error, calls = asyncio.run(_truncated_body_scenario(max_retries=1))
+    assert calls == 1 and isinstance(error, ValueError)
+    print("✅ Truncated body retried")
+
+
+if __name__ == "__main__":
+    test_decide_trade_non_blocking()
+    test_decide_trade_cancellable()
+    test_timeout_is_per_read()
+    test_truncated_body_retried()
+    print("🎉 Async LLM client tests completed!")
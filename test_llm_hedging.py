@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script for hedged LLM decisions across providers (local stub servers)
+"""
+import asyncio
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+from src.config_loader import CONFIG
+from conftest import isolated_config, start_stub
+
+
+def _reply(*assets):
+    content = json.dumps([{"asset": asset, "action": "hold", "allocation_usd": 0, "tp_price": None,
+                           "sl_price": None, "exit_plan": "", "rationale": "stub"} for asset in assets])
+    return web.json_response({"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+
+async def _scenario(primary_delay, backup_asset, max_rate="0.25", decisions=1, outer_timeout=None, assets=("BTC",)):
+    async def primary(request):
+        await request.json()
+        await asyncio.sleep(primary_delay)
+        return _reply(*assets)
+
+    async def backup(request):
+        body = await request.json()
+        if not any(m.get("role") == "tool" for m in body["messages"]):
+            # One tool round before answering, so the winning trace is distinguishable
+            call = {"id": "call_1", "type": "function",
+                    "function": {"name": "fetch_taapi_indicator", "arguments": "{}"}}
+            return web.json_response({"choices": [{"message": {"role": "assistant", "content": None, "tool_calls": [call]}}]})
+        await asyncio.sleep(0.05)
+        return _reply(backup_asset)
+
+    primary_runner, primary_url = await start_stub(primary)
+    backup_runner, backup_url = await start_stub(backup)
+    try:
+        CONFIG.update({
+            "llm_provider": "openrouter",
+            "openrouter_api_key": "test-key",
+            "openrouter_base_url": primary_url,
+            "deepseek_api_key": "test-key",
+            "deepseek_base_url": backup_url,
+            "taapi_api_key": CONFIG.get("taapi_api_key") or "test-key",
+            "llm_model": "x-ai/grok-4",
+            "llm_hedge_enabled": "true",
+            "llm_hedge_provider": "deepseek",
+            "llm_hedge_model": "deepseek-chat",
+            "llm_hedge_delay": "0.2",
+            "llm_hedge_min_delay": "0.1",
+            "llm_hedge_max_rate": max_rate,
+        })
+        from src.agent.decision_maker import TradingAgent
+        agent = TradingAgent()
+        loop = asyncio.get_running_loop()
+        results = []
+        for _ in range(decisions):
+            started = loop.time()
+            try:
+                outputs = await asyncio.wait_for(agent.decide_trade(list(assets), "context"), outer_timeout)
+            except asyncio.TimeoutError:
+                # Requests already finished by the time the timeout surfaces
+                outputs = [r["error"] for r in agent.telemetry.recent()]
+            results.append((outputs, loop.time() - started))
+        await asyncio.sleep(0.05)
+        await agent.close()
+        return results, agent
+    finally:
+        await primary_runner.cleanup()
+        await backup_runner.cleanup()
+
+
+def _run(*args, **kwargs):
+    with isolated_config():
+        return asyncio.run(_scenario(*args, **kwargs))
+
+
+def test_hedge_wins_and_primary_cancelled():
+    """A slow primary is raced after the delay; the backup wins and the primary is cancelled."""
+    print("Testing hedge win...")
+    results, agent = _run(primary_delay=1.2, backup_asset="BTC")
+    (outputs, elapsed), = results
+    assert outputs[0]["asset"] == "BTC" and elapsed < 1.0, (outputs, elapsed)
+    stats = agent.hedge_summary()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1, stats
+    recent = agent.telemetry.recent()
+    assert {r["provider"] for r in recent} == {"openrouter", "deepseek"}
+    assert any(r["error"] == "cancelled" for r in recent if r["provider"] == "openrouter"), recent
+    assert agent.telemetry.summary()["decisions"]["tool_rounds"]["p50"] == 1
+    print(f"✅ Hedge answered in {elapsed:.2f}s; stats {stats}")
+
+
+def test_invalid_hedge_ignored():
+    """A backup answer that fails schema validation does not win."""
+    print("Testing invalid hedge result...")
+    results, agent = _run(primary_delay=0.5, backup_asset="DOGE")
+    (outputs, elapsed), = results
+    assert outputs[0]["asset"] == "BTC" and elapsed >= 0.5
+    assert agent.hedge_stats["primary_wins"] == 1 and agent.hedge_stats["hedge_wins"] == 0
+    print("✅ Primary answer kept")
+
+
+def test_partial_hedge_ignored():
+    """A backup answer that leaves out some assets does not beat a complete primary answer."""
+    print("Testing partial hedge result...")
+    results, agent = _run(primary_delay=0.5, backup_asset="BTC", assets=("BTC", "ETH"))
+    (outputs, elapsed), = results
+    assert [o["asset"] for o in outputs] == ["BTC", "ETH"] and elapsed >= 0.5, outputs
+    assert agent.hedge_stats["primary_wins"] == 1 and agent.hedge_stats["hedge_wins"] == 0
+    print("✅ Complete primary answer kept")
+
+
+def test_hedge_rate_cap():
+    """Hedges beyond the rate cap are skipped."""
+    print("Testing hedge rate cap...")
+    results, agent = _run(primary_delay=0.3, backup_asset="BTC", max_rate="0.01", decisions=2)
+    stats = agent.hedge_summary()
+    assert stats["hedged"] == 1 and stats["rate_capped"] == 1, stats
+    assert results[1][1] >= 0.3
+    print(f"✅ Rate cap honoured: {stats}")
+
+
+def test_outer_cancel_stops_primary():
+    """Cancelling the decision while waiting out the hedge delay cancels the primary request too."""
+    print("Testing cancellation during the hedge delay...")
+    results, agent = _run(primary_delay=1.0, backup_asset="BTC", outer_timeout=0.1)
+    (outputs, elapsed), = results
+    assert outputs == ["cancelled"] and elapsed < 0.5, (outputs, elapsed)
+    print("✅ Primary cancelled with the decision")
+
+
+if __name__ == "__main__":
+    test_hedge_wins_and_primary_cancelled()
+    test_invalid_hedge_ignored()
+    test_partial_hedge_ignored()
+    test_hedge_rate_cap()
+    test_outer_cancel_stops_primary()
+    print("🎉 LLM hedging tests completed!")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for recording and replaying LLM exchanges (local stub server)
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+from src.config_loader import CONFIG
+from conftest import isolated_config, start_stub
+from src.agent.replay import ReplayStore, request_key
+
+
+def _content(asset):
+    return json.dumps([{"asset": asset, "action": "hold", "allocation_usd": 0, "tp_price": None,
+                        "sl_price": None, "exit_plan": "", "rationale": "recorded"}])
+
+
+def _context(minutes):
+    return (f"## Market Data\nBTC 60000\n## Invocation\nIt has been {minutes} minutes since you started trading. "
+            f"The current time is 2025-01-0{1 + minutes % 5}T10:0{minutes % 10}:00.123+00:00 and you've been invoked {minutes} times.\n")
+
+
+def _make_agent(base_url, mode, stream=False, scale="0"):
+    CONFIG.update({
+        "llm_provider": "openrouter",
+        "openrouter_api_key": "test-key",
+        "openrouter_base_url": base_url,
+        "taapi_api_key": CONFIG.get("taapi_api_key") or "test-key",
+        "llm_model": "x-ai/grok-4",
+        "llm_stream": "true" if stream else "false",
+        "llm_hedge_enabled": "false",
+        "llm_capability_cache_path": "",
+        "llm_replay_mode": mode,
+        "llm_replay_dir": "replay",
+        "llm_replay_latency_scale": scale,
+    })
+    from src.agent.decision_maker import TradingAgent
+    return TradingAgent()
+
+
+async def _record():
+    calls = []
+
+    async def handler(request):
+        body = await request.json()
+        calls.append(body)
+        await asyncio.sleep(0.3)
+        if not any(m.get("role") == "tool" for m in body["messages"]):
+            # First round asks for an indicator
+            return web.json_response({"choices": [{"message": {"role": "assistant", "content": "", "tool_calls": [
+                {"id": f"call_{len(calls)}", "type": "function", "function": {
+                    "name": "fetch_taapi_indicator", "arguments": json.dumps({"indicator": "rsi", "symbol": "BTC/USDT", "interval": "4h"})}}]}}]})
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": _content("BTC")}}],
+                                  "usage": {"prompt_tokens": 100, "completion_tokens": 20}})
+
+    runner, base_url = await start_stub(handler)
+    try:
+        agent = _make_agent(base_url, "record")
+
+        async def fake_fetch_raw(indicator, symbol, interval, params=None, priority=None):
+            return {"value": 55.0}
+
+        agent.taapi.fetch_raw = fake_fetch_raw
+        out = await agent.decide_trade(["BTC"], _context(5))
+        await agent.close()
+        return out, calls
+    finally:
+        await runner.cleanup()
+
+
+async def _replay(stream, scale):
+    agent = _make_agent("http://127.0.0.1:9", "replay", stream=stream, scale=scale)
+
+    async def fake_fetch_raw(indicator, symbol, interval, params=None, priority=None):
+        return {"value": 55.0}
+
+    agent.taapi.fetch_raw = fake_fetch_raw
+    started = time.perf_counter()
+    if stream:
+        out = [d async for d in agent.stream_decisions(["BTC"], _context(123))]
+    else:
+        out = await agent.decide_trade(["BTC"], _context(123))
+    elapsed = time.perf_counter() - started
+    await agent.close()
+    return out, elapsed, agent.replay.summary()
+
+
+def test_record_then_replay_offline():
+    """Replayed cycles match the recording without network access, instantly or at recorded pace."""
+    print("Testing LLM record/replay...")
+    with isolated_config():
+        recorded, calls = asyncio.run(_record())
+        store = ReplayStore("replay", "replay")
+        entries = list(store.entries())
+        fast, fast_elapsed, stats = asyncio.run(_replay(stream=False, scale="0"))
+        paced, paced_elapsed, _ = asyncio.run(_replay(stream=False, scale="1"))
+        streamed, _, _ = asyncio.run(_replay(stream=True, scale="0"))
+    assert len(calls) == 2 and len(entries) == 2
+    assert [e["label"] for e in entries] == ["decision", "decision"] and entries[0]["latency"] >= 0.3
+    assert fast == recorded == paced and streamed == recorded, (fast, recorded, streamed)
+    assert stats["hits"] == 2 and stats["misses"] == 0
+    assert fast_elapsed < 0.3 and paced_elapsed >= 0.6, (fast_elapsed, paced_elapsed)
+    print(f"✅ Replayed in {fast_elapsed * 1000:.0f}ms (paced {paced_elapsed:.2f}s)")
+
+
+def test_key_ignores_volatile_text():
+    """Timestamps, counters, stream flags and tool-call ids do not change the key."""
+    print("Testing request keys...")
+    base = {"model": "m", "messages": [{"role": "user", "content": _context(5)}]}
+    same = {"model": "m", "stream": True, "messages": [{"role": "user", "content": _context(77)}]}
+    assert request_key(base) == request_key(same)
+    other = {"model": "m", "messages": [{"role": "user", "content": _context(5).replace("60000", "61000")}]}
+    assert request_key(base) != request_key(other)
+    with_tool = lambda i: {"model": "m", "messages": [{"role": "assistant", "tool_calls": [
+        {"id": i, "function": {"name": "f", "arguments": "{}"}}]}]}
+    assert request_key(with_tool("a")) == request_key(with_tool("b"))
+    print("✅ Keys normalised")
+
+
+if __name__ == "__main__":
+    test_record_then_replay_offline()
+    test_key_ignores_volatile_text()
+    print("🎉 LLM replay tests completed!")
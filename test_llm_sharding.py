@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script for sharded per-asset-group LLM decisions (local stub server)
+"""
+import asyncio
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+from src.config_loader import CONFIG
+from conftest import isolated_config, start_stub
+
+ASSETS = ["BTC", "ETH", "SOL", "BNB", "XRP"]
+
+
+def _content(assets):
+    return json.dumps([{"asset": a, "action": "hold", "allocation_usd": 0, "tp_price": None,
+                        "sl_price": None, "exit_plan": "", "rationale": f"stub {a}"} for a in assets])
+
+
+def _make_agent(base_url, **overrides):
+    CONFIG.update({
+        "llm_provider": "openrouter",
+        "openrouter_api_key": "test-key",
+        "openrouter_base_url": base_url,
+        "taapi_api_key": CONFIG.get("taapi_api_key") or "test-key",
+        "llm_model": "x-ai/grok-4",
+        "llm_stream": "false",
+        "llm_hedge_enabled": "false",
+        "llm_shard_size": "2",
+        "llm_shard_token_budget": "0",
+        "llm_shard_concurrency": "4",
+    })
+    CONFIG.update(overrides)
+    from src.agent.decision_maker import TradingAgent
+    return TradingAgent()
+
+
+async def _scenario():
+    seen = []
+    in_flight = {"now": 0, "max": 0}
+
+    async def handler(request):
+        body = await request.json()
+        user = body["messages"][-1]["content"]
+        seen.append(user)
+        if "## Assets" not in user:
+            # Sanitizer call: nothing usable either
+            return web.json_response({"choices": [{"message": {"role": "assistant", "content": "sorry"}}]})
+        assets = json.loads(user.split("## Assets\n", 1)[1].split("\n", 1)[0])
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.2)
+        in_flight["now"] -= 1
+        # The SOL/BNB group fails its first attempt
+        content = _content(assets)
+        if "SOL" in assets and "## Retry Instruction" not in user:
+            content = "I need more data before deciding."
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+    runner, base_url = await start_stub(handler)
+    try:
+        agent = _make_agent(base_url)
+        sections = {a: f"### {a} market\nprice {i}\n" for i, a in enumerate(ASSETS)}
+        outputs = await agent.decide_sharded(ASSETS, sections, "## Account Information & Performance\n{}\n")
+        await agent.close()
+        return agent, outputs, seen, in_flight["max"]
+    finally:
+        await runner.cleanup()
+
+
+def test_shard_assets_by_count_and_budget():
+    """Groups respect the asset count and the estimated token budget, in order."""
+    print("Testing asset grouping...")
+    agent = _make_agent("http://127.0.0.1:9")
+    assert agent.sharded
+    assert agent.shard_assets(ASSETS) == [["BTC", "ETH"], ["SOL", "BNB"], ["XRP"]]
+    agent.shard_size = 0
+    agent.shard_token_budget = 100
+    sections = {"BTC": "x" * 200, "ETH": "x" * 200, "SOL": "x" * 600, "BNB": "x" * 100, "XRP": "x" * 100}
+    assert agent.shard_assets(ASSETS, sections) == [["BTC", "ETH"], ["SOL"], ["BNB", "XRP"]]
+    agent.shard_token_budget = 0
+    assert not agent.sharded
+    print("✅ Assets grouped")
+
+
+def test_sharded_decisions_merge_and_retry():
+    """Groups run concurrently, only the failed group is retried, results keep asset order."""
+    print("Testing sharded decisions...")
+    with isolated_config():
+        agent, outputs, seen, max_in_flight = asyncio.run(_scenario())
+    assert [o["asset"] for o in outputs] == ASSETS, outputs
+    assert all(o["rationale"] == f"stub {o['asset']}" for o in outputs), outputs
+    assert max_in_flight == 3, max_in_flight
+    retries = [u for u in seen if "## Retry Instruction" in u]
+    assert len(retries) == 1 and "### SOL market" in retries[0] and "### BTC market" not in retries[0]
+    # Every group request carries the shared account context but only its own market data
+    group_requests = [u for u in seen if "## Assets" in u]
+    assert all("## Account Information & Performance" in u for u in group_requests)
+    assert not any("### BTC market" in u and "### XRP market" in u for u in group_requests)
+    assert agent.shard_stats == {"groups": 3, "failed_groups": 1, "recovered_groups": 1}, agent.shard_stats
+    print(f"✅ Merged {len(outputs)} decisions; stats {agent.shard_stats}")
+
+
+if __name__ == "__main__":
+    test_shard_assets_by_count_and_budget()
+    test_sharded_decisions_merge_and_retry()
+    print("🎉 Sharded decision tests completed!")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test script for the local OpenAI-compatible stand-in LLM server
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+from src.config_loader import CONFIG
+from src.agent.llm_client import LLMHTTPError
+from src.agent.prompt_encoder import PromptEncoder
+from llm_standin_server import StandinLLM, create_app, parse_latency, parse_markets
+
+ASSETS = ["BTC", "ETH", "SOL"]
+CONTEXT = (
+    "## Market Data\n"
+    "ALL BTC DATA\ncurrent_price = 60000.0, current_ema20 = 59000.0, current_macd = 12.5, current_rsi (7 period) = 22.1\n"
+    "ALL ETH DATA\ncurrent_price = 3000.0, current_ema20 = 3100.0, current_macd = -3.0, current_rsi (7 period) = 81.0\n"
+    "ALL SOL DATA\ncurrent_price = 150.0, current_ema20 = 149.0, current_macd = 0.1, current_rsi (7 period) = 50.0\n"
+    "## Account Information & Performance\n{}\n"
+)
+
+
+async def _start(standin, prefix=""):
+    runner = web.AppRunner(create_app(standin))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}{prefix}"
+
+
+def _make_agent(base_url, stream=False):
+    CONFIG.update({
+        "llm_provider": "openrouter",
+        "openrouter_api_key": "test-key",
+        "openrouter_base_url": base_url,
+        "taapi_api_key": CONFIG.get("taapi_api_key") or "test-key",
+        "llm_model": "x-ai/grok-4",
+        "llm_stream": "true" if stream else "false",
+        "llm_hedge_enabled": "false",
+        "llm_capability_cache_path": "",
+        "llm_replay_mode": "off",
+    })
+    from src.agent.decision_maker import TradingAgent
+    agent = TradingAgent()
+
+    async def fake_fetch_raw(indicator, symbol, interval, params=None, priority=None):
+        return {"value": 55.0}
+
+    agent.taapi.fetch_raw = fake_fetch_raw
+    return agent
+
+
+async def _scenario(standin, stream=False, cycles=1):
+    runner, base_url = await _start(standin, prefix="/api/v1")
+    try:
+        agent = _make_agent(base_url, stream)
+        results = []
+        started = time.perf_counter()
+        try:
+            for _ in range(cycles):
+                if stream:
+                    results.append([d async for d in agent.stream_decisions(ASSETS, CONTEXT)])
+                else:
+                    results.append(await agent.decide_trade(ASSETS, CONTEXT))
+        except LLMHTTPError as e:
+            results.append(e)
+        finally:
+            await agent.close()
+        return results, time.perf_counter() - started, agent
+    finally:
+        await runner.cleanup()
+
+
+def _run(standin, **kwargs):
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())
+    try:
+        return asyncio.run(_scenario(standin, **kwargs))
+    finally:
+        os.chdir(cwd)
+
+
+def test_rule_based_decisions_plain_and_streamed():
+    """Rules drive decisions over plain JSON and SSE, including a tool-call round."""
+    print("Testing stand-in decisions...")
+    for stream in (False, True):
+        standin = StandinLLM(tool_call_rate=1.0, seed=1)
+        (decisions,), _, agent = _run(standin, stream=stream)
+        by_asset = {d["asset"]: d for d in decisions}
+        assert [d["asset"] for d in decisions] == ASSETS, decisions
+        assert by_asset["BTC"]["action"] == "buy" and by_asset["BTC"]["tp_price"] == 61200.0
+        assert by_asset["ETH"]["action"] == "sell" and by_asset["SOL"]["action"] == "hold"
+        assert standin.stats["tool_calls"] == 1 and standin.stats["requests"] == 2
+        assert standin.stats["streamed"] == (2 if stream else 0)
+        assert agent.telemetry.summary()["totals"]["prompt_tokens"] > 0
+    print("✅ Rule-based decisions served")
+
+
+def test_compact_prompt_parsed():
+    """The compact table (LLM_PROMPT_COMPACT) drives the same rules as the prose prompt."""
+    print("Testing compact prompt parsing...")
+    rows = {"BTC": {"price": 60000.0, "ema20": 59000.0, "macd": 12.5, "rsi7": 22.1},
+            "ETH": {"price": 3000.0, "ema20": 3100.0, "rsi7": 81.0, "funding_apr": 3.2}}
+    encoder = PromptEncoder()
+    compact = encoder.market(["BTC", "ETH"], rows)
+    assert parse_markets(compact) == {"BTC": {"price": 60000.0, "ema20": 59000.0, "rsi7": 22.1},
+                                      "ETH": {"price": 3000.0, "ema20": 3100.0, "rsi7": 81.0}}, parse_markets(compact)
+    # Sharded groups render one self-contained block per asset
+    blocks = encoder.asset_block("SOL", {"price": 150.0, "rsi7": 50.0}) + "note: done\n"
+    assert parse_markets(blocks) == {"SOL": {"price": 150.0, "ema20": None, "rsi7": 50.0}}
+    user = '## Assets\n["BTC", "ETH"]\n' + compact
+    actions = [d["action"] for d in StandinLLM().decide({"messages": [{"role": "user", "content": user}]})]
+    assert actions == ["buy", "sell"], actions
+    print("✅ Compact tables parsed")
+
+
+def test_failure_injection():
+    """Injected 422s and malformed JSON reach the agent's error and repair paths."""
+    print("Testing failure injection...")
+    standin = StandinLLM(error_rate=1.0)
+    (error,), _, _ = _run(standin)
+    assert isinstance(error, LLMHTTPError) and error.status == 422
+    # The agent first retries without response_format, then gives up
+    assert standin.stats["errors_injected"] == 2
+
+    standin = StandinLLM(malformed_rate=1.0, seed=3)
+    (decisions,), _, agent = _run(standin)
+    assert standin.stats["malformed_injected"] >= 1 and agent.parse_stats["direct"] == 0
+    # Sanitizer input that literal_eval rejects with TypeError (unhashable keys)
+    assert StandinLLM().decide({"messages": [{"role": "user", "content": 'Fix this: {{"a": 1}} {[1]: 2}'}]}) == []
+    print(f"✅ Injected failures handled: parse stats {agent.parse_stats}")
+
+
+def test_load_throughput():
+    """Zero-latency stand-in sustains hundreds of cycles per minute."""
+    print("Testing load throughput...")
+    standin = StandinLLM(latency="uniform:0.001,0.005", seed=7)
+    results, elapsed, _ = _run(standin, cycles=50)
+    assert len(results) == 50 and all(len(r) == len(ASSETS) for r in results)
+    rate = 50 / elapsed * 60
+    assert rate > 300, rate
+    samplers = [parse_latency(s) for s in ("fixed:0.2", "uniform:0.1,0.3", "normal:0.2,0.05", "lognormal:-1.6,0.3")]
+    rng = random.Random(0)
+    assert all(s(rng) >= 0 for s in samplers)
+    print(f"✅ {rate:.0f} cycles/minute")
+
+
+if __name__ == "__main__":
+    test_rule_based_decisions_plain_and_streamed()
+    test_compact_prompt_parsed()
+    test_failure_injection()
+    test_load_throughput()
+    print("🎉 Stand-in server tests completed!")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Test script for streamed LLM decisions with incremental JSON parsing (local stub server)
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+from src.config_loader import CONFIG
+from conftest import isolated_config, start_stub
+from src.agent.json_stream import IncrementalDecisionParser
+from src.agent.llm_client import StreamedMessage
+
+
+def _decision(asset):
+    return {"asset": asset, "action": "hold", "allocation_usd": 0, "tp_price": None, "sl_price": None,
+            "exit_plan": "none", "rationale": "stub {with} [brackets] and \"quotes\""}
+
+
+def _sse(delta):
+    return f"data: {json.dumps({'choices': [{'index': 0, 'delta': delta}]})}\n\n".encode()
+
+
+def _make_agent(base_url):
+    CONFIG.update({
+        "llm_provider": "openrouter",
+        "openrouter_api_key": "test-key",
+        "openrouter_base_url": base_url,
+        "taapi_api_key": CONFIG.get("taapi_api_key") or "test-key",
+        "llm_model": "x-ai/grok-4",
+        "llm_stream": "true",
+    })
+    from src.agent.decision_maker import TradingAgent
+    return TradingAgent()
+
+
+def test_parser_emits_each_element():
+    """Objects are emitted as soon as they close, whatever the chunking."""
+    print("Testing incremental parser...")
+    text = "```json\n" + json.dumps({"trade_decisions": [_decision("BTC"), _decision("ETH"), _decision("SOL")]}) + "\n```"
+    for size in (1, 7, len(text)):
+        parser = IncrementalDecisionParser()
+        out = []
+        for i in range(0, len(text), size):
+            out.extend(parser.feed(text[i:i + size]))
+        assert [o["asset"] for o in out] == ["BTC", "ETH", "SOL"], (size, out)
+        assert out[0]["rationale"] == _decision("BTC")["rationale"]
+        assert parser.done and parser.errors == 0
+
+    parser = IncrementalDecisionParser()
+    first = parser.feed('Here you go: [{"asset": "BTC", "action": "buy"}, {"asset": "ET')
+    assert first == [{"asset": "BTC", "action": "buy"}]
+    assert parser.feed('H", "action": "sell"}]') == [{"asset": "ETH", "action": "sell"}]
+    print("✅ Bare and wrapped arrays parsed incrementally")
+
+
+def test_streamed_message_assembles_tool_calls():
+    """Tool-call argument fragments are concatenated per index."""
+    print("Testing tool-call delta assembly...")
+    msg = StreamedMessage()
+    msg.add({"choices": [{"delta": {"role": "assistant", "tool_calls": [
+        {"index": 0, "id": "call_1", "type": "function", "function": {"name": "fetch_taapi_indicator", "arguments": '{"indi'}}]}}]})
+    msg.add({"choices": [{"delta": {"tool_calls": [{"index": 0, "function": {"arguments": 'cator": "rsi"}'}}]}}]})
+    msg.add({"choices": [{"delta": {}, "finish_reason": "tool_calls"}]})
+    message = msg.message()
+    assert message["tool_calls"][0]["id"] == "call_1"
+    assert json.loads(message["tool_calls"][0]["function"]["arguments"]) == {"indicator": "rsi"}
+    assert msg.finish_reason == "tool_calls"
+    print("✅ Tool call reassembled")
+
+
+async def _stream_scenario():
+    seen = []
+
+    async def handler(request):
+        body = await request.json()
+        seen.append(body)
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        await resp.write(b": keep-alive\n\n")
+        if len(seen) == 1:
+            # First round: the model asks for an indicator
+            await resp.write(_sse({"role": "assistant", "tool_calls": [{"index": 0, "id": "c1", "type": "function",
+                                  "function": {"name": "fetch_taapi_indicator", "arguments": ""}}]}))
+            await resp.write(_sse({"tool_calls": [{"index": 0, "function": {"arguments": json.dumps(
+                {"indicator": "rsi", "symbol": "BTC/USDT", "interval": "4h"})}}]}))
+        else:
+            text = json.dumps([_decision("BTC"), _decision("ETH")])
+            split = text.index('{"asset": "ETH"')
+            await resp.write(_sse({"role": "assistant", "content": text[:split]}))
+            await asyncio.sleep(0.5)
+            await resp.write(_sse({"content": text[split:]}))
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
+
+    runner, base_url = await start_stub(handler)
+    try:
+        agent = _make_agent(base_url)
+
+        async def fake_fetch_raw(indicator, symbol, interval, params=None, priority=None):
+            return {"value": 55.0}
+
+        agent.taapi.fetch_raw = fake_fetch_raw
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        arrivals = []
+        async for decision in agent.stream_decisions(["BTC", "ETH"], "context"):
+            arrivals.append((decision["asset"], loop.time() - started))
+        await agent.close()
+        return arrivals, seen
+    finally:
+        await runner.cleanup()
+
+
+def test_stream_decisions_yield_early():
+    """The first decision arrives before the model finishes the second."""
+    print("Testing streamed decisions...")
+    with isolated_config():
+        arrivals, seen = asyncio.run(_stream_scenario())
+    assert [a for a, _ in arrivals] == ["BTC", "ETH"], arrivals
+    assert arrivals[1][1] - arrivals[0][1] >= 0.4, arrivals
+    assert all(body.get("stream") is True for body in seen)
+    tool_msgs = [m for m in seen[1]["messages"] if m.get("role") == "tool"]
+    assert tool_msgs and json.loads(tool_msgs[0]["content"]) == {"value": 55.0}
+    print(f"✅ BTC decided at {arrivals[0][1]:.2f}s, ETH at {arrivals[1][1]:.2f}s")
+
+
+async def _rounds_scenario(rounds):
+    async def handler(request):
+        await request.json()
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        for delta in rounds.pop(0):
+            await resp.write(_sse(delta))
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
+
+    runner, base_url = await start_stub(handler)
+    try:
+        agent = _make_agent(base_url)
+
+        async def fake_fetch_raw(indicator, symbol, interval, params=None, priority=None):
+            return {"value": 55.0}
+
+        agent.taapi.fetch_raw = fake_fetch_raw
+        out = [d async for d in agent.stream_decisions(["BTC", "ETH"], "context")]
+        await agent.close()
+        return out
+    finally:
+        await runner.cleanup()
+
+
+def test_streamed_decisions_validated():
+    """Items failing the schema and text from tool rounds are never yielded from the stream."""
+    print("Testing streamed decision validation...")
+    buy = dict(_decision("BTC"), action="buy", allocation_usd=100)
+    call = {"index": 0, "id": "c1", "type": "function", "function": {"name": "fetch_taapi_indicator",
+            "arguments": json.dumps({"indicator": "rsi", "symbol": "BTC/USDT", "interval": "4h"})}}
+    rounds = [
+        # Tool round: opens with a tool call, then text that must not be acted on
+        [{"role": "assistant", "tool_calls": [call]}, {"content": json.dumps([buy])}],
+        # ETH's allocation is a string: not streamed, left to the buffered parse after BTC
+        [{"role": "assistant", "content": json.dumps([dict(_decision("ETH"), allocation_usd="100"), _decision("BTC")])}],
+    ]
+    with isolated_config():
+        decisions = asyncio.run(_rounds_scenario(rounds))
+    assert [(d["asset"], d["action"]) for d in decisions] == [("BTC", "hold"), ("ETH", "hold")], decisions
+
+    # Tool calls after decisions were yielded are not executed: no second request is made
+    rounds = [[{"role": "assistant", "content": json.dumps([_decision("BTC"), _decision("ETH")])}, {"tool_calls": [call]}]]
+    with isolated_config():
+        decisions = asyncio.run(_rounds_scenario(rounds))
+    assert [d["asset"] for d in decisions] == ["BTC", "ETH"] and rounds == [], decisions
+    print("✅ Only valid decisions from content rounds streamed")
+
+
+async def _fallback_scenario():
+    async def handler(request):
+        # Provider ignores stream and returns a wrapped, single-key object
+        content = json.dumps({"decisions": [_decision("BTC")]})
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+    runner, base_url = await start_stub(handler)
+    try:
+        agent = _make_agent(base_url)
+        out = [d async for d in agent.stream_decisions(["BTC"], "context")]
+        await agent.close()
+        return out
+    finally:
+        await runner.cleanup()
+
+
+def test_non_streaming_provider_falls_back():
+    """A plain JSON reply still yields decisions."""
+    print("Testing non-streaming fallback...")
+    with isolated_config():
+        out = asyncio.run(_fallback_scenario())
+    assert [d["asset"] for d in out] == ["BTC"], out
+    print("✅ Plain JSON reply handled")
+
+
+def test_stream_conflicts_logged():
+    """Hedging and sharding configured alongside streaming are reported as ignored."""
+    print("Testing stream config conflicts...")
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logging.getLogger().addHandler(handler)
+    try:
+        with isolated_config(llm_shard_size="2", llm_hedge_enabled="true", llm_hedge_provider="openrouter"):
+            _make_agent("http://127.0.0.1:9")
+    finally:
+        logging.getLogger().removeHandler(handler)
+    messages = [r.getMessage() for r in records if r.levelno == logging.WARNING]
+    assert any("LLM_STREAM=true takes precedence" in m and "LLM_HEDGE_ENABLED" in m and "LLM_SHARD_SIZE" in m
+               for m in messages), messages
+    print("✅ Conflicting options logged")
+
+
+if __name__ == "__main__":
+    test_parser_emits_each_element()
+    test_streamed_message_assembles_tool_calls()
+    test_stream_decisions_yield_early()
+    test_streamed_decisions_validated()
+    test_non_streaming_provider_falls_back()
+    test_stream_conflicts_logged()
+    print("🎉 Streaming decision tests completed!")
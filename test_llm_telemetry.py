@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for per-call LLM latency, token and cost telemetry (local stub server)
+"""
+import asyncio
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+from src.config_loader import CONFIG
+from conftest import isolated_config, start_stub
+from src.agent.telemetry import LLMTelemetry, estimate_cost, percentiles
+
+
+def test_cost_and_percentiles():
+    """Cost uses cached/uncached input prices; percentiles are nearest-rank."""
+    print("Testing cost estimate and percentiles...")
+    tokens = {"prompt_tokens": 1_000_000, "cached_tokens": 600_000, "completion_tokens": 100_000}
+    prices = {"m": {"input": 1.0, "cached_input": 0.1, "output": 10.0}}
+    assert estimate_cost("m", tokens, prices) == round(0.4 + 0.06 + 1.0, 6)
+    assert estimate_cost("unknown", tokens, prices) is None
+    p = percentiles([float(i) for i in range(1, 101)])
+    assert (p["p50"], p["p95"], p["p99"], p["mean"]) == (50.0, 95.0, 99.0, 50.5), p
+    assert percentiles([])["p95"] is None
+
+    telemetry = LLMTelemetry(window=2)
+    for latency in (1.0, 2.0, 3.0):
+        telemetry.record_request({"model": "x-ai/grok-4", "ok": True, "latency": latency, "ttfb": 0.1, "retries": 1,
+                                  "usage": {"prompt_tokens": 10, "completion_tokens": 5, "cost": 0.01}})
+    summary = telemetry.summary()
+    assert summary["window"] == 2 and summary["totals"]["requests"] == 3 and summary["totals"]["retries"] == 3
+    assert summary["latency"]["p50"] == 2.0 and summary["totals"]["cost_usd"] == 0.03
+    print("✅ Cost and percentiles correct")
+
+
+async def _scenario():
+    seen = []
+
+    async def handler(request):
+        body = await request.json()
+        seen.append(body)
+        await asyncio.sleep(0.1)
+        usage = {"prompt_tokens": 2000, "completion_tokens": 100, "prompt_tokens_details": {"cached_tokens": 1500},
+                 "completion_tokens_details": {"reasoning_tokens": 40}}
+        if len(seen) == 1:
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": "c1", "type": "function", "function": {"name": "fetch_taapi_indicator",
+                                                             "arguments": json.dumps({"indicator": "rsi", "symbol": "BTC/USDT", "interval": "4h"})}}]}
+        else:
+            message = {"role": "assistant", "content": json.dumps([{"asset": "BTC", "action": "hold"}])}
+        return web.json_response({"choices": [{"message": message}], "usage": usage})
+
+    runner, base_url = await start_stub(handler)
+    try:
+        CONFIG.update({
+            "llm_provider": "openrouter",
+            "openrouter_api_key": "test-key",
+            "openrouter_base_url": base_url,
+            "taapi_api_key": CONFIG.get("taapi_api_key") or "test-key",
+            "llm_model": "x-ai/grok-4",
+        })
+        from src.agent.decision_maker import TradingAgent
+        agent = TradingAgent()
+
+        async def fake_fetch_raw(indicator, symbol, interval, params=None, priority=None):
+            return {"value": 50.0}
+
+        agent.taapi.fetch_raw = fake_fetch_raw
+        outputs = await agent.decide_trade(["BTC"], "context")
+        await agent.close()
+        return outputs, agent.telemetry
+    finally:
+        await runner.cleanup()
+
+
+def test_requests_and_decisions_recorded():
+    """Each request records TTFB/latency/tokens/cost; the decision records tool rounds."""
+    print("Testing end-to-end telemetry...")
+    with isolated_config():
+        outputs, telemetry = asyncio.run(_scenario())
+    assert outputs[0]["asset"] == "BTC"
+    summary = telemetry.summary()
+    totals = summary["totals"]
+    assert totals["requests"] == 2 and totals["errors"] == 0
+    assert totals["cached_tokens"] == 3000 and totals["reasoning_tokens"] == 80
+    assert totals["cost_usd"] == round(2 * estimate_cost("x-ai/grok-4", {"prompt_tokens": 2000, "cached_tokens": 1500, "completion_tokens": 100}), 6)
+    assert summary["latency"]["p50"] >= 0.1 and summary["ttfb"]["p50"] is not None
+    assert summary["decisions"]["tool_rounds"]["p50"] == 1 and summary["decisions"]["window"] == 1
+    assert set(summary["by_model"]) == {"x-ai/grok-4"}
+    print(f"✅ Latency p50 {summary['latency']['p50']}s, cost ${totals['cost_usd']}")
+
+
+if __name__ == "__main__":
+    test_cost_and_percentiles()
+    test_requests_and_decisions_recorded()
+    print("🎉 LLM telemetry tests completed!")
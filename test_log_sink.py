@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for the background rotating JSON-lines log sink
+"""
+import glob
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.log_sink import LogSink, get_sink
+
+
+def test_writes_json_lines_without_blocking():
+    """Records land on disk as compact JSON lines after a flush."""
+    print("Testing JSON-lines sink...")
+    path = os.path.join(tempfile.mkdtemp(), "llm_requests.log")
+    sink = LogSink(path)
+    started = time.perf_counter()
+    for i in range(1000):
+        sink.write({"event": "request", "i": i, "payload": {"messages": ["x" * 200]}})
+    queued_in = time.perf_counter() - started
+    sink.flush()
+    with open(path) as f:
+        lines = [json.loads(l) for l in f]
+    assert [l["i"] for l in lines] == list(range(1000)) and "ts" in lines[0]
+    sink.close()
+    print(f"✅ 1000 records queued in {queued_in * 1000:.1f}ms")
+
+
+def test_rotation_compresses_and_prunes():
+    """Size rotation gzips old files and keeps only `backups` archives."""
+    print("Testing rotation...")
+    path = os.path.join(tempfile.mkdtemp(), "prompts.log")
+    sink = LogSink(path, max_bytes=2000, backups=2)
+    for i in range(100):
+        sink.write({"event": "prompt", "i": i, "context": "y" * 100})
+    sink.close()
+    archives = sorted(glob.glob(path + ".*.gz"))
+    assert len(archives) == 2 and sink.stats["rotations"] > 2, (archives, sink.stats)
+    with gzip.open(archives[-1], "rt") as f:
+        rotated = [json.loads(l)["i"] for l in f]
+    with open(path) as f:
+        current = [json.loads(l)["i"] for l in f]
+    assert os.path.getsize(path) <= 2000 and rotated[-1] + 1 == current[0] and current[-1] == 99
+    print(f"✅ {sink.stats['rotations']} rotations, {len(archives)} archives kept")
+
+
+def test_sampling_and_shared_sinks():
+    """Sampled records honour sample_rate; unsampled ones are always written."""
+    print("Testing sampling...")
+    path = os.path.join(tempfile.mkdtemp(), "llm_requests.log")
+    sink = LogSink(path, sample_rate=0.0)
+    assert not sink.write({"event": "request"}, sampled=True)
+    assert sink.write({"event": "error", "status": 500})
+    sink.close()
+    with open(path) as f:
+        assert [json.loads(l)["event"] for l in f] == ["error"]
+    assert sink.stats["sampled_out"] == 1
+
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())
+    try:
+        assert get_sink("x.log") is get_sink(os.path.abspath("x.log"))
+    finally:
+        os.chdir(cwd)
+    assert get_sink("x.log") is not get_sink(os.path.join(tempfile.gettempdir(), "other", "x.log"))
+    print("✅ Sampling applied")
+
+
+if __name__ == "__main__":
+    test_writes_json_lines_without_blocking()
+    test_rotation_compresses_and_prunes()
+    test_sampling_and_shared_sinks()
+    print("🎉 Log sink tests completed!")
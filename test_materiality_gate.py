@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for the LLM materiality gate
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.agent.materiality import MaterialityGate, exit_deadline, regime_flags, sampled_atr
+
+ASSETS = ["BTC", "ETH"]
+HOLDS = [{"asset": a, "action": "hold", "rationale": "quiet"} for a in ASSETS]
+
+
+def _snapshots(btc=60000.0, eth=3000.0, **btc_overrides):
+    btc_args = {"atr": 400.0, "flags": regime_flags(61000, 60000, 55, 12), **btc_overrides}
+    return {
+        "BTC": MaterialityGate.snapshot(btc, **btc_args),
+        "ETH": MaterialityGate.snapshot(eth, atr=None, flags=regime_flags(3100, 3000, 50, 1)),
+    }
+
+
+def test_quiet_market_reuses_holds():
+    """Small moves reuse the holds; big moves, flips and position changes call the LLM."""
+    print("Testing materiality thresholds...")
+    gate = MaterialityGate(atr_threshold=0.5, price_pct=0.5, max_skips=10)
+    assert gate.reuse(_snapshots(), ASSETS) is None and gate.last_reasons == ["no previous decision"]
+    gate.record(_snapshots(), HOLDS)
+
+    assert gate.reuse(_snapshots(btc=60150.0, eth=3010.0), ASSETS) == HOLDS
+    assert gate.reuse(_snapshots(btc=60250.0), ASSETS) is None
+    assert gate.last_reasons == ["BTC: price moved 0.62 ATR"], gate.last_reasons
+    # ETH has no ATR: the percentage fallback applies
+    assert gate.reuse(_snapshots(eth=3020.0), ASSETS) is None and "ETH: price moved 0.67%" in gate.last_reasons
+    assert gate.reuse(_snapshots(flags=regime_flags(59000, 60000, 55, 12)), ASSETS) is None
+    assert gate.last_reasons == ["BTC: regime changed (trend)"]
+    assert gate.reuse(_snapshots(position=0.01), ASSETS) is None
+    assert gate.reuse(_snapshots(orders=[123]), ASSETS) is None
+    assert gate.stats["skipped"] == 1
+    print("✅ Thresholds applied")
+
+
+def test_non_hold_and_forced_refresh():
+    """Trades are never reused, and a refresh is forced after N skips."""
+    print("Testing forced refresh...")
+    gate = MaterialityGate(max_skips=2)
+    gate.record(_snapshots(), [HOLDS[0], {"asset": "ETH", "action": "buy"}])
+    assert gate.reuse(_snapshots(), ASSETS) is None and gate.last_reasons == ["ETH: previous decision was buy"]
+    gate.record(_snapshots(), HOLDS)
+    assert gate.reuse(_snapshots(), ASSETS) and gate.reuse(_snapshots(), ASSETS)
+    assert gate.reuse(_snapshots(), ASSETS) is None and gate.stats["forced"] == 1
+    gate.record(_snapshots(), HOLDS)
+    assert gate.skips == 0 and gate.reuse(_snapshots(), ASSETS)
+    print(f"✅ Refresh forced: {gate.summary()}")
+
+
+def test_exit_deadline_due():
+    """A time-based exit plan coming due is material."""
+    print("Testing exit-plan deadlines...")
+    opened = datetime.now() - timedelta(minutes=50)
+    trade = {"exit_plan": "Close after 1 hour if TP not hit", "opened_at": opened.isoformat()}
+    deadline = exit_deadline(trade)
+    assert abs(deadline - (opened + timedelta(hours=1)).timestamp()) < 1
+    assert exit_deadline({"exit_plan": "Invalidate below 4h EMA50", "opened_at": opened.isoformat()}) is None
+    # Durations without an exit verb are not deadlines
+    for plan in ("Trend intact for 4h; trail stop", "RSI reset within 2 hours", "Hold in 4h uptrend"):
+        assert exit_deadline({"exit_plan": plan, "opened_at": opened.isoformat()}) is None, plan
+    for plan, hours in (("Reassess the trade in 2h", 2), ("max hold 90 min", 1.5), ("time stop 30m", 0.5)):
+        due = exit_deadline({"exit_plan": plan, "opened_at": opened.isoformat()})
+        assert abs(due - (opened + timedelta(hours=hours)).timestamp()) < 1, plan
+
+    gate = MaterialityGate(horizon=300)
+    gate.record(_snapshots(deadline=deadline), HOLDS, now=opened.timestamp())
+    assert gate.reuse(_snapshots(deadline=deadline), ASSETS, now=deadline - 3600) == HOLDS
+    assert gate.reuse(_snapshots(deadline=deadline), ASSETS, now=deadline - 200) is None
+    assert gate.last_reasons == ["BTC: exit-plan deadline due"]
+    assert round(sampled_atr([100, 101, 99, 100]), 3) == 1.333 and sampled_atr([100]) is None
+    print("✅ Deadline detected")
+
+
+if __name__ == "__main__":
+    test_quiet_market_reuses_holds()
+    test_non_hold_and_forced_refresh()
+    test_exit_deadline_due()
+    print("🎉 Materiality gate tests completed!")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for the token-budgeted compact prompt encoder
+"""
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.agent.prompt_encoder import LEVELS, PromptEncoder, estimate_tokens, format_value
+
+
+def _row(price):
+    series = [price * (1 + i / 1000) for i in range(10)]
+    return {
+        "price": price, "ema20": price * 0.999123456, "macd": 12.345678, "rsi7": 55.5555, "rsi14": 48.12,
+        "oi": 123456.789, "funding_apr": 10.95123, "ema20_4h": price * 0.98, "ema50_4h": price * 0.97,
+        "atr3_4h": "N/A", "atr14_4h": None, "mids": series, "ema20_series": series,
+        "macd_series": [0.000123456] * 10, "rsi7_series": [55.123] * 10, "rsi14_series": [50.0] * 10,
+        "macd_4h_series": [-3.21] * 10, "rsi14_4h_series": [61.7] * 10,
+    }
+
+
+ROWS = {"BTC": _row(60123.456789), "ETH": _row(3012.3456), "DOGE": _row(0.123456789)}
+HEAD = "Current Total Return (percent): 1.00%\nAvailable Cash: 1000.0\n"
+HISTORY = [{"timestamp": f"2025-01-01T00:{i:02d}:00", "asset": "BTC", "action": "hold", "rationale": "x" * 120} for i in range(10)]
+ORDERS = [f"oid:{i} BTC SELL sz:0.01 triggerPx:65000.0 type:trigger" for i in range(30)]
+FILLS = [f"2025-01-01T00:{i:02d}:00+00:00 BTC BUY sz:0.01 px:60000.0" for i in range(20)]
+
+
+def _render(encoder):
+    return lambda level: (f"## Market Data\n{encoder.market(list(ROWS), ROWS, level)}\n"
+                          f"## Account Information & Performance\n{encoder.account(HEAD, HISTORY, ORDERS, FILLS, level)}")
+
+
+def test_fixed_precision_per_field():
+    """Prices keep 6 significant figures, RSI one decimal, missing values a dash."""
+    print("Testing field formatting...")
+    assert format_value(60123.456789, "price") == "60123.5"
+    assert format_value(0.123456789, "price") == "0.123457"
+    assert format_value(0.000123456, "osc") == "0.0001235"
+    assert format_value(55.5555, "rsi") == "55.6" and format_value(123456.789, "int") == "123457"
+    assert format_value("N/A", "price") == "-" and format_value(None, "rsi") == "-"
+    table = PromptEncoder().market(["BTC", "SOL"], ROWS)
+    lines = table.splitlines()
+    assert lines[1].startswith("asset|px|ema20") and lines[2].startswith("BTC|60123.5|60070.8|12.35|55.6|48.1|123457|10.95|")
+    assert "SOL" not in table and "BTC mid: 60123,60184" in table and "BTC rsi7: 55,55" in table
+    print("✅ Fields formatted")
+
+
+def test_compact_is_smaller_than_prose():
+    """The compact rendering needs fewer tokens than the prose format (2-decimal series)."""
+    print("Testing compactness...")
+    prose = ""
+    for asset, row in ROWS.items():
+        prose += (f"ALL {asset} DATA\ncurrent_price = {row['price']}, current_ema20 = {row['ema20']}, current_macd = {row['macd']}, "
+                  f"current_rsi (7 period) = {row['rsi7']}\nOpen Interest: {row['oi']}\nFunding Rate: 0.0000125 (Annualized: {row['funding_apr']}%)\n")
+        for key in ("mids", "ema20_series", "macd_series", "rsi7_series", "rsi14_series", "macd_4h_series", "rsi14_4h_series"):
+            prose += f"{key} indicators: {json.dumps([round(v, 2) for v in row[key]])}\n"
+    compact = PromptEncoder().market(list(ROWS), ROWS)
+    assert estimate_tokens(compact) < 0.8 * estimate_tokens(prose), (estimate_tokens(compact), estimate_tokens(prose))
+    assert 0 < estimate_tokens("BTC|60123.5") <= 6
+    print(f"✅ {estimate_tokens(compact)} vs {estimate_tokens(prose)} estimated tokens")
+
+
+def test_degrades_to_fit_budget():
+    """Tighter budgets shorten series, history, orders and fills, in that ladder order."""
+    print("Testing token budget...")
+    full, info = PromptEncoder().fit(_render(PromptEncoder()))
+    assert info == {"level": 0, "tokens": estimate_tokens(full), "over_budget": False}
+    assert full.count("hold - " + "x" * 80 + "\n") == 10 and "(+" not in full and "(+10 more)" not in full
+
+    sizes = [estimate_tokens(_render(PromptEncoder())(level)) for level in LEVELS]
+    assert sizes == sorted(sizes, reverse=True)
+    encoder = PromptEncoder(token_budget=sizes[2] + 1)
+    text, info = encoder.fit(_render(encoder))
+    assert info["level"] == 2 and not info["over_budget"] and info["tokens"] <= encoder.token_budget
+    assert "last 3)" in text and "x" not in text.split("Recent Trading History")[1].split("Active Open Orders")[0]
+    assert "(+20 more)" in text and "Recent Fills (latest 5)" in text
+
+    encoder = PromptEncoder(token_budget=10)
+    text, info = encoder.fit(_render(encoder))
+    assert info["over_budget"] and info["level"] == len(LEVELS) - 1 and "Series" not in text and "Recent Fills" not in text
+    assert HEAD.strip() in text
+    print(f"✅ Degradation ladder: {sizes}")
+
+
+def test_asset_block_is_self_contained():
+    """Per-asset blocks (sharded mode) carry their own header."""
+    print("Testing asset blocks...")
+    block = PromptEncoder().asset_block("ETH", ROWS["ETH"], LEVELS[3])
+    assert block.splitlines()[0] == PromptEncoder.header() and block.splitlines()[1].startswith("ETH|3012.35|")
+    assert len(block.splitlines()) == 2
+    print("✅ Asset block rendered")
+
+
+if __name__ == "__main__":
+    test_fixed_precision_per_field()
+    test_compact_is_smaller_than_prose()
+    test_degrades_to_fit_budget()
+    test_asset_block_is_self_contained()
+    print("🎉 Prompt encoder tests completed!")
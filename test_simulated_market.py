@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for the simulated exchange and indicators used for load tests
+"""
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.config_loader import CONFIG
+from src.indicators.simulated_indicators import SimulatedIndicators
+from src.main import take_snapshot
+from src.trading.simulated_api import SimulatedTradingAPI
+from src.utils.scheduler import CycleScheduler
+
+
+def test_orders_update_account():
+    """Market orders fill at once and move the position and balance; TP/SL orders rest."""
+    print("Testing simulated orders...")
+    api = SimulatedTradingAPI(seed=1)
+
+    async def scenario():
+        await api.place_buy_order("BTC", 0.1)
+        tp = await api.place_take_profit("BTC", True, 0.1, 70000)
+        opened = await api.get_user_state()
+        orders = await api.get_open_orders()
+        for _ in range(5):
+            await api.get_current_price("BTC")
+        await api.place_sell_order("BTC", 0.1)
+        cancelled = await api.cancel_all_orders("BTC")
+        return tp, opened, orders, cancelled, await api.get_user_state(), await api.get_recent_fills()
+
+    tp, opened, orders, cancelled, closed, fills = asyncio.run(scenario())
+    assert opened["positions"][0]["coin"] == "BTC" and opened["positions"][0]["szi"] == 0.1
+    assert orders[0]["triggerPx"] == 70000.0 and api.extract_oids(tp) == [orders[0]["oid"]]
+    assert cancelled["cancelled_count"] == 1 and closed["positions"] == []
+    expected = 10000.0 + (fills[1]["px"] - fills[0]["px"]) * 0.1
+    assert abs(closed["balance"] - expected) < 1e-6 and [f["isBuy"] for f in fills] == [True, False]
+    print(f"✅ Round trip settled at balance {closed['balance']:.2f}")
+
+
+def test_snapshot_without_network():
+    """A full snapshot for many assets comes back from the simulated clients without network reads."""
+    print("Testing simulated snapshot...")
+    CONFIG["gather_concurrency"] = "10"
+    CONFIG["gather_asset_timeout"] = "5"
+    api = SimulatedTradingAPI(seed=2)
+    assets = [f"A{i}" for i in range(20)] + ["BTC"]
+    started = time.perf_counter()
+    snapshot = asyncio.run(take_snapshot(api, SimulatedIndicators(api, seed=2), assets, "30s", lambda e: None))
+    elapsed = time.perf_counter() - started
+    btc = snapshot["gathered"]["BTC"]
+    assert not any(isinstance(v, Exception) for v in snapshot["gathered"].values())
+    assert len(btc["ema_series"]) == 10 and abs(btc["lt_ema20"] / btc["price"] - 1) < 0.05
+    assert 30 <= btc["indicators"]["rsi"] <= 70 and elapsed < 1.0, elapsed
+    print(f"✅ {len(assets)} assets in {elapsed:.3f}s")
+
+
+def test_sub_minute_unaligned_ticks():
+    """Second intervals give sub-minute periods for unaligned load-test cycles."""
+    print("Testing sub-minute interval...")
+    now = [1_700_000_007.0]
+    scheduler = CycleScheduler("5s", align=False, clock=lambda: now[0])
+    scheduler.begin()
+    assert scheduler.period == 5 and scheduler.next_tick() == 1_700_000_012.0
+    aligned = CycleScheduler("30s", offset=1, clock=lambda: now[0])
+    assert aligned.boundary_after(now[0]) == 1_700_000_011.0
+    try:
+        CycleScheduler("0s")
+        assert False, "expected a ValueError for aligned 0s cycles"
+    except ValueError:
+        pass
+    print("✅ 5s and 30s intervals scheduled")
+
+
+if __name__ == "__main__":
+    test_orders_update_account()
+    test_snapshot_without_network()
+    test_sub_minute_unaligned_ticks()
+    print("🎉 Simulated market tests completed!")
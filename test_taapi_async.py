@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script for the asyncio-native, pooled TAAPI client (local stub server, no network)
+"""
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+from src.config_loader import CONFIG
+from conftest import start_stub
+CONFIG["taapi_api_key"] = CONFIG.get("taapi_api_key") or "test-key"
+
+from src.indicators.taapi_client import TAAPIClient
+from src.utils.candle_cache import CandleCache
+from src.indicators.taapi_budget import RequestBudgeter
+
+
+async def _concurrency_scenario():
+    state = {"in_flight": 0, "peak": 0}
+
+    async def handler(request):
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.05)
+        state["in_flight"] -= 1
+        return web.json_response({"value": 1.0})
+
+    runner, base_url = await start_stub(handler, path="/{indicator}", method="*")
+    try:
+        client = TAAPIClient(cache=CandleCache(), budgeter=RequestBudgeter(1000, burst=1000))
+        client.base_url = f"{base_url}/"
+        client.max_concurrency = 2
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        values = await asyncio.gather(*(client.fetch_value("ema", "BTC/USDT", "4h", params={"period": p}) for p in range(8)))
+        tick_task.cancel()
+        await client.close()
+        return values, state["peak"], ticks
+    finally:
+        await runner.cleanup()
+
+
+async def _retry_scenario():
+    calls = {"n": 0}
+
+    async def handler(request):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            return web.json_response({"error": "busy"}, status=503)
+        return web.json_response({"value": [1.0, 2.0]})
+
+    runner, base_url = await start_stub(handler, path="/{indicator}", method="*")
+    try:
+        client = TAAPIClient(cache=CandleCache(), budgeter=RequestBudgeter(1000, burst=1000))
+        client.base_url = f"{base_url}/"
+        series = await client.fetch_series("rsi", "BTC/USDT", "5m", results=2)
+        await client.close()
+        return series, calls["n"]
+    finally:
+        await runner.cleanup()
+
+
+def test_bounded_concurrency_non_blocking():
+    """Concurrent fetches respect the semaphore and leave the event loop responsive."""
+    print("Testing bounded concurrency...")
+    values, peak, ticks = asyncio.run(_concurrency_scenario())
+    assert values == [1.0] * 8
+    assert peak <= 2, f"peak in-flight {peak} exceeded limit"
+    assert ticks > 5, "event loop was blocked during fetches"
+    print(f"✅ 8 fetches, peak in-flight {peak}, loop ticked {ticks} times")
+
+
+def test_retry_on_5xx():
+    """5xx responses are retried with asyncio backoff."""
+    print("Testing 5xx retry...")
+    series, calls = asyncio.run(_retry_scenario())
+    assert series == [1.0, 2.0]
+    assert calls == 2
+    print("✅ Retried once after 503")
+
+
+if __name__ == "__main__":
+    test_bounded_concurrency_non_blocking()
+    test_retry_on_5xx()
+    print("🎉 Async TAAPI client tests completed!")
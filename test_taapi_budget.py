@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test script for the plan-aware TAAPI request budgeter
+"""
+import asyncio
+import time
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.indicators.taapi_budget import (
+    RequestBudgeter, PRIORITY_LOOP, PRIORITY_EXIT, PRIORITY_TOOL, request_priority, current_priority,
+)
+
+
+def test_window_limit_and_smoothing():
+    """No more than max_requests are granted per window, and bursts are spread."""
+    print("Testing window limit...")
+    budget = RequestBudgeter(4, window=0.4, burst=2)
+    grants = []
+
+    async def one():
+        await budget.acquire(PRIORITY_LOOP)
+        grants.append(time.monotonic())
+
+    async def scenario():
+        await asyncio.gather(*(one() for _ in range(8)))
+
+    start = time.monotonic()
+    asyncio.run(scenario())
+    grants = [g - start for g in sorted(grants)]
+    for i, g in enumerate(grants):
+        in_window = [x for x in grants if g - 0.4 < x <= g]
+        assert len(in_window) <= 4, f"window exceeded at {g:.3f}: {in_window}"
+    assert grants[2] >= 0.08, "burst beyond the bucket should be smoothed"
+    print(f"✅ 8 grants spread over {grants[-1]:.2f}s, never more than 4 per window")
+
+
+def test_priority_order():
+    """Queued loop requests are served before exit checks, which beat tool calls."""
+    print("Testing priority ordering...")
+    budget = RequestBudgeter(1, window=0.05, burst=1)
+    order = []
+
+    async def one(name, priority):
+        await budget.acquire(priority)
+        order.append(name)
+
+    async def scenario():
+        await budget.acquire(PRIORITY_LOOP)  # drain the bucket so the rest must queue
+        tasks = [asyncio.create_task(one("tool", PRIORITY_TOOL))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(one("exit", PRIORITY_EXIT)))
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(one("loop", PRIORITY_LOOP)))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order == ["loop", "exit", "tool"], order
+    print(f"✅ Served in priority order: {order}")
+
+
+def test_penalize_and_projection():
+    """A 429 pauses grants and is reflected in the projected completion time."""
+    print("Testing 429 pause and projection...")
+    budget = RequestBudgeter(30, window=15)
+    assert budget.projected_completion(5) == 0.0
+    assert budget.projected_completion(40) > 0
+    budget.penalize(retry_after=3)
+    assert budget.projected_completion(1) >= 2.9
+    assert budget.stats()["rate_limited"] == 1
+    print(f"✅ Projection after 429: {budget.projected_completion(1)}s")
+
+
+def test_priority_context():
+    """request_priority tags requests made within the block."""
+    assert current_priority() == PRIORITY_LOOP
+    with request_priority(PRIORITY_EXIT):
+        assert current_priority() == PRIORITY_EXIT
+    assert current_priority() == PRIORITY_LOOP
+    print("✅ Priority context restored")
+
+
+if __name__ == "__main__":
+    test_window_limit_and_smoothing()
+    test_priority_order()
+    test_penalize_and_projection()
+    test_priority_context()
+    print("🎉 TAAPI budget tests completed!")
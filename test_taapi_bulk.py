@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for TAAPI bulk endpoint support
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.config_loader import CONFIG
+CONFIG["taapi_api_key"] = CONFIG.get("taapi_api_key") or "test-key"
+
+from src.indicators.taapi_client import TAAPIClient
+from src.utils.candle_cache import CandleCache
+from src.indicators.taapi_budget import RequestBudgeter
+from src.main import indicator_specs
+
+
+def _fake_bulk(calls):
+    """Return a _post_with_retry stand-in that echoes a result per indicator id."""
+    async def post(url, body, priority=None):
+        calls.append(body)
+        constructs = body["construct"] if isinstance(body["construct"], list) else [body["construct"]]
+        data = []
+        for c in constructs:
+            for ind in c["indicators"]:
+                if "results" in ind:
+                    result = {"value": [1.0] * ind["results"], "valueMACD": [2.0] * ind["results"]}
+                else:
+                    result = {"value": 42.0, "valueMACD": 1.5}
+                data.append({"id": ind["id"], "indicator": ind["indicator"], "result": result, "errors": []})
+        return {"data": data}
+    return post
+
+
+def test_bulk_chunking():
+    """Constructs are split by symbol/interval and chunked to plan limits."""
+    print("Testing bulk construct chunking...")
+    client = TAAPIClient(cache=CandleCache(), budgeter=RequestBudgeter(1000, burst=1000))
+    client.bulk_max_indicators = 4
+    client.bulk_max_constructs = 2
+    specs = [s for asset in ("BTC", "ETH") for s in indicator_specs(asset, "5m")]
+    calls, id_to_key = client._build_bulk_calls(specs)
+    # 2 assets x (5m: 9 unique, 4h: 4) -> constructs of <=4 indicators
+    total = sum(len(c["indicators"]) for call in calls for c in call)
+    assert total == len(id_to_key) == 26, total
+    assert all(len(call) <= 2 for call in calls)
+    assert all(len(c["indicators"]) <= 4 for call in calls for c in call)
+    print(f"✅ {total} indicators packed into {len(calls)} bulk calls")
+
+
+def test_prefetch_serves_callers():
+    """After prefetch, fetch_series/fetch_value/get_indicators make no further requests."""
+    print("Testing prefetch fan-out...")
+    client = TAAPIClient(cache=CandleCache(), budgeter=RequestBudgeter(1000, burst=1000))
+    calls = []
+    client._post_with_retry = _fake_bulk(calls)
+
+    async def no_get(url, params, priority=None):
+        raise AssertionError(f"unexpected GET {url}")
+    client._get_with_retry = no_get
+
+    specs = [s for asset in ("BTC", "ETH", "SOL") for s in indicator_specs(asset, "5m")]
+    fetched = client.prefetch_sync(specs)
+    assert fetched == 39, fetched
+    assert len(calls) == 6, len(calls)  # one construct per symbol/interval with max_constructs=1
+
+    assert client.fetch_series_sync("ema", "BTC/USDT", "5m", results=10, params={"period": 20}) == [1.0] * 10
+    assert client.fetch_series_sync("macd", "ETH/USDT", "4h", results=10, value_key="valueMACD") == [2.0] * 10
+    assert client.fetch_value_sync("ema", "SOL/USDT", "4h", params={"period": 50}) == 42.0
+    assert client.get_indicators_sync("BTC", "5m")["rsi"] == 42.0
+    assert len(calls) == 6
+    print(f"✅ 39 indicators served from {len(calls)} bulk requests")
+
+
+def test_prefetch_without_cache_is_noop():
+    """With the cache disabled there is nowhere to keep bulk results, so nothing is requested."""
+    print("Testing prefetch with the cache disabled...")
+    CONFIG["taapi_cache_enabled"] = "false"
+    client = TAAPIClient(budgeter=RequestBudgeter(1000, burst=1000))
+    calls = []
+    client._post_with_retry = _fake_bulk(calls)
+    assert client.cache is None
+    assert client.prefetch_sync(indicator_specs("BTC", "5m")) == 0 and calls == []
+    print("✅ Prefetch skipped")
+
+
+if __name__ == "__main__":
+    test_bulk_chunking()
+    test_prefetch_serves_callers()
+    test_prefetch_without_cache_is_noop()
+    print("🎉 TAAPI bulk tests completed!")
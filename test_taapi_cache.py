@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test script for the candle-boundary-aware TAAPI response cache
+"""
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import src.utils.candle_cache as candle_cache
+from src.utils.candle_cache import CandleCache
+from src.utils.intervals import next_candle_close, interval_seconds
+from src.config_loader import CONFIG
+CONFIG["taapi_api_key"] = CONFIG.get("taapi_api_key") or "test-key"
+
+from src.indicators.taapi_client import TAAPIClient
+
+
+class _Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def test_next_candle_close():
+    """Boundaries are UTC-aligned per interval."""
+    print("Testing candle boundaries...")
+    t = 1_700_000_123  # 2023-11-14T22:15:23Z
+    assert next_candle_close("5m", t) == 1_700_000_400
+    assert next_candle_close("4h", t) == 1_700_006_400
+    assert next_candle_close('"1h"', 1_699_999_200) == 1_700_002_800
+    assert interval_seconds("1w") == 604800
+    print("✅ 5m/4h/1h closes computed correctly")
+
+
+def test_expiry_and_counters():
+    """Entries are hits until the candle closes, then refetched."""
+    print("Testing expiry at candle close...")
+    clock = _Clock(1_700_000_000.0)
+    original = candle_cache.time
+    candle_cache.time = clock
+    try:
+        cache = CandleCache(close_grace=2)
+        calls = {"n": 0}
+
+        async def fetcher():
+            calls["n"] += 1
+            return {"value": calls["n"]}
+
+        async def scenario():
+            out = []
+            out.append(await cache.get_or_fetch("k", "4h", fetcher))
+            clock.now += 3000  # same 4h candle
+            out.append(await cache.get_or_fetch("k", "4h", fetcher))
+            clock.now = next_candle_close("4h", 1_700_000_000.0) + 3  # past close + grace
+            out.append(await cache.get_or_fetch("k", "4h", fetcher))
+            return out
+
+        out = asyncio.run(scenario())
+        assert [o["value"] for o in out] == [1, 1, 2], out
+        stats = cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 2, stats
+        print(f"✅ Expiry honoured, stats: {stats}")
+    finally:
+        candle_cache.time = original
+
+
+def test_stale_while_revalidate():
+    """Forming-bar entries are served stale while a background refresh runs."""
+    print("Testing stale-while-revalidate...")
+    clock = _Clock(1_700_000_000.0)
+    original = candle_cache.time
+    candle_cache.time = clock
+    try:
+        cache = CandleCache(revalidate_after=60)
+        calls = {"n": 0}
+
+        async def fetcher():
+            calls["n"] += 1
+            return calls["n"]
+
+        async def scenario():
+            first = await cache.get_or_fetch("k", "4h", fetcher)
+            clock.now += 120
+            stale = await cache.get_or_fetch("k", "4h", fetcher)
+            await asyncio.sleep(0.01)  # let the background refresh land
+            fresh = await cache.get_or_fetch("k", "4h", fetcher)
+            pinned = await cache.get_or_fetch("closed", "4h", fetcher, revalidate=False)
+            clock.now += 120
+            pinned_again = await cache.get_or_fetch("closed", "4h", fetcher, revalidate=False)
+            return first, stale, fresh, pinned, pinned_again
+
+        first, stale, fresh, pinned, pinned_again = asyncio.run(scenario())
+        assert (first, stale, fresh) == (1, 1, 2), (first, stale, fresh)
+        assert pinned == pinned_again == 3
+        assert cache.stats()["stale_hits"] == 1
+        print("✅ Stale value served and refreshed in background")
+    finally:
+        candle_cache.time = original
+
+
+def test_concurrent_requests_deduplicated():
+    """Identical concurrent lookups share a single fetch."""
+    print("Testing in-flight deduplication...")
+    cache = CandleCache()
+    calls = {"n": 0}
+
+    async def fetcher():
+        calls["n"] += 1
+        await asyncio.sleep(0.02)
+        return {"value": 7}
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_fetch("k", "5m", fetcher) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert all(r == {"value": 7} for r in results)
+    assert calls["n"] == 1, calls
+    print("✅ 5 concurrent lookups -> 1 fetch")
+
+
+def test_client_shares_cache():
+    """Separate TAAPIClient instances (loop vs tool calls) share the same cache."""
+    print("Testing shared client cache...")
+    loop_client = TAAPIClient()
+    tool_client = TAAPIClient()
+    assert loop_client.cache is tool_client.cache
+    calls = {"n": 0}
+
+    async def fake_get(url, params, priority=None):
+        calls["n"] += 1
+        return {"value": 123.0}
+
+    loop_client._get_with_retry = fake_get
+    tool_client._get_with_retry = fake_get
+    loop_client.cache.clear()
+    assert loop_client.fetch_value_sync("ema", "BTC/USDT", "4h", params={"period": 50}) == 123.0
+    assert tool_client.fetch_raw_sync("ema", "BTC/USDT", "4h", {"period": 50}) == {"value": 123.0}
+    assert calls["n"] == 1
+    print("✅ Tool call served from the loop's cached response")
+
+
+if __name__ == "__main__":
+    test_next_candle_close()
+    test_expiry_and_counters()
+    test_stale_while_revalidate()
+    test_concurrent_requests_deduplicated()
+    test_client_shares_cache()
+    print("🎉 TAAPI cache tests completed!")
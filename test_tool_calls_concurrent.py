@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test script for concurrent execution of a turn's tool calls
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.config_loader import CONFIG
+CONFIG.update({
+    "llm_provider": "openrouter",
+    "openrouter_api_key": CONFIG.get("openrouter_api_key") or "test-key",
+    "taapi_api_key": CONFIG.get("taapi_api_key") or "test-key",
+})
+from src.agent.decision_maker import TradingAgent
+
+
+def _tool_call(i, indicator):
+    args = {"indicator": indicator, "symbol": "BTC/USDT", "interval": "4h", "period": 14}
+    return {"id": f"call_{i}", "type": "function",
+            "function": {"name": "fetch_taapi_indicator", "arguments": json.dumps(args)}}
+
+
+def test_tool_calls_run_concurrently_in_order():
+    """Calls overlap (bounded), results keep tool_call_id order, slow calls time out."""
+    print("Testing concurrent tool calls...")
+    agent = TradingAgent()
+    agent.tool_concurrency = 3
+    agent.tool_timeout = 0.5
+    state = {"in_flight": 0, "peak": 0}
+    delays = {"rsi": 0.2, "atr": 0.05, "adx": 0.1, "ema": 0.15, "sma": 2.0}
+
+    async def fake_fetch_raw(indicator, symbol, interval, params=None, priority=None):
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        try:
+            await asyncio.sleep(delays[indicator])
+        finally:
+            state["in_flight"] -= 1
+        return {"value": indicator}
+
+    agent.taapi.fetch_raw = fake_fetch_raw
+    calls = [_tool_call(i, name) for i, name in enumerate(delays)]
+    started = time.monotonic()
+    results = asyncio.run(agent._run_tool_calls(calls))
+    elapsed = time.monotonic() - started
+
+    assert [r["tool_call_id"] for r in results] == [c["id"] for c in calls]
+    assert [json.loads(r["content"])["value"] for r in results[:4]] == ["rsi", "atr", "adx", "ema"]
+    assert results[4]["content"].startswith("Error:") and "timed out" in results[4]["content"]
+    assert state["peak"] == 3, state
+    assert elapsed < 0.9, f"tool round took {elapsed:.2f}s"
+    print(f"✅ 5 tool calls in {elapsed:.2f}s (peak {state['peak']} in flight), order preserved")
+
+
+if __name__ == "__main__":
+    test_tool_calls_run_concurrently_in_order()
+    print("🎉 Concurrent tool call tests completed!")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script for bounded tool output in the tool-calling loop (local stub server)
+"""
+import asyncio
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+from src.config_loader import CONFIG
+from conftest import isolated_config, start_stub
+from src.agent.decision_maker import _compact_tool_history, _select_fields
+
+INDICATORS = ["macd", "rsi", "ema", "atr"]
+
+
+def _decisions():
+    return json.dumps([{"asset": "BTC", "action": "hold", "allocation_usd": 0, "tp_price": None,
+                        "sl_price": None, "exit_plan": "", "rationale": "enough data"}])
+
+
+async def _scenario(history_chars, fields=None):
+    bodies = []
+
+    async def handler(request):
+        body = await request.json()
+        bodies.append(body)
+        rounds = sum(1 for m in body["messages"] if m.get("role") == "assistant")
+        if rounds < len(INDICATORS):
+            # One more indicator per round
+            args = {"indicator": INDICATORS[rounds], "symbol": "BTC/USDT", "interval": "1h"}
+            if fields:
+                args["fields"] = fields
+            return web.json_response({"choices": [{"message": {"role": "assistant", "content": "", "tool_calls": [
+                {"id": f"call_{rounds}", "type": "function",
+                 "function": {"name": "fetch_taapi_indicator", "arguments": json.dumps(args)}}]}}]})
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": _decisions()}}]})
+
+    runner, base_url = await start_stub(handler)
+    try:
+        CONFIG.update({
+            "llm_provider": "openrouter",
+            "openrouter_api_key": "test-key",
+            "openrouter_base_url": base_url,
+            "taapi_api_key": CONFIG.get("taapi_api_key") or "test-key",
+            "llm_model": "x-ai/grok-4",
+            "llm_stream": "false",
+            "llm_hedge_enabled": "false",
+            "llm_capability_cache_path": "",
+            "llm_replay_mode": "off",
+            "llm_tool_cache_enabled": "false",
+            "llm_tool_history_chars": str(history_chars),
+        })
+        from src.agent.decision_maker import TradingAgent
+        agent = TradingAgent()
+
+        async def fake_fetch_raw(indicator, symbol, interval, params=None, priority=None):
+            series = [100.0 + i * 0.37 for i in range(10)]
+            return {"valueMACD": series, "valueMACDSignal": series, "valueMACDHist": series}
+
+        agent.taapi.fetch_raw = fake_fetch_raw
+        out = await agent.decide_trade(["BTC"], "## Market Data\nBTC 60000\n")
+        summary = agent.telemetry.summary()["decisions"]
+        await agent.close()
+        return out, bodies, summary
+    finally:
+        await runner.cleanup()
+
+
+def _tool_chars(body):
+    return sum(len(m.get("content") or "") for m in body["messages"] if m.get("role") == "tool")
+
+
+def _run(*args, **kwargs):
+    with isolated_config():
+        return asyncio.run(_scenario(*args, **kwargs))
+
+
+def test_history_capped_and_reported():
+    """Older tool results shrink to their latest values so later rounds stay bounded."""
+    print("Testing bounded tool history...")
+    out, unbounded, _ = _run(0)
+    out_capped, capped, summary = _run(500)
+    assert out == out_capped and out[0]["rationale"] == "enough data"
+    assert len(unbounded) == len(capped) == len(INDICATORS) + 1
+    assert _tool_chars(unbounded[-1]) > 1000 and _tool_chars(capped[-1]) <= 500, \
+        (_tool_chars(unbounded[-1]), _tool_chars(capped[-1]))
+    # The newest result is intact; the oldest keeps its latest value
+    tools = [m for m in capped[-1]["messages"] if m.get("role") == "tool"]
+    assert json.loads(tools[-1]["content"])["valueMACD"][-1] == 103.33
+    assert json.loads(tools[0]["content"]) == {"valueMACD": [103.33], "valueMACDSignal": [103.33], "valueMACDHist": [103.33]}
+    assert summary["last_round_tokens"]["p50"] > summary["first_round_tokens"]["p50"]
+    print(f"✅ Last round tool output {_tool_chars(unbounded[-1])} -> {_tool_chars(capped[-1])} chars; "
+          f"prompt tokens {summary['first_round_tokens']['p50']} -> {summary['last_round_tokens']['p50']}")
+
+
+def test_requested_fields_only():
+    """A ``fields`` argument keeps only those result fields."""
+    print("Testing field selection...")
+    _, bodies, _ = _run(0, fields=["valueMACD"])
+    tools = [m for m in bodies[-1]["messages"] if m.get("role") == "tool"]
+    assert all(list(json.loads(m["content"])) == ["valueMACD"] for m in tools), tools
+    assert _select_fields('{"value":1}', ["missing"]) == '{"value":1}'
+    assert _select_fields("Error: timeout", ["value"]) == "Error: timeout"
+    print("✅ Requested fields only")
+
+
+def test_compaction_omits_when_needed():
+    """Results are omitted once latest values alone no longer fit; messages are replaced, not edited."""
+    print("Testing compaction fallback...")
+    original = {"role": "tool", "tool_call_id": "a", "content": json.dumps({"value": list(range(50))})}
+    messages = [{"role": "user", "content": "x"}, original, {"role": "tool", "tool_call_id": "b", "content": "Error: " + "e" * 300}]
+    total = _compact_tool_history(messages, 50)
+    assert messages[1]["content"] == '{"value":[49]}' and messages[2]["content"] == "[omitted to bound prompt size]"
+    assert original["content"].startswith('{"value": [0')
+    assert total == sum(len(m["content"]) for m in messages[1:]) <= 50
+    print("✅ Compaction fallback")
+
+
+if __name__ == "__main__":
+    test_history_capped_and_reported()
+    test_requested_fields_only()
+    test_compaction_omits_when_needed()
+    print("🎉 Tool history tests completed!")
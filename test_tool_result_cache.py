@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for the cross-cycle fetch_taapi_indicator result cache
+"""
+import asyncio
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import src.utils.candle_cache as candle_cache
+from src.config_loader import CONFIG
+CONFIG.update({
+    "llm_provider": "openrouter",
+    "openrouter_api_key": CONFIG.get("openrouter_api_key") or "test-key",
+    "taapi_api_key": CONFIG.get("taapi_api_key") or "test-key",
+})
+from src.agent.decision_maker import TradingAgent, _trim_tool_payload
+from src.utils.intervals import next_candle_close
+
+
+class _Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def _tool_call(i, args):
+    return {"id": f"call_{i}", "type": "function",
+            "function": {"name": "fetch_taapi_indicator", "arguments": json.dumps(args)}}
+
+
+def test_trim_payload():
+    """Bookkeeping fields are dropped, series shortened and floats rounded."""
+    print("Testing payload trimming...")
+    raw = {"value": [float(i) + 0.123456789 for i in range(30)], "backtrack": 0, "timestamp": [1, 2, 3]}
+    trimmed = _trim_tool_payload(raw, 5)
+    assert trimmed == {"value": [25.1235, 26.1235, 27.1235, 28.1235, 29.1235]}, trimmed
+    print(f"✅ {len(json.dumps(raw))} -> {len(json.dumps(trimmed))} chars")
+
+
+def test_equivalent_calls_share_cache_until_close():
+    """Differently spelled but equivalent calls hit the cache until the candle closes."""
+    print("Testing tool result cache...")
+    clock = _Clock(1_700_000_000.0)
+    original = candle_cache.time
+    candle_cache.time = clock
+    try:
+        agent = TradingAgent()
+        calls = []
+
+        async def fake_fetch_raw(indicator, symbol, interval, params=None, priority=None):
+            calls.append((indicator, symbol, interval, params))
+            return {"value": 40.0 + len(calls), "backtrack": 0}
+
+        agent.taapi.fetch_raw = fake_fetch_raw
+
+        async def scenario():
+            first = await agent._run_tool_calls([_tool_call(1, {"indicator": "ATR", "symbol": "btc/usdt", "interval": "4h", "period": 14})])
+            clock.now += 600  # next cycle, same 4h candle
+            again = await agent._run_tool_calls([_tool_call(2, {"indicator": "atr", "symbol": "BTCUSDT", "interval": "4h", "period": "14"})])
+            clock.now = next_candle_close("4h", 1_700_000_000.0) + 5
+            fresh = await agent._run_tool_calls([_tool_call(3, {"indicator": "atr", "symbol": "BTC/USDT", "interval": "4h", "period": 14})])
+            return first, again, fresh
+
+        first, again, fresh = asyncio.run(scenario())
+        assert first[0]["content"] == again[0]["content"] == '{"value":41.0}', (first, again)
+        assert again[0]["tool_call_id"] == "call_2"
+        assert fresh[0]["content"] == '{"value":42.0}'
+        assert calls[0] == ("atr", "BTC/USDT", "4h", {"period": 14}), calls
+        assert len(calls) == 2
+        stats = agent.tool_cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 2, stats
+        print(f"✅ Tool cache stats: {stats}")
+    finally:
+        candle_cache.time = original
+
+
+def test_errors_not_cached():
+    """Failed fetches are reported to the model and retried next time."""
+    print("Testing error handling...")
+    agent = TradingAgent()
+    attempts = {"n": 0}
+
+    async def flaky_fetch_raw(indicator, symbol, interval, params=None, priority=None):
+        attempts["n"] += 1
+        if attempts["n"] == 1:
+            raise RuntimeError("upstream down")
+        return {"value": 1.0}
+
+    agent.taapi.fetch_raw = flaky_fetch_raw
+    args = {"indicator": "rsi", "symbol": "ETH/USDT", "interval": "5m"}
+
+    async def scenario():
+        failed = await agent._run_tool_calls([_tool_call(1, args)])
+        ok = await agent._run_tool_calls([_tool_call(2, args)])
+        return failed, ok
+
+    failed, ok = asyncio.run(scenario())
+    assert failed[0]["content"] == "Error: upstream down"
+    assert ok[0]["content"] == '{"value":1.0}'
+    print("✅ Errors are not cached")
+
+
+if __name__ == "__main__":
+    test_trim_payload()
+    test_equivalent_calls_share_cache_until_close()
+    test_errors_not_cached()
+    print("🎉 Tool result cache tests completed!")